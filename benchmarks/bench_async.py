@@ -0,0 +1,196 @@
+"""
+Concurrency vs latency for the database-bound API endpoints.
+
+Starts the RTDB emulator with a fixed per-request delay standing in for the
+round trip to the hosted database, starts the user-profile and order
+services against it, then holds N requests in flight for each N in
+--concurrency and reports throughput and p50/p95/p99 per endpoint. With
+--baseline the same sweep is run first against another git revision
+(extracted with git archive), e.g. the parent of the commit that made the
+handlers async, to compare them with the sync threadpool ones:
+
+    BEFORE_ASYNC="$(git log -1 --format=%H --grep='Serve API requests from async handlers')^"
+    python benchmarks/bench_async.py --latency 20 --baseline "$BEFORE_ASYNC" -o async.json
+
+Endpoints:
+  profile   GET /profile/me (one read)
+  orders    GET /orders?limit=20 (one ordered query)
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+from jose import jwt
+
+from bench_e2e import (ROOT, git_commit, start_process, stop_processes, summarize,
+                       wait_for_http)
+
+# ccb_auth.SECRET_KEY default (kept literal so baseline trees work too)
+SECRET_KEY = "simple_secret_key"
+USERS = 200
+ORDERS = 500
+
+
+def seed_file(path):
+    now = datetime.now().isoformat()
+    data = {
+        "users": {
+            f"user-{i:07d}": {
+                "auth": {"email": f"user{i}@example.com", "password": "", "createdAt": now},
+                "profile": {"name": f"User {i}", "phone": "", "role": "user", "status": "active"},
+            }
+            for i in range(USERS)
+        },
+        "orders": {
+            f"order-{i:08d}": {
+                "userId": f"user{i % USERS}@example.com", "customerEmail": f"user{i % USERS}@example.com",
+                "status": "PAID", "totalPrice": 10.0, "total": 10.0,
+                "items": [{"name": "Seeded", "price": 10.0, "quantity": 1}],
+                "createdAt": f"2025-01-01T00:00:{i % 60:02d}.{i:06d}", "date": "2025-01-01",
+            }
+            for i in range(ORDERS)
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def extract(rev, directory):
+    """Check out ``rev`` of the repo into ``directory``."""
+    archive = subprocess.run(["git", "archive", rev], cwd=ROOT, check=True,
+                             capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory)
+
+
+async def sweep(url, headers, concurrency, duration):
+    samples, errors = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url, headers=headers)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    samples.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(samples, errors, elapsed)
+
+
+def run_tree(name, root, args, seed_path):
+    """Run the sweep against the services in ``root``; returns {endpoint: {concurrency: stats}}."""
+    env = dict(os.environ)
+    env.update({
+        "CCB_DB_BACKEND": "emulator",
+        "CCB_DB_EMULATOR_HOST": f"127.0.0.1:{args.emulator_port}",
+        "PYTHONUNBUFFERED": "1",
+    })
+    logs = os.path.join(args.logs, name)
+    os.makedirs(logs, exist_ok=True)
+    procs = []
+    try:
+        emulator = start_process(["-m", "ccb_db.emulator", "--port", str(args.emulator_port),
+                                  "--latency", str(args.latency), "--seed", seed_path],
+                                 os.path.join(ROOT, "shared-assets"), env,
+                                 os.path.join(logs, "emulator.log"))
+        procs.append(emulator)
+        wait_for_http(f"http://127.0.0.1:{args.emulator_port}/.json?shallow=true", emulator)
+
+        urls = {}
+        for offset, (service, directory) in enumerate((("user", "user-profile-service"),
+                                                      ("order", "order-service"))):
+            port = args.base_port + offset
+            proc = start_process(["-m", "uvicorn", "app:app", "--port", str(port),
+                                  "--log-level", "warning"],
+                                 os.path.join(root, directory), env,
+                                 os.path.join(logs, f"{service}.log"))
+            procs.append(proc)
+            urls[service] = f"http://127.0.0.1:{port}"
+            wait_for_http(f"{urls[service]}/docs", proc)
+
+        token = jwt.encode({"sub": "user-0000001", "role": "user"}, SECRET_KEY, algorithm="HS256")
+        endpoints = {
+            "profile": (f"{urls['user']}/profile/me", {"Authorization": f"Bearer {token}"}),
+            "orders": (f"{urls['order']}/orders?limit=20", {}),
+        }
+        results = {}
+        for endpoint, (url, headers) in endpoints.items():
+            results[endpoint] = {}
+            asyncio.run(sweep(url, headers, 4, args.warmup))
+            for concurrency in args.concurrency:
+                stats = asyncio.run(sweep(url, headers, concurrency, args.duration))
+                results[endpoint][concurrency] = stats
+                print(f"{name:<9} {endpoint:<8} {concurrency:>5} {stats['rps'] or 0:>9.1f} "
+                      f"{stats['p50_ms'] or 0:>9.1f} {stats['p95_ms'] or 0:>9.1f} "
+                      f"{stats['p99_ms'] or 0:>9.1f} {stats['errors']:>6}", file=sys.stderr)
+        return results
+    finally:
+        stop_processes(procs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--latency", type=float, default=20,
+                        help="milliseconds the emulator adds to every database request")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds per endpoint")
+    parser.add_argument("--baseline", metavar="REV",
+                        help="also run the sweep against this git revision (branch, tag, HEAD~n)")
+    parser.add_argument("--emulator-port", type=int, default=9100)
+    parser.add_argument("--base-port", type=int, default=18000,
+                        help="user and order services listen on this and the next port")
+    parser.add_argument("--logs", default=os.path.join(tempfile.gettempdir(), "ccb-bench-logs"),
+                        help="directory for service logs")
+    parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    print(f"{'tree':<9} {'endpoint':<8} {'conc':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'errors':>6}", file=sys.stderr)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "baseline": args.baseline,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "logs")},
+        },
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_path = os.path.join(tmp, "seed.json")
+        seed_file(seed_path)
+        if args.baseline:
+            baseline_root = os.path.join(tmp, "baseline")
+            extract(args.baseline, baseline_root)
+            report["baseline"] = run_tree("baseline", baseline_root, args, seed_path)
+        report["current"] = run_tree("current", ROOT, args, seed_path)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Cart mutations per second: write-behind vs. write-through.
+
+Starts the RTDB emulator (adding --latency ms to every database request) and
+cart-service with --users existing carts, which it loads at startup. Then
+--concurrency shoppers spread over those carts add, re-quantify and remove
+products for --duration seconds. It reports mutations/second, latency, and
+how many database writes the service made. Write-through
+(CART_FLUSH_INTERVAL=0) writes every change before it returns, i.e. one
+database write per click:
+
+    python benchmarks/bench_cart.py --users 500 --concurrency 8 --latency 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import httpx
+from jose import jwt
+
+from bench_e2e import ROOT, start_process, stop_processes, summarize, wait_for_http
+
+# ccb_auth.SECRET_KEY default
+SECRET_KEY = "simple_secret_key"
+VARIANTS = {"write-behind": {}, "write-through": {"CART_FLUSH_INTERVAL": "0"}}
+PRODUCTS = [f"prod-{i:04d}" for i in range(50)]
+
+
+async def shop(url, args):
+    tokens = [jwt.encode({"sub": f"user-{i:07d}", "role": "user"}, SECRET_KEY, algorithm="HS256")
+              for i in range(args.users)]
+    samples, errors = [], 0
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def shopper(seed):
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+                product_id = rng.choice(PRODUCTS)
+                roll = rng.random()
+                start = time.perf_counter()
+                if roll < 0.6:
+                    response = await client.post("/cart/items", headers=headers, json={
+                        "productId": product_id, "quantity": 1, "price": 25.0})
+                elif roll < 0.85:
+                    response = await client.put(f"/cart/items/{product_id}", headers=headers,
+                                                json={"quantity": rng.randint(0, 3)})
+                else:
+                    response = await client.delete(f"/cart/items/{product_id}", headers=headers)
+                # 404 (not in that cart) and 400 (quantity cap) are normal answers here
+                if response.status_code in (200, 400, 404):
+                    samples.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(shopper(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        counters = (await client.get("/")).json()
+    return summarize(samples, errors, elapsed), counters
+
+
+def run_variant(name, extra_env, args):
+    env = dict(os.environ)
+    env.update({
+        "CCB_DB_BACKEND": "emulator",
+        "CCB_DB_EMULATOR_HOST": f"127.0.0.1:{args.emulator_port}",
+        "PYTHONUNBUFFERED": "1",
+        **extra_env,
+    })
+    procs = []
+    try:
+        emulator = start_process(["-m", "ccb_db.emulator", "--port", str(args.emulator_port),
+                                  "--latency", str(args.latency)],
+                                 os.path.join(ROOT, "shared-assets"), env,
+                                 os.path.join(args.logs, f"{name}-emulator.log"))
+        procs.append(emulator)
+        wait_for_http(f"http://127.0.0.1:{args.emulator_port}/.json?shallow=true", emulator)
+        # Existing carts, loaded by the service at startup
+        httpx.put(f"http://127.0.0.1:{args.emulator_port}/carts.json", json={
+            f"user-{i:07d}": {"items": {PRODUCTS[i % len(PRODUCTS)]: {"quantity": 1, "price": 25.0}},
+                              "updatedAt": 1_700_000_000_000 + i}
+            for i in range(args.users)
+        }, timeout=60).raise_for_status()
+        cart = start_process(["-m", "uvicorn", "app:app", "--port", str(args.port),
+                              "--log-level", "warning"],
+                             os.path.join(ROOT, "cart-service"), env,
+                             os.path.join(args.logs, f"{name}-cart.log"))
+        procs.append(cart)
+        url = f"http://127.0.0.1:{args.port}"
+        wait_for_http(f"{url}/docs", cart)
+        stats, counters = asyncio.run(shop(url, args))
+    finally:
+        stop_processes(procs)
+
+    print(f"{name:<14} {stats['count']:>8} {stats['rps'] or 0:>8.0f} {stats['p50_ms'] or 0:>7.1f} "
+          f"{stats['p99_ms'] or 0:>7.1f} {counters['pathsWritten']:>9} {counters['flushes']:>8} "
+          f"{stats['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=500, help="distinct carts")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per variant")
+    parser.add_argument("--latency", type=float, default=20,
+                        help="milliseconds the emulator adds to every database request")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--emulator-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=18003, help="cart service port")
+    parser.add_argument("--logs", default=os.path.join(tempfile.gettempdir(), "ccb-bench-logs"),
+                        help="directory for service logs")
+    args = parser.parse_args()
+    os.makedirs(args.logs, exist_ok=True)
+
+    print(f"{'variant':<14} {'requests':>8} {'mut/s':>8} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'db paths':>9} {'db writes':>8} {'errors':>6}")
+    for name in args.variants:
+        run_variant(name, VARIANTS[name], args)
+
+
+if __name__ == "__main__":
+    main()
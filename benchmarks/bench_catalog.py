@@ -0,0 +1,90 @@
+"""
+GET /products latency: direct Firebase read vs. in-memory product snapshot.
+
+    python benchmarks/bench_catalog.py --products 500 5000 --latency 0.02
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared-assets"))
+sys.path.insert(0, os.path.join(ROOT, "catalog-service"))
+
+# Run the service against the in-process database
+os.environ["CCB_DB_BACKEND"] = "memory"
+import ccb_db  # noqa: E402
+
+memdb = ccb_db.get_backend()
+
+import app as catalog  # noqa: E402
+
+
+def uncached_products():
+    """The pre-cache implementation of get_products."""
+    data = ccb_db.reference('products').get()
+    if not data:
+        return []
+    product_list = []
+    for key, value in data.items():
+        value['id'] = key
+        product_list.append(value)
+    return product_list
+
+
+def seed(count):
+    products = {}
+    for i in range(count):
+        products[f"p{i:06d}"] = {
+            "name": f"Product {i}", "price": 10 + i % 90, "description": "A fine garment " * 4,
+            "stock": i % 20, "categoryId": ["formal", "casual", "heritage", "modern"][i % 4],
+            "imageUrl": f"/img/{i}.jpg",
+        }
+    memdb.reference("products").set(products)
+
+
+def measure(fn, requests):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="simulated Firebase round trip in seconds")
+    args = parser.parse_args()
+    memdb.latency = args.latency
+
+    with TestClient(catalog.app) as client:
+        print(f"{'products':>8}  {'variant':<14}  {'p50 ms':>9}  {'p99 ms':>9}  {'db calls':>8}")
+        for count in args.products:
+            seed(count)
+            memdb.wait_for_events()  # the listener picks up the new catalog
+            client.get("/products")
+            etag = client.get("/products").headers["etag"]
+
+            variants = (
+                ("uncached", uncached_products),
+                ("snapshot", lambda: catalog.product_cache.snapshot()),
+                ("http 200", lambda: client.get("/products")),
+                ("http 304", lambda: client.get("/products", headers={"If-None-Match": etag})),
+            )
+            for name, fn in variants:
+                before = memdb.calls
+                p50, p99 = measure(fn, args.requests)
+                print(f"{count:>8}  {name:<14}  {p50:>9.3f}  {p99:>9.3f}  {memdb.calls - before:>8}")
+
+
+if __name__ == "__main__":
+    main()
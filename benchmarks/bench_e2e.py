@@ -0,0 +1,482 @@
+"""
+End-to-end load test across the microservices.
+
+Starts the RTDB emulator, seeds it with users, products and orders, starts
+user-profile, catalog, order and payment services against it, then drives
+a mix of client scenarios and reports throughput and p50/p95/p99 latency
+per endpoint as JSON, so runs can be compared between commits:
+
+    python benchmarks/bench_e2e.py --duration 30 --clients 16 -o before.json
+    # ... change something ...
+    python benchmarks/bench_e2e.py --duration 30 --clients 16 -o after.json
+    python benchmarks/bench_e2e.py --compare before.json after.json
+
+Scenarios (weights set with --mix):
+  browse    product list, a category, two product pages
+  login     POST /auth/login
+  checkout  two product pages, then POST /order
+  history   the user's order history
+  admin     user list and the admin order listing
+
+order-service places checkout orders as PENDING, for the payment service;
+the time from order creation to PAID is reported as "payment".
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import bcrypt
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared-assets"))
+
+PASSWORD = "loadtest-pass"
+ADMIN_EMAIL = "admin@loadtest.local"
+CATEGORIES = ["formal", "casual", "heritage", "modern", "accessories"]
+DEFAULT_MIX = "browse=50,login=10,checkout=15,history=15,admin=10"
+
+SERVICES = {
+    # name: (directory, command, port offset from --base-port; None = no HTTP)
+    "user": ("user-profile-service", ["-m", "uvicorn", "app:app"], 0),
+    "catalog": ("catalog-service", ["-m", "uvicorn", "app:app"], 1),
+    "order": ("order-service", ["-m", "uvicorn", "app:app"], 2),
+    "payment": ("payment-service", ["main.py"], None),
+}
+
+
+# --- processes ---
+
+def service_env(args):
+    env = dict(os.environ)
+    env.update({
+        "CCB_DB_BACKEND": "emulator",
+        "CCB_DB_EMULATOR_HOST": f"127.0.0.1:{args.emulator_port}",
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        "PAYMENT_GATEWAY_DELAY": str(args.gateway_delay),
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def start_process(cmd, cwd, env, log_path):
+    log = open(log_path, "w")
+    return subprocess.Popen([sys.executable] + cmd, cwd=cwd, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_for_http(url, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop_processes(procs):
+    for proc in procs:
+        if proc.poll() is None:
+            proc.send_signal(signal.SIGTERM)
+    for proc in procs:
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# --- seeding ---
+
+def seed(args, env):
+    """Write the seed data straight into the emulator, then run the index backfills."""
+    os.environ.update({k: env[k] for k in ("CCB_DB_BACKEND", "CCB_DB_EMULATOR_HOST")})
+    import ccb_db
+
+    rng = random.Random(args.seed)
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(args.bcrypt_rounds)).decode()
+    now = str(datetime.now())
+
+    def account(email, name, role):
+        return {"auth": {"email": email, "password": hashed, "createdAt": now, "lastLoginAt": ""},
+                "profile": {"name": name, "phone": "", "role": role, "status": "active"}}
+
+    emails = [f"user{i}@loadtest.local" for i in range(args.users)]
+    data = {
+        "users": {f"user-{i:07d}": account(email, f"User {i}", "user")
+                  for i, email in enumerate(emails)},
+        "admins": {"admin-0000001": account(ADMIN_EMAIL, "Load Admin", "admin")},
+        "products": {
+            f"prod-{i:07d}": {
+                "name": f"Product {i}", "price": round(rng.uniform(10, 300), 2),
+                "description": "Seeded for load testing " * 3, "stock": rng.randrange(10_000, 50_000),
+                "categoryId": CATEGORIES[i % len(CATEGORIES)], "imageUrl": f"/img/{i}.jpg",
+            }
+            for i in range(args.products)
+        },
+    }
+    product_ids = list(data["products"])
+
+    orders = {}
+    for i in range(args.orders):
+        email = rng.choice(emails)
+        item = data["products"][rng.choice(product_ids)]
+        created = datetime.fromtimestamp(time.time() - rng.uniform(0, 90 * 86400)).isoformat()
+        orders[f"order-{i:08d}"] = {
+            "userId": email, "customerEmail": email, "customerName": "Seeded",
+            "status": "PAID", "totalPrice": item["price"], "total": item["price"],
+            "items": [{"name": item["name"], "price": item["price"], "quantity": 1}],
+            "cartItems": {}, "createdAt": created, "updatedAt": created, "date": created[:10],
+        }
+
+    root = ccb_db.reference("/")
+    root.set(data)
+    ids = list(orders)
+    for start in range(0, len(ids), 1000):
+        root.update({f"orders/{k}": orders[k] for k in ids[start:start + 1000]})
+
+    for directory, script in (("user-profile-service", "email_index.py"),
+                              ("user-profile-service", "user_summaries.py"),
+                              ("user-profile-service", "account_directory.py"),
+                              ("order-service", "user_orders.py")):
+        subprocess.run([sys.executable, script], cwd=os.path.join(ROOT, directory), env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+    return emails, product_ids
+
+
+# --- load generation ---
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, label, ms, ok):
+        with self._lock:
+            self.samples.setdefault(label, []).append(ms)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+
+class Client:
+    """One simulated user: a keep-alive HTTP client plus scenario steps."""
+
+    def __init__(self, urls, emails, product_ids, recorder, rng):
+        self.urls = urls
+        self.emails = emails
+        self.product_ids = product_ids
+        self.recorder = recorder
+        self.rng = rng
+        self.http = httpx.Client(timeout=30)
+        self.admin_token = None
+        self.orders_placed = []
+
+    def call(self, label, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.recorder.record(label, (time.perf_counter() - start) * 1000, ok)
+        return response if ok else None
+
+    def login(self, email):
+        response = self.call("POST /auth/login", "POST", f"{self.urls['user']}/auth/login",
+                             json={"email": email, "password": PASSWORD})
+        return response.json()["access_token"] if response else None
+
+    def product_page(self):
+        product_id = self.rng.choice(self.product_ids)
+        response = self.call("GET /products/{id}", "GET",
+                             f"{self.urls['catalog']}/products/{product_id}")
+        return response.json() if response else None
+
+    # scenarios
+
+    def browse(self):
+        self.call("GET /products", "GET", f"{self.urls['catalog']}/products")
+        self.call("GET /products?categoryId", "GET", f"{self.urls['catalog']}/products",
+                  params={"categoryId": self.rng.choice(CATEGORIES)})
+        self.product_page()
+        self.product_page()
+
+    def login_only(self):
+        self.login(self.rng.choice(self.emails))
+
+    def checkout(self):
+        email = self.rng.choice(self.emails)
+        items = [p for p in (self.product_page(), self.product_page()) if p]
+        if not items:
+            return
+        total = round(sum(p["price"] for p in items), 2)
+        response = self.call("POST /order", "POST", f"{self.urls['order']}/order", json={
+            "userId": email, "customerEmail": email, "totalPrice": total,
+            "cartItems": {p["id"]: 1 for p in items},
+            "items": [{"id": p["id"], "name": p["name"], "price": p["price"], "quantity": 1}
+                      for p in items],
+        })
+        if response:
+            self.orders_placed.append(response.json()["orderId"])
+
+    def history(self):
+        email = self.rng.choice(self.emails)
+        self.call("GET /orders/{email}", "GET", f"{self.urls['order']}/orders/{email}",
+                  params={"limit": 20})
+
+    def admin(self):
+        if self.admin_token is None:
+            self.admin_token = self.login(ADMIN_EMAIL)
+            if self.admin_token is None:
+                return
+        self.call("GET /users/", "GET", f"{self.urls['user']}/users/", params={"limit": 100},
+                  headers={"Authorization": f"Bearer {self.admin_token}"})
+        self.call("GET /orders", "GET", f"{self.urls['order']}/orders", params={"limit": 50})
+
+
+SCENARIOS = {
+    "browse": Client.browse,
+    "login": Client.login_only,
+    "checkout": Client.checkout,
+    "history": Client.history,
+    "admin": Client.admin,
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def drive(args, urls, emails, product_ids, duration, seed_offset):
+    """Run --clients concurrent clients for ``duration`` seconds."""
+    recorder = Recorder()
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    deadline = time.monotonic() + duration
+    clients = [Client(urls, emails, product_ids, recorder, random.Random(args.seed + seed_offset + i))
+               for i in range(args.clients)]
+
+    def loop(client):
+        while time.monotonic() < deadline:
+            SCENARIOS[client.rng.choices(names, weights)[0]](client)
+        client.http.close()
+
+    threads = [threading.Thread(target=loop, args=(c,)) for c in clients]
+    began = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+    orders = [order_id for c in clients for order_id in c.orders_placed]
+    return recorder, elapsed, orders
+
+
+def wait_for_payments(order_ids, timeout):
+    """Order -> PAID latency (ms) for orders the payment service finished in time."""
+    import ccb_db
+
+    orders = ccb_db.reference("orders")
+    deadline = time.monotonic() + timeout
+    done = {}
+    while order_ids and time.monotonic() < deadline:
+        for order_id in order_ids:
+            if order_id in done:
+                continue
+            order = orders.child(order_id).get() or {}
+            if order.get("status") in ("PAID", "PAYMENT_FAILED"):
+                created = datetime.fromisoformat(order["createdAt"])
+                finished = datetime.fromisoformat(order["updatedAt"])
+                done[order_id] = ((finished - created).total_seconds() * 1000,
+                                  order["status"] == "PAID")
+        if len(done) == len(order_ids):
+            break
+        time.sleep(0.5)
+    return done, len(order_ids) - len(done)
+
+
+# --- reporting ---
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples, errors, elapsed):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "mean_ms": round(sum(samples) / len(samples), 2) if samples else None,
+        "p50_ms": round(percentile(samples, 50), 2) if samples else None,
+        "p95_ms": round(percentile(samples, 95), 2) if samples else None,
+        "p99_ms": round(percentile(samples, 99), 2) if samples else None,
+        "max_ms": round(samples[-1], 2) if samples else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(report, out=sys.stderr):
+    print(f"{'endpoint':<26} {'count':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}",
+          file=out)
+    for label, stats in report["endpoints"].items():
+        p = {k: "-" if stats[k] is None else f"{stats[k]:.1f}" for k in ("p50_ms", "p95_ms", "p99_ms")}
+        rps = "-" if stats["rps"] is None else f"{stats['rps']:.1f}"
+        print(f"{label:<26} {stats['count']:>7} {stats['errors']:>5} {rps:>8} "
+              f"{p['p50_ms']:>8} {p['p95_ms']:>8} {p['p99_ms']:>8}", file=out)
+    total = report["total"]
+    print(f"total {total['requests']} requests, {total['rps']} req/s, {total['errors']} errors",
+          file=out)
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old.get('meta', {}).get('commit')} -> {new.get('meta', {}).get('commit')}")
+    print(f"{'endpoint':<26} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18} {'rps':>18}")
+
+    def cell(a, b):
+        if a is None or b is None:
+            return f"{'-':>18}"
+        change = f"{(b - a) / a * 100:+.0f}%" if a else ""
+        return f"{a:>7.1f}->{b:<7.1f}{change:>4}"
+
+    for label in sorted(set(old["endpoints"]) | set(new["endpoints"])):
+        a, b = old["endpoints"].get(label, {}), new["endpoints"].get(label, {})
+        print(f"{label:<26} " + " ".join(cell(a.get(k), b.get(k))
+                                         for k in ("p50_ms", "p95_ms", "p99_ms", "rps")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario weights")
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    parser.add_argument("--gateway-delay", type=float, default=0.2,
+                        help="simulated payment gateway latency (s)")
+    parser.add_argument("--payment-timeout", type=float, default=60,
+                        help="how long to wait for checkout orders to be paid")
+    parser.add_argument("--emulator-port", type=int, default=9100)
+    parser.add_argument("--base-port", type=int, default=18000,
+                        help="user, catalog and order services listen on this and the next two")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--logs", default=os.path.join(tempfile.gettempdir(), "ccb-bench-logs"),
+                        help="directory for service logs")
+    parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two JSON reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    parse_mix(args.mix)
+
+    os.makedirs(args.logs, exist_ok=True)
+    env = service_env(args)
+    procs = []
+    try:
+        emulator = start_process(["-m", "ccb_db.emulator", "--port", str(args.emulator_port)],
+                                 os.path.join(ROOT, "shared-assets"), env,
+                                 os.path.join(args.logs, "emulator.log"))
+        procs.append(emulator)
+        wait_for_http(f"http://127.0.0.1:{args.emulator_port}/.json", emulator)
+
+        print(f"Seeding {args.users} users, {args.products} products, {args.orders} orders...",
+              file=sys.stderr)
+        emails, product_ids = seed(args, env)
+
+        urls = {}
+        for name, (directory, cmd, offset) in SERVICES.items():
+            if offset is not None:
+                port = args.base_port + offset
+                cmd = cmd + ["--port", str(port), "--log-level", "warning"]
+                urls[name] = f"http://127.0.0.1:{port}"
+            proc = start_process(cmd, os.path.join(ROOT, directory), env,
+                                 os.path.join(args.logs, f"{name}.log"))
+            procs.append(proc)
+            if offset is not None:
+                wait_for_http(f"{urls[name]}/docs", proc)
+
+        if args.warmup:
+            print(f"Warming up for {args.warmup}s...", file=sys.stderr)
+            drive(args, urls, emails, product_ids, args.warmup, seed_offset=10_000)
+        print(f"Running {args.clients} clients for {args.duration}s...", file=sys.stderr)
+        recorder, elapsed, order_ids = drive(args, urls, emails, product_ids, args.duration, 0)
+        payments, unfinished = wait_for_payments(order_ids, args.payment_timeout)
+    finally:
+        stop_processes(procs)
+
+    endpoints = {label: summarize(samples, recorder.errors.get(label, 0), elapsed)
+                 for label, samples in sorted(recorder.samples.items())}
+    payment_stats = summarize([ms for ms, _ in payments.values()],
+                              sum(1 for _, paid in payments.values() if not paid) + unfinished,
+                              elapsed)
+    payment_stats["unfinished"] = unfinished
+    requests = sum(s["count"] for s in endpoints.values())
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "logs")},
+        },
+        "total": {
+            "requests": requests,
+            "errors": sum(s["errors"] for s in endpoints.values()),
+            "elapsed_s": round(elapsed, 2),
+            "rps": round(requests / elapsed, 2),
+        },
+        "endpoints": endpoints,
+        "payment": payment_stats,
+    }
+
+    print_table(report)
+    print(f"payment: {payment_stats['count']} orders settled, p50 {payment_stats['p50_ms']} ms, "
+          f"{unfinished} unfinished", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
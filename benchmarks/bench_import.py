@@ -0,0 +1,136 @@
+"""
+Product import throughput: one request per product vs. POST /products/bulk.
+
+Starts the RTDB emulator (adding --latency ms to every database request, as
+a stand-in for the round trip to the hosted database) and the catalog
+service, then loads --rows products each way and reports rows/second:
+
+    python benchmarks/bench_import.py --rows 5000 --latency 20
+
+Variants:
+  single POST   POST /products per row (--single-rows of them; it is slow)
+  single PUT    PUT /products/{id} per row
+  bulk json     one JSON array
+  bulk ndjson   streamed NDJSON
+  bulk csv      streamed CSV
+  bulk update   JSON array of rows with ids
+  bulk delete   POST /products/bulk/delete
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+from bench_e2e import CATEGORIES, ROOT, start_process, stop_processes, wait_for_http
+
+
+def make_rows(count, prefix):
+    return [{"name": f"{prefix} {i}", "price": round(10 + i % 290 + 0.99, 2),
+             "description": "Seasonal collection piece", "stock": i % 40,
+             "categoryId": CATEGORIES[i % len(CATEGORIES)], "imageUrl": f"/img/{prefix}-{i}.jpg"}
+            for i in range(count)]
+
+
+def ndjson_body(rows):
+    for start in range(0, len(rows), 500):
+        yield "".join(json.dumps(row) + "\n" for row in rows[start:start + 500]).encode()
+
+
+def csv_body(rows):
+    fields = list(rows[0])
+    for start in range(0, len(rows), 500):
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=fields)
+        if start == 0:
+            writer.writeheader()
+        writer.writerows(rows[start:start + 500])
+        yield out.getvalue().encode()
+
+
+def timed(label, count, call):
+    start = time.perf_counter()
+    result = call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<13} {count:>7} {elapsed:>9.2f} {count / elapsed:>10.0f}")
+    return result
+
+
+def bulk(http, url, content, content_type):
+    response = http.post(f"{url}/products/bulk", content=content,
+                         headers={"Content-Type": content_type})
+    response.raise_for_status()
+    result = response.json()
+    if result["errors"]:
+        raise RuntimeError(f"{len(result['errors'])} rows failed: {result['errors'][:3]}")
+    return result["ids"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rows", type=int, default=5000, help="products per bulk variant")
+    parser.add_argument("--single-rows", type=int, default=200,
+                        help="products for the one-request-per-row variants")
+    parser.add_argument("--latency", type=float, default=20,
+                        help="milliseconds the emulator adds to every database request")
+    parser.add_argument("--emulator-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=18001, help="catalog service port")
+    parser.add_argument("--logs", default=os.path.join(tempfile.gettempdir(), "ccb-bench-logs"),
+                        help="directory for service logs")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.update({
+        "CCB_DB_BACKEND": "emulator",
+        "CCB_DB_EMULATOR_HOST": f"127.0.0.1:{args.emulator_port}",
+        "PYTHONUNBUFFERED": "1",
+    })
+    os.makedirs(args.logs, exist_ok=True)
+    procs = []
+    try:
+        emulator = start_process(["-m", "ccb_db.emulator", "--port", str(args.emulator_port),
+                                  "--latency", str(args.latency)],
+                                 os.path.join(ROOT, "shared-assets"), env,
+                                 os.path.join(args.logs, "emulator.log"))
+        procs.append(emulator)
+        wait_for_http(f"http://127.0.0.1:{args.emulator_port}/.json?shallow=true", emulator)
+        catalog = start_process(["-m", "uvicorn", "app:app", "--port", str(args.port),
+                                 "--log-level", "warning"],
+                                os.path.join(ROOT, "catalog-service"), env,
+                                os.path.join(args.logs, "catalog.log"))
+        procs.append(catalog)
+        url = f"http://127.0.0.1:{args.port}"
+        wait_for_http(f"{url}/docs", catalog)
+
+        print(f"{'variant':<13} {'rows':>7} {'seconds':>9} {'rows/s':>10}")
+        with httpx.Client(timeout=600) as http:
+            single = make_rows(args.single_rows, "Single")
+            ids = timed("single POST", len(single), lambda: [
+                http.post(f"{url}/products", json=row).raise_for_status().json()["id"]
+                for row in single])
+            timed("single PUT", len(single), lambda: [
+                http.put(f"{url}/products/{product_id}", json={**row, "stock": 0}).raise_for_status()
+                for product_id, row in zip(ids, single)])
+
+            rows = make_rows(args.rows, "Bulk")
+            ids = timed("bulk json", len(rows), lambda: bulk(
+                http, url, json.dumps(rows).encode(), "application/json"))
+            timed("bulk ndjson", len(rows), lambda: bulk(
+                http, url, ndjson_body(make_rows(args.rows, "Stream")), "application/x-ndjson"))
+            timed("bulk csv", len(rows), lambda: bulk(
+                http, url, csv_body(make_rows(args.rows, "Sheet")), "text/csv"))
+            updates = [{**row, "id": product_id, "stock": 0} for product_id, row in zip(ids, rows)]
+            timed("bulk update", len(rows), lambda: bulk(
+                http, url, json.dumps(updates).encode(), "application/json"))
+            timed("bulk delete", len(ids), lambda: http.post(
+                f"{url}/products/bulk/delete", json={"ids": ids}).raise_for_status())
+    finally:
+        stop_processes(procs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Login latency benchmark: full user scan vs. email index.
+
+Seeds an in-memory RTDB (ccb_db.memory) with N users and times /auth/login
+through the user-profile-service router, comparing the old full-scan lookup
+against the email index.
+
+    python benchmarks/bench_login.py --users 10000 100000 --logins 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+import bcrypt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared-assets"))
+sys.path.insert(0, os.path.join(ROOT, "user-profile-service"))
+
+# Run the service against the in-process database
+os.environ["CCB_DB_BACKEND"] = "memory"
+import ccb_db  # noqa: E402
+
+memdb = ccb_db.get_backend()
+
+from fastapi import HTTPException  # noqa: E402
+from models import LoginRequest  # noqa: E402
+from routers.auth import login  # noqa: E402
+from utils import verify_password, create_token  # noqa: E402
+import email_index  # noqa: E402
+import utils  # noqa: E402
+
+PASSWORD = "hunter2"
+
+
+async def legacy_login(creds):
+    """The pre-index implementation: download users and admins and scan."""
+    users = memdb.reference("users").get() or {}
+    for uid, data in users.items():
+        if not isinstance(data, dict):
+            continue
+        if data.get("auth", {}).get("email") == creds.email:
+            if await verify_password(creds.password, data["auth"]["password"]):
+                token = create_token({"sub": uid, "role": "user"})
+                return {"access_token": token, "token_type": "bearer", "role": "user"}
+
+    admins = memdb.reference("admins").get() or {}
+    for aid, data in admins.items():
+        if not isinstance(data, dict):
+            continue
+        if data.get("auth", {}).get("email") == creds.email:
+            if await verify_password(creds.password, data["auth"]["password"]):
+                token = create_token({"sub": aid, "role": "admin"})
+                return {"access_token": token, "token_type": "bearer", "role": "admin"}
+
+    raise HTTPException(400, "Invalid credentials")
+
+
+def seed(count):
+    # Low-cost hash so the lookup, not bcrypt, dominates the measurement;
+    # the service cost is lowered to match so logins don't rehash
+    utils.BCRYPT_ROUNDS = 4
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+    users = {}
+    for i in range(count):
+        users[f"user-{i:07d}"] = {
+            "auth": {"email": f"user{i}@example.com", "password": hashed,
+                     "createdAt": "2025-01-01 00:00:00", "lastLoginAt": ""},
+            "profile": {"name": f"User {i}", "phone": "", "role": "user", "status": "active"},
+        }
+    memdb.reference("/").set({"users": users, "admins": {}})
+    email_index.backfill()
+
+
+async def measure(fn, count, logins):
+    samples = []
+    for _ in range(logins):
+        creds = LoginRequest(email=f"user{random.randrange(count)}@example.com", password=PASSWORD)
+        start = time.perf_counter()
+        await fn(creds)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--legacy-logins", type=int, default=20,
+                        help="full scans are slow; fewer samples keep the run short")
+    args = parser.parse_args()
+
+    print(f"{'users':>8}  {'variant':<8}  {'p50 ms':>9}  {'p99 ms':>9}")
+    for count in args.users:
+        seed(count)
+        for name, fn, logins in (("scan", legacy_login, args.legacy_logins),
+                                 ("index", login, args.logins)):
+            p50, p99 = asyncio.run(measure(fn, count, logins))
+            print(f"{count:>8}  {name:<8}  {p50:>9.2f}  {p99:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
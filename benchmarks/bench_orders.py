@@ -0,0 +1,151 @@
+"""
+Order documents: the old client-priced format vs. the compact priced one.
+
+Seeds an in-memory RTDB (ccb_db.memory) with --orders orders placed the way
+the storefront places them, once in each format, and reports bytes stored
+per order plus latency and bytes read from the database for the reads that
+load orders: an admin page (GET /orders?limit=100), a user's history (GET
+/orders/{email}?limit=20) and the full NDJSON export. Legacy documents are
+built by the pre-compact create_order logic. Compact ones go through
+create_order itself, so their times include pricing on the way in and
+expand_order() on the way out.
+
+    python benchmarks/bench_orders.py --orders 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared-assets"))
+sys.path.insert(0, os.path.join(ROOT, "order-service"))
+
+# Run the service against the in-process database
+os.environ["CCB_DB_BACKEND"] = "memory"
+import ccb_db  # noqa: E402
+
+memdb = ccb_db.get_backend()
+
+import app as order_app  # noqa: E402
+from firebase_config import generate_key  # noqa: E402
+from order_listing import export_orders, list_orders  # noqa: E402
+from pricing import product_cache  # noqa: E402
+from user_orders import fetch_user_orders, index_updates  # noqa: E402
+
+PRODUCTS = {f"prod-{i:04d}": {"name": f"Oxford Shirt {i}", "price": round(20 + i % 180 + 0.99, 2),
+                              "stock": 1_000_000, "categoryId": "formal",
+                              "imageUrl": f"/images/products/oxford-{i}.jpg"}
+            for i in range(200)}
+USERS = 250
+
+
+def storefront_order(i):
+    """An OrderRequest as checkout/page.tsx sends it: two or three lines."""
+    email = f"shopper{i % USERS}@example.com"
+    ids = [f"prod-{(i * 7 + k * 13) % len(PRODUCTS):04d}" for k in range(2 + i % 2)]
+    lines = [{"id": p, "name": PRODUCTS[p]["name"], "quantity": 1 + k % 2, "price": PRODUCTS[p]["price"],
+              "size": "M", "color": "Navy", "image": PRODUCTS[p]["imageUrl"]}
+             for k, p in enumerate(ids)]
+    subtotal = sum(line["price"] * line["quantity"] for line in lines)
+    shipping = 0 if subtotal > 100 else 15
+    tax = subtotal * 0.0635
+    return order_app.OrderRequest(
+        userId=email, customerEmail=email, customerName=f"Shopper {i % USERS}",
+        cartItems={line["id"]: {k: v for k, v in line.items() if k != "id"} for line in lines},
+        items=lines, subtotal=subtotal, shipping=shipping, tax=tax,
+        totalPrice=subtotal + shipping + tax, total=subtotal + shipping + tax,
+        date="2025-03-01", shippingAddress="12 Elm Street, Apt 4, New Haven, CT 06511",
+        orderNumber=100000 + i)
+
+
+async def place_legacy(order, created_at):
+    """create_order before server pricing: the request stored as sent."""
+    order_data = {
+        "userId": order.userId,
+        "customerEmail": order.customerEmail or order.userId,
+        "customerName": order.customerName or "Guest",
+        "status": "Pending",
+        "totalPrice": order.totalPrice,
+        "total": order.total or order.totalPrice,
+        "subtotal": order.subtotal,
+        "shipping": order.shipping,
+        "tax": order.tax,
+        "items": order.items or order.cartItems,
+        "cartItems": order.cartItems,
+        "shippingAddress": order.shippingAddress,
+        "orderNumber": order.orderNumber,
+        "date": order.date,
+        "createdAt": created_at,
+        "updatedAt": created_at,
+        "paymentId": "",
+        "reservation": {"items": {p: e["quantity"] for p, e in order.cartItems.items()},
+                        "expiresAt": 1_740_000_000_000},
+    }
+    order_id = generate_key()
+    updates = {f"orders/{order_id}": order_data}
+    updates.update(index_updates(order_id, order_data))
+    await order_app.db.update(updates)
+
+
+async def place_compact(order, created_at):
+    await order_app.create_order(order)
+
+
+async def drain(rows):
+    return [row async for row in rows]
+
+
+async def measure(call, runs):
+    samples = []
+    for _ in range(runs):
+        before = memdb.bytes_read
+        start = time.perf_counter()
+        await call()
+        samples.append(((time.perf_counter() - start) * 1000, memdb.bytes_read - before))
+    return statistics.median(ms for ms, _ in samples), samples[-1][1]
+
+
+async def run_variant(name, place, args):
+    memdb.reference("/").set({"products": PRODUCTS})
+    memdb.wait_for_events()  # the listener picks up the new catalog
+    start_time = datetime(2025, 3, 1)
+    started = time.perf_counter()
+    for i in range(args.orders):
+        await place(storefront_order(i), (start_time + timedelta(seconds=i)).isoformat())
+    place_ms = (time.perf_counter() - started) * 1000 / args.orders
+    orders = memdb.reference("orders").get() or {}
+    per_order = len(json.dumps(orders, separators=(",", ":"))) / len(orders)
+
+    db = order_app.db
+    reads = (
+        ("admin page", lambda: list_orders(db, limit=100)),
+        ("history", lambda: fetch_user_orders(db, "shopper7@example.com", limit=20)),
+        ("export", lambda: drain(export_orders(db))),
+    )
+    print(f"{name:<8} {per_order:>10.0f} {place_ms:>9.2f}", end="")
+    for _, call in reads:
+        p50, nbytes = await measure(call, args.runs)
+        print(f" {p50:>9.1f} {nbytes / 1024:>9.0f}", end="")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    product_cache.start_listener()
+    print(f"{'format':<8} {'B/order':>10} {'place ms':>9}"
+          + "".join(f" {label + ' ms':>9} {'KB':>9}" for label in ("page", "history", "export")))
+    for name, place in (("legacy", place_legacy), ("compact", place_compact)):
+        asyncio.run(run_variant(name, place, args))
+
+
+if __name__ == "__main__":
+    main()
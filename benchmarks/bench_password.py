@@ -0,0 +1,101 @@
+"""
+Login throughput at different bcrypt cost factors and hash pool sizes.
+
+Runs concurrent /auth/login calls through the user-profile-service router
+against an in-memory RTDB (ccb_db.memory) and reports logins/second, latency and
+how many requests were shed with 429.
+
+    python benchmarks/bench_password.py --costs 8 10 12 --pools 1 2 4 --clients 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared-assets"))
+sys.path.insert(0, os.path.join(ROOT, "user-profile-service"))
+
+# Run the service against the in-process database
+os.environ["CCB_DB_BACKEND"] = "memory"
+import ccb_db  # noqa: E402
+
+memdb = ccb_db.get_backend()
+
+from fastapi import HTTPException  # noqa: E402
+from models import LoginRequest  # noqa: E402
+from routers.auth import login  # noqa: E402
+import email_index  # noqa: E402
+import utils  # noqa: E402
+
+PASSWORD = "hunter2"
+USERS = 50
+
+
+def configure(cost, pool, queue):
+    utils.BCRYPT_ROUNDS = cost
+    utils._hash_pool = ThreadPoolExecutor(max_workers=pool, thread_name_prefix="bcrypt")
+    utils._hash_slots = threading.BoundedSemaphore(pool + queue)
+
+
+def seed(cost):
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(cost)).decode()
+    memdb.reference("/").set({"users": {
+        f"user-{i}": {"auth": {"email": f"user{i}@example.com", "password": hashed},
+                      "profile": {"name": f"User {i}", "role": "user", "status": "active"}}
+        for i in range(USERS)
+    }})
+    email_index.backfill()
+
+
+async def run(clients, duration):
+    samples, shed = [], [0]
+    deadline = time.perf_counter() + duration
+
+    async def client(n):
+        i = n
+        while time.perf_counter() < deadline:
+            creds = LoginRequest(email=f"user{i % USERS}@example.com", password=PASSWORD)
+            start = time.perf_counter()
+            try:
+                await login(creds)
+                samples.append(time.perf_counter() - start)
+            except HTTPException as e:
+                if e.status_code != 429:
+                    raise
+                shed[0] += 1
+                await asyncio.sleep(0.01)
+            i += clients
+
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    samples.sort()
+    p50 = samples[len(samples) // 2] * 1000 if samples else 0
+    p99 = samples[int(len(samples) * 0.99) - 1] * 1000 if samples else 0
+    return len(samples) / duration, p50, p99, shed[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--costs", type=int, nargs="+", default=[8, 10, 12])
+    parser.add_argument("--pools", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--queue", type=int, default=16, help="HASH_MAX_QUEUE")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'cost':>4}  {'pool':>4}  {'logins/s':>9}  {'p50 ms':>8}  {'p99 ms':>8}  {'429s':>6}")
+    for cost in args.costs:
+        seed(cost)
+        for pool in args.pools:
+            configure(cost, pool, args.queue)
+            rate, p50, p99, shed = asyncio.run(run(args.clients, args.duration))
+            print(f"{cost:>4}  {pool:>4}  {rate:>9.1f}  {p50:>8.1f}  {p99:>8.1f}  {shed:>6}")
+
+
+if __name__ == "__main__":
+    main()
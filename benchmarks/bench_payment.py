@@ -0,0 +1,107 @@
+"""
+Payment load test: thread-per-order vs. the asyncio payment engine.
+
+Pushes N PENDING orders through an in-memory RTDB (ccb_db.memory) and reports peak
+thread count, peak RSS and wall time for each approach. Each variant runs
+in its own process so their memory high-water marks don't mix.
+
+    python benchmarks/bench_payment.py --orders 1000 --delay 0.5 --concurrency 1000
+"""
+import argparse
+import contextlib
+import io
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared-assets"))
+sys.path.insert(0, os.path.join(ROOT, "payment-service"))
+
+# Run the service against the in-process database
+os.environ["CCB_DB_BACKEND"] = "memory"
+import ccb_db  # noqa: E402
+
+memdb = ccb_db.get_backend()
+
+VARIANTS = ("thread-per-order", "async-engine")
+
+
+def seed_orders(count):
+    memdb.reference("orders").set({
+        f"o{i:06d}": {"userId": f"user{i}@example.com", "status": "PENDING",
+                      "totalPrice": 10 + i % 50, "createdAt": f"2025-01-01T00:00:{i % 60:02d}"}
+        for i in range(count)
+    })
+
+
+def paid_count():
+    return len(memdb.reference("orders").order_by_child("status").equal_to("PAID").get() or {})
+
+
+def run_variant(args):
+    os.environ["PAYMENT_GATEWAY_DELAY"] = str(args.delay)
+    os.environ["PAYMENT_CONCURRENCY"] = str(args.concurrency)
+    from concurrent.futures import ThreadPoolExecutor
+    import main as payment
+    from claims import claim_order
+    from engine import PaymentEngine
+
+    def blocking_payment(order_id, order_data):
+        # The pre-engine flow: one OS thread blocked for the whole gateway call
+        order_data = claim_order(payment.db, order_id)
+        if order_data is None:
+            return
+        time.sleep(args.delay)
+        payment.record_payment(order_id, order_data, {"method": "VISA", "transactionId": "t"})
+
+    def start():
+        if args.variant == "thread-per-order":
+            for order_id, order_data in (memdb.reference("orders").get() or {}).items():
+                threading.Thread(target=blocking_payment, args=(order_id, order_data)).start()
+        else:
+            payment.engine = PaymentEngine(payment.process_payment, max_pending=args.orders)
+            payment.engine.loop.set_default_executor(
+                ThreadPoolExecutor(max_workers=payment.DB_THREADS))
+            payment.reconcile()
+
+    seed_orders(args.orders)
+    peak_threads = threading.active_count()
+    began = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start()
+        while paid_count() < args.orders:
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(0.1)
+    elapsed = time.perf_counter() - began
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(f"{args.variant:<16}  {args.orders:>7}  {peak_threads:>12}  {peak_rss:>11.1f}  {elapsed:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--delay", type=float, default=0.5, help="simulated gateway latency (s)")
+    parser.add_argument("--concurrency", type=int, default=1000,
+                        help="max concurrent gateway calls in the engine")
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args)
+        return
+
+    print(f"{'variant':<16}  {'orders':>7}  {'peak threads':>12}  {'peak RSS MB':>11}  {'wall s':>8}")
+    sys.stdout.flush()
+    for variant in VARIANTS:
+        subprocess.run([sys.executable, __file__, "--orders", str(args.orders),
+                        "--delay", str(args.delay), "--concurrency", str(args.concurrency),
+                        "--variant", variant], check=True)
+
+
+if __name__ == "__main__":
+    main()
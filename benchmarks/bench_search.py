@@ -0,0 +1,113 @@
+"""
+Product search latency: inverted index vs. scanning the catalog.
+
+For each catalog size, builds the search index from generated products and
+times typeahead-style queries three ways:
+
+  index     SearchIndex.search (GET /products/search)
+  scan      Snapshot.query(q=...), the substring filter behind GET /products?q=
+  http      GET /products/search through the app, in-process
+
+It also reports the index build time and the time to re-index one product
+after an update:
+
+    python benchmarks/bench_search.py --products 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared-assets"))
+sys.path.insert(0, os.path.join(ROOT, "catalog-service"))
+
+# Run the service against the in-process database
+os.environ["CCB_DB_BACKEND"] = "memory"
+import ccb_db  # noqa: E402
+
+memdb = ccb_db.get_backend()
+
+import app as catalog  # noqa: E402
+from ccb_catalog import Snapshot  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
+
+COLORS = ["navy", "charcoal", "ivory", "olive", "burgundy", "camel", "slate", "forest", "sand", "black"]
+FABRICS = ["linen", "oxford", "tweed", "flannel", "cashmere", "merino", "poplin", "chambray",
+           "corduroy", "seersucker", "twill", "denim"]
+GARMENTS = ["shirt", "blazer", "chinos", "sweater", "cardigan", "trousers", "overcoat", "tie",
+            "scarf", "polo", "vest", "shorts", "jacket", "peacoat", "henley"]
+CATEGORIES = ["formal", "casual", "heritage", "modern"]
+WORDS = ["classic", "tailored", "relaxed", "soft", "breathable", "durable", "heritage", "coastal",
+         "weekend", "everyday", "lightweight", "warm", "crisp", "garment", "dyed", "washed"]
+QUERIES = ["s", "sh", "shi", "shirt", "linen sh", "navy oxford sh", "cashmere", "formal bl",
+           "relaxed we", "seersucker shorts", "zzz"]
+
+
+def generate(count, seed=7):
+    rng = random.Random(seed)
+    products = {}
+    for i in range(count):
+        name = f"{rng.choice(COLORS).title()} {rng.choice(FABRICS).title()} {rng.choice(GARMENTS).title()}"
+        if i % 5 == 0:
+            name += f" No. {i}"
+        products[f"p{i:06d}"] = {
+            "name": name, "price": 20 + i % 280, "stock": i % 30,
+            "categoryId": CATEGORIES[i % len(CATEGORIES)],
+            "description": " ".join(rng.choice(WORDS) for _ in range(12)),
+        }
+    return products
+
+
+def measure(fn, runs):
+    samples = []
+    for _ in range(runs):
+        for q in QUERIES:
+            start = time.perf_counter()
+            fn(q)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--products", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--runs", type=int, default=20, help="passes over the query set")
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'build s':>8} {'update ms':>9}  {'variant':<6} {'p50 ms':>8} {'p95 ms':>8}")
+    for count in args.products:
+        products = generate(count)
+        index = SearchIndex()
+        start = time.perf_counter()
+        index.apply(products)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(100):
+            product_id = f"p{i * (count // 100):06d}"
+            index.apply({product_id: {**products[product_id], "name": f"Updated Linen Shirt {i}"}})
+        update_ms = (time.perf_counter() - start) * 1000 / 100
+
+        snapshot = Snapshot(products)
+        results = [("index", measure(lambda q: index.search(q, 10), args.runs)),
+                   ("scan", measure(lambda q: snapshot.query(q=q, limit=10), args.runs))]
+        memdb.reference("products").set(products)
+        with TestClient(catalog.app) as client:
+            # The service builds its own index from the listener's first event
+            while len(catalog.search_index) != len(products):
+                time.sleep(0.05)
+            results.append(("http", measure(
+                lambda q: client.get("/products/search", params={"q": q}), args.runs)))
+        for n, (name, (p50, p95)) in enumerate(results):
+            lead = f"{count:>9} {build:>8.2f} {update_ms:>9.3f}" if n == 0 else " " * 28
+            print(f"{lead}  {name:<6} {p50:>8.3f} {p95:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
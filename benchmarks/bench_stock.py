@@ -0,0 +1,151 @@
+"""
+Checkout against one hot product: oversell check and throughput.
+
+Starts the RTDB emulator (adding --latency ms to every database request) and
+--replicas order-service processes, gives one product --stock units, then
+fires --checkouts concurrent POST /order requests for it (--concurrency in
+flight, spread over the replicas). Afterwards it checks the books:
+
+  - accepted orders == units taken from stock, and stock never below zero
+  - every accepted order holds exactly one unit in its `reservation`
+
+and reports throughput and latency. Each variant runs on a fresh database;
+"unbatched" sets STOCK_MAX_BATCH=1, i.e. one conditional write per checkout:
+
+    python benchmarks/bench_stock.py --stock 500 --checkouts 2000 --concurrency 100
+
+Exits non-zero if any variant oversold.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench_e2e import ROOT, start_process, stop_processes, summarize, wait_for_http
+
+HOT = "prod-hot"
+VARIANTS = {"batched": {}, "unbatched": {"STOCK_MAX_BATCH": "1"}}
+
+
+async def checkout(args, urls):
+    samples, statuses = [], {}
+    queue = asyncio.Queue()
+    for i in range(args.checkouts):
+        queue.put_nowait(i)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def worker():
+            while not queue.empty():
+                i = queue.get_nowait()
+                email = f"buyer{i}@loadtest.local"
+                start = time.perf_counter()
+                try:
+                    response = await client.post(f"{urls[i % len(urls)]}/order", json={
+                        "userId": email, "customerEmail": email, "totalPrice": 25.0,
+                        "cartItems": {HOT: {"quantity": 1, "price": 25.0, "name": "Hot"}},
+                        "status": "PENDING",
+                    })
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = "error"
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    samples.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    return samples, statuses, elapsed
+
+
+def check_books(db_url, stock):
+    """(problems, final stock, accepted orders) from the database after a run."""
+    final = httpx.get(f"{db_url}/products/{HOT}/stock.json").json()
+    orders = httpx.get(f"{db_url}/orders.json", timeout=60).json() or {}
+    held = [order.get("reservation", {}).get("items", {}).get(HOT) for order in orders.values()]
+    problems = []
+    if final is None or final < 0:
+        problems.append(f"stock is {final}")
+    elif len(orders) != stock - final:
+        problems.append(f"{len(orders)} orders but {stock - final} units taken")
+    if any(quantity != 1 for quantity in held):
+        problems.append("orders without a one-unit reservation")
+    return problems, final, len(orders)
+
+
+def run_variant(name, extra_env, args):
+    db_url = f"http://127.0.0.1:{args.emulator_port}"
+    env = dict(os.environ)
+    env.update({
+        "CCB_DB_BACKEND": "emulator",
+        "CCB_DB_EMULATOR_HOST": f"127.0.0.1:{args.emulator_port}",
+        "PYTHONUNBUFFERED": "1",
+        **extra_env,
+    })
+    procs = []
+    try:
+        emulator = start_process(["-m", "ccb_db.emulator", "--port", str(args.emulator_port),
+                                  "--latency", str(args.latency)],
+                                 os.path.join(ROOT, "shared-assets"), env,
+                                 os.path.join(args.logs, f"{name}-emulator.log"))
+        procs.append(emulator)
+        wait_for_http(f"{db_url}/.json?shallow=true", emulator)
+        httpx.put(f"{db_url}/products.json", json={
+            HOT: {"name": "Hot", "price": 25.0, "stock": args.stock, "categoryId": "formal"},
+        }).raise_for_status()
+
+        urls = []
+        for replica in range(args.replicas):
+            port = args.base_port + replica
+            proc = start_process(["-m", "uvicorn", "app:app", "--port", str(port),
+                                  "--log-level", "warning"],
+                                 os.path.join(ROOT, "order-service"), env,
+                                 os.path.join(args.logs, f"{name}-order-{replica}.log"))
+            procs.append(proc)
+            urls.append(f"http://127.0.0.1:{port}")
+            wait_for_http(f"{urls[-1]}/docs", proc)
+
+        samples, statuses, elapsed = asyncio.run(checkout(args, urls))
+        problems, final, accepted = check_books(db_url, args.stock)
+        if statuses.get(200, 0) != accepted:
+            problems.append(f"{statuses.get(200, 0)} checkouts accepted but {accepted} orders written")
+    finally:
+        stop_processes(procs)
+
+    stats = summarize(samples, 0, elapsed)
+    print(f"{name:<10} {accepted:>8} {statuses.get(409, 0):>8} "
+          f"{sum(v for k, v in statuses.items() if k not in (200, 409)):>6} {final:>6} "
+          f"{args.checkouts / elapsed:>8.1f} {stats['p50_ms'] or 0:>8.1f} {stats['p95_ms'] or 0:>8.1f}  "
+          f"{'; '.join(problems) or 'ok'}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--stock", type=int, default=500, help="units of the hot product")
+    parser.add_argument("--checkouts", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--replicas", type=int, default=2, help="order-service processes")
+    parser.add_argument("--latency", type=float, default=20,
+                        help="milliseconds the emulator adds to every database request")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--emulator-port", type=int, default=9100)
+    parser.add_argument("--base-port", type=int, default=18002,
+                        help="order-service replicas listen on this and the following ports")
+    parser.add_argument("--logs", default=os.path.join(tempfile.gettempdir(), "ccb-bench-logs"),
+                        help="directory for service logs")
+    args = parser.parse_args()
+    os.makedirs(args.logs, exist_ok=True)
+
+    print(f"{'variant':<10} {'accepted':>8} {'sold out':>8} {'other':>6} {'stock':>6} "
+          f"{'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}  books")
+    ok = all([run_variant(name, VARIANTS[name], args) for name in args.variants])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
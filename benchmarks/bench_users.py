@@ -0,0 +1,101 @@
+"""
+Admin user listing: full `users` tree download vs. the userSummaries projection.
+
+Seeds an in-memory RTDB (ccb_db.memory) with N users and times the admin
+listing, reporting latency and bytes read from the database per call. The
+in-memory database scans every child on each ordered query (RTDB uses its
+index), so for the paged variants bytes read is the number to compare.
+
+    python benchmarks/bench_users.py --users 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared-assets"))
+sys.path.insert(0, os.path.join(ROOT, "user-profile-service"))
+
+# Run the service against the in-process database
+os.environ["CCB_DB_BACKEND"] = "memory"
+import ccb_db  # noqa: E402
+
+memdb = ccb_db.get_backend()
+
+import user_summaries  # noqa: E402
+from user_summaries import list_summaries  # noqa: E402
+
+# A real bcrypt hash is this long; the listing never needs it
+HASH = "$2b$12$" + "x" * 53
+
+
+async def legacy_list_users():
+    """The pre-projection implementation of GET /users/."""
+    users_data = memdb.reference("users").get() or {}
+    users_list = []
+    for uid, data in users_data.items():
+        if not isinstance(data, dict):
+            continue
+        users_list.append({
+            "id": uid,
+            "email": data.get("auth", {}).get("email", ""),
+            "name": data.get("profile", {}).get("name", ""),
+            "phone": data.get("profile", {}).get("phone", ""),
+            "role": data.get("profile", {}).get("role", "user"),
+            "status": data.get("profile", {}).get("status", "active"),
+            "createdAt": data.get("auth", {}).get("createdAt", ""),
+            "lastLoginAt": data.get("auth", {}).get("lastLoginAt", ""),
+        })
+    return users_list
+
+
+def seed(count):
+    users = {}
+    for i in range(count):
+        users[f"user-{i:07d}"] = {
+            "auth": {"email": f"user{i}@example.com", "password": HASH,
+                     "createdAt": "2025-01-01 00:00:00", "lastLoginAt": ""},
+            "profile": {"name": f"User {i}", "phone": "555-0100", "role": "user",
+                        "status": "suspended" if i % 50 == 0 else "active"},
+            "cart": {"prod-1": {"productId": "prod-1", "quantity": 1, "price": 10}},
+        }
+    memdb.reference("/").set({"users": users, "admins": {}})
+    user_summaries.backfill()
+
+
+async def measure(call, runs):
+    samples = []
+    for _ in range(runs):
+        before = memdb.bytes_read
+        start = time.perf_counter()
+        await call()
+        samples.append(((time.perf_counter() - start) * 1000, memdb.bytes_read - before))
+    return statistics.median(ms for ms, _ in samples), samples[-1][1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    variants = (
+        ("full tree", legacy_list_users),
+        ("all summaries", lambda: list_summaries("users")),
+        ("page of 50", lambda: list_summaries("users", limit=50)),
+        ("email prefix", lambda: list_summaries("users", email="user123", limit=50)),
+        ("suspended", lambda: list_summaries("users", status="suspended", limit=50)),
+    )
+    print(f"{'users':>8}  {'variant':<14}  {'p50 ms':>9}  {'KB read':>9}")
+    for count in args.users:
+        seed(count)
+        for name, call in variants:
+            p50, nbytes = asyncio.run(measure(call, args.runs))
+            print(f"{count:>8}  {name:<14}  {p50:>9.2f}  {nbytes / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Wishlist hydration: one GET /wishlist vs. a catalog-service call per item.
+
+Starts the RTDB emulator (adding --latency ms to every database request),
+catalog-service and wishlist-service, seeds --products products and one
+wishlist per size (default 10, 100 and 1000 items), then reads each
+wishlist --rounds times both ways:
+
+  per-item   GET /wishlist/ids, then GET /products/{id} on catalog-service
+             for every id, --connections at a time (a browser's limit)
+  batched    GET /wishlist, hydrated by wishlist-service from its catalog
+             snapshot in one pass
+
+    python benchmarks/bench_wishlist.py --sizes 10 100 1000 --latency 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from jose import jwt
+
+from bench_e2e import CATEGORIES, ROOT, start_process, stop_processes, summarize, wait_for_http
+
+# ccb_auth.SECRET_KEY default
+SECRET_KEY = "simple_secret_key"
+
+
+def token(size):
+    return jwt.encode({"sub": f"wisher-{size}", "role": "user"}, SECRET_KEY, algorithm="HS256")
+
+
+async def per_item(wishlist, catalog, headers, connections):
+    ids = (await wishlist.get("/wishlist/ids", headers=headers)).json()["productIds"]
+    gate = asyncio.Semaphore(connections)
+
+    async def fetch(product_id):
+        async with gate:
+            response = await catalog.get(f"/products/{product_id}")
+            response.raise_for_status()
+            return response.json()
+
+    return await asyncio.gather(*(fetch(p) for p in ids))
+
+
+async def batched(wishlist, catalog, headers, connections):
+    response = await wishlist.get("/wishlist", headers=headers)
+    response.raise_for_status()
+    return response.json()["items"]
+
+
+async def measure(args, wishlist_url, catalog_url):
+    limits = httpx.Limits(max_connections=args.connections)
+    async with httpx.AsyncClient(base_url=wishlist_url, limits=limits, timeout=120) as wishlist, \
+            httpx.AsyncClient(base_url=catalog_url, limits=limits, timeout=120) as catalog:
+        for size in args.sizes:
+            headers = {"Authorization": f"Bearer {token(size)}"}
+            for name, read in (("per-item", per_item), ("batched", batched)):
+                samples = []
+                started = time.perf_counter()
+                for _ in range(args.rounds):
+                    start = time.perf_counter()
+                    items = await read(wishlist, catalog, headers, args.connections)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    if len(items) != size:
+                        raise RuntimeError(f"{name}: {len(items)} items, expected {size}")
+                stats = summarize(samples, 0, time.perf_counter() - started)
+                print(f"{size:>6} {name:<9} {1 + size if name == 'per-item' else 1:>9} "
+                      f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="wishlist lengths")
+    parser.add_argument("--products", type=int, default=2000, help="catalog size")
+    parser.add_argument("--rounds", type=int, default=20, help="reads per size and variant")
+    parser.add_argument("--connections", type=int, default=6,
+                        help="concurrent catalog requests for the per-item variant")
+    parser.add_argument("--latency", type=float, default=20,
+                        help="milliseconds the emulator adds to every database request")
+    parser.add_argument("--emulator-port", type=int, default=9100)
+    parser.add_argument("--catalog-port", type=int, default=18001)
+    parser.add_argument("--port", type=int, default=18004, help="wishlist service port")
+    parser.add_argument("--logs", default=os.path.join(tempfile.gettempdir(), "ccb-bench-logs"),
+                        help="directory for service logs")
+    args = parser.parse_args()
+    os.makedirs(args.logs, exist_ok=True)
+    if max(args.sizes) > args.products:
+        parser.error("--products must be at least the largest wishlist size")
+
+    db_url = f"http://127.0.0.1:{args.emulator_port}"
+    env = dict(os.environ)
+    env.update({
+        "CCB_DB_BACKEND": "emulator",
+        "CCB_DB_EMULATOR_HOST": f"127.0.0.1:{args.emulator_port}",
+        "PYTHONUNBUFFERED": "1",
+    })
+    procs = []
+    try:
+        emulator = start_process(["-m", "ccb_db.emulator", "--port", str(args.emulator_port),
+                                  "--latency", str(args.latency)],
+                                 os.path.join(ROOT, "shared-assets"), env,
+                                 os.path.join(args.logs, "wishlist-emulator.log"))
+        procs.append(emulator)
+        wait_for_http(f"{db_url}/.json?shallow=true", emulator)
+        product_ids = [f"prod-{i:05d}" for i in range(args.products)]
+        httpx.put(f"{db_url}/products.json", json={
+            product_id: {"name": f"Product {i}", "price": round(10 + i % 290 + 0.99, 2),
+                         "stock": i % 40, "categoryId": CATEGORIES[i % len(CATEGORIES)],
+                         "imageUrl": f"/img/{product_id}.jpg"}
+            for i, product_id in enumerate(product_ids)
+        }, timeout=60).raise_for_status()
+        httpx.put(f"{db_url}/wishlists.json", json={
+            f"wisher-{size}": {product_id: 1_700_000_000_000 + i
+                               for i, product_id in enumerate(product_ids[:size])}
+            for size in args.sizes
+        }, timeout=60).raise_for_status()
+
+        for service, port in (("catalog", args.catalog_port), ("wishlist", args.port)):
+            proc = start_process(["-m", "uvicorn", "app:app", "--port", str(port),
+                                  "--log-level", "warning"],
+                                 os.path.join(ROOT, f"{service}-service"), env,
+                                 os.path.join(args.logs, f"wishlist-{service}.log"))
+            procs.append(proc)
+            wait_for_http(f"http://127.0.0.1:{port}/docs", proc)
+
+        print(f"{'items':>6} {'variant':<9} {'requests':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        asyncio.run(measure(args, f"http://127.0.0.1:{args.port}",
+                            f"http://127.0.0.1:{args.catalog_port}"))
+    finally:
+        stop_processes(procs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import os
+import sys
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.security import OAuth2PasswordBearer
+from pydantic import BaseModel, Field
+from typing import Optional
+
+# Shared data-access layer in ../shared-assets/ccb_db (same layout in the Docker images)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared-assets"))
+from ccb_auth import InvalidTokenError, verify_token  # noqa: E402
+from ccb_metrics import instrument  # noqa: E402
+from cart_store import cart_store  # noqa: E402
+
+# --- CONFIGURATION ---
+# Database backend (Firebase, local emulator or in-memory) is chosen by CCB_DB_BACKEND;
+# cache size and flush interval are read in cart_store.py
+
+MAX_QUANTITY = 99
+MAX_LINES = 100
+
+app = FastAPI(title="CCB Cart Service")
+instrument(app)
+
+@app.on_event("startup")
+async def start_cart_store():
+    await cart_store.start()
+
+@app.on_event("shutdown")
+async def stop_cart_store():
+    await cart_store.stop()
+
+# --- CORS ---
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Tokens come from user-profile-service (POST /auth/login)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+
+async def current_user_id(token: str = Depends(oauth2_scheme)):
+    """The signed-in shopper's id; carts belong to `users` accounts only."""
+    try:
+        claims = verify_token(token)
+    except InvalidTokenError:
+        raise HTTPException(401, "Invalid token")
+    if claims.get("role") != "user":
+        raise HTTPException(403, "Only customer accounts have a cart")
+    return claims["sub"]
+
+# --- MODELS ---
+class AddItem(BaseModel):
+    productId: str = Field(..., min_length=1, pattern=r"^[^/.#$\[\]]+$")
+    quantity: int = Field(1, ge=1, le=MAX_QUANTITY)
+    price: Optional[float] = None
+
+class UpdateQuantity(BaseModel):
+    quantity: int = Field(..., ge=0, le=MAX_QUANTITY)
+
+def cart_response(cart):
+    items = [{"productId": product_id, **line} for product_id, line in cart.items()]
+    return {
+        "items": items,
+        "count": sum(line["quantity"] for line in cart.values()),
+        "subtotal": round(sum((line.get("price") or 0) * line["quantity"] for line in cart.values()), 2),
+    }
+
+# --- ROUTES ---
+
+@app.get("/cart")
+async def get_cart(user_id: str = Depends(current_user_id)):
+    """The shopper's cart, from memory once loaded"""
+    return cart_response(await cart_store.get(user_id))
+
+@app.post("/cart/items")
+async def add_item(item: AddItem, user_id: str = Depends(current_user_id)):
+    """Add a product (quantities add up if it is already in the cart)"""
+    cart = await cart_store.get(user_id)
+    line = cart.get(item.productId)
+    if line is None and len(cart) >= MAX_LINES:
+        raise HTTPException(400, f"A cart holds at most {MAX_LINES} products")
+    if line is not None and line["quantity"] + item.quantity > MAX_QUANTITY:
+        raise HTTPException(400, f"At most {MAX_QUANTITY} of a product")
+    return cart_response(await cart_store.add(user_id, item.productId, item.quantity, item.price))
+
+@app.put("/cart/items/{product_id}")
+async def update_item(product_id: str, update: UpdateQuantity, user_id: str = Depends(current_user_id)):
+    """Set a product's quantity; 0 removes it"""
+    cart = await cart_store.set_quantity(user_id, product_id, update.quantity)
+    if cart is None:
+        raise HTTPException(404, "Product not in cart")
+    return cart_response(cart)
+
+@app.delete("/cart/items/{product_id}")
+async def remove_item(product_id: str, user_id: str = Depends(current_user_id)):
+    """Remove a product from the cart"""
+    cart = await cart_store.remove(user_id, product_id)
+    if cart is None:
+        raise HTTPException(404, "Product not in cart")
+    return cart_response(cart)
+
+@app.delete("/cart")
+async def clear_cart(user_id: str = Depends(current_user_id)):
+    """Empty the cart (e.g. after checkout)"""
+    return cart_response(await cart_store.clear(user_id))
+
+@app.get("/")
+async def root():
+    return {"message": "Service Running", **cart_store.metrics()}
@@ -0,0 +1,200 @@
+"""
+In-memory cart store with write-behind persistence.
+
+Carts are served from a per-process LRU of at most `max_size` users, so adding,
+changing and reading a cart cost no database round trip once the cart is
+loaded. Changed carts are marked dirty. Every `flush_interval` seconds all
+dirty carts go to the database in one multi-path update (chunked), so ten
+clicks on one cart in an interval cost a single path write. Only clean carts
+are evicted; a dirty one stays until it has been flushed.
+
+A cart lives at `carts/{userId}` as `{"items": {productId: {"quantity",
+"price"}}, "updatedAt": ms}`; an empty cart is deleted. On startup the most
+recently updated carts (up to `max_size`) are loaded with one query, so a
+restart doesn't turn the next clicks into cold reads. Anything changed in
+the last `flush_interval` before a crash is lost; a clean shutdown flushes.
+
+With flush_interval=0 every change is written before it returns (write-through).
+
+The store assumes it is the only writer of a cart: run one replica, or
+route each user to the same one.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+from ccb_db import aio
+
+CART_PATH = "carts"
+# Carts kept in memory (LRU)
+CART_CACHE_SIZE = int(os.environ.get("CART_CACHE_SIZE", "10000"))
+# Seconds between write-behind flushes (0 = write every change immediately)
+CART_FLUSH_INTERVAL = float(os.environ.get("CART_FLUSH_INTERVAL", "1.0"))
+# Carts per multi-path update
+CART_FLUSH_CHUNK = 500
+
+
+def cart_path(user_id: str) -> str:
+    return f"{CART_PATH}/{user_id}"
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class CartStore:
+    def __init__(self, max_size=CART_CACHE_SIZE, flush_interval=CART_FLUSH_INTERVAL):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._carts = OrderedDict()  # user id -> {productId: {"quantity", "price"}}
+        self._loading = {}  # user id -> future of an in-flight load
+        self._dirty = {}  # user id -> version of the change not yet flushed
+        self._version = 0
+        self._flusher = None
+        self.loads = 0
+        self.flushes = 0
+        self.paths_written = 0
+
+    # --- reads ---
+
+    async def get(self, user_id):
+        """The user's cart, {productId: {"quantity", "price"}} (do not modify)."""
+        cart = self._carts.get(user_id)
+        if cart is not None:
+            self._carts.move_to_end(user_id)
+            return cart
+        # One read per user however many requests arrive while it is loading
+        loading = self._loading.get(user_id)
+        if loading is None:
+            loading = self._loading[user_id] = asyncio.ensure_future(self._load(user_id))
+            loading.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        return await asyncio.shield(loading)
+
+    async def _load(self, user_id):
+        data = await aio.reference(cart_path(user_id)).get() or {}
+        self.loads += 1
+        # A change made while we were reading wins over what we read
+        cart = self._carts.get(user_id)
+        if cart is None:
+            cart = {k: v for k, v in (data.get("items") or {}).items() if isinstance(v, dict)}
+            self._store(user_id, cart)
+        return cart
+
+    # --- writes ---
+
+    async def _current(self, user_id):
+        """
+        A copy of the cart to change. Requests waiting on the same load all
+        get the cart as loaded, so take what is stored now: changes made by
+        the ones that resumed first are in it. There is no await between
+        this and _change(), so nothing can slip in between.
+        """
+        loaded = await self.get(user_id)
+        return dict(self._carts.get(user_id, loaded))
+
+    async def add(self, user_id, product_id, quantity, price=None):
+        """Add `quantity` of a product (creating the line if needed)."""
+        cart = await self._current(user_id)
+        line = dict(cart.get(product_id) or {"quantity": 0})
+        line["quantity"] += quantity
+        if price is not None:
+            line["price"] = price
+        cart[product_id] = line
+        return await self._change(user_id, cart)
+
+    async def set_quantity(self, user_id, product_id, quantity):
+        """Set a line's quantity; 0 removes it. Returns None if the line doesn't exist."""
+        cart = await self._current(user_id)
+        if product_id not in cart:
+            return None
+        if quantity:
+            cart[product_id] = {**cart[product_id], "quantity": quantity}
+        else:
+            del cart[product_id]
+        return await self._change(user_id, cart)
+
+    async def remove(self, user_id, product_id):
+        """Drop a line. Returns None if it wasn't there."""
+        return await self.set_quantity(user_id, product_id, 0)
+
+    async def clear(self, user_id):
+        return await self._change(user_id, {})
+
+    async def _change(self, user_id, cart):
+        self._store(user_id, cart)
+        self._version += 1
+        self._dirty[user_id] = self._version
+        if not self.flush_interval:
+            await self.flush([user_id])
+        return cart
+
+    def _store(self, user_id, cart):
+        self._carts[user_id] = cart
+        self._carts.move_to_end(user_id)
+        if len(self._carts) > self.max_size:
+            # Least recently used clean carts go; dirty ones wait for their flush
+            for old_id in list(self._carts):
+                if len(self._carts) <= self.max_size:
+                    break
+                if old_id not in self._dirty and old_id != user_id:
+                    del self._carts[old_id]
+
+    # --- persistence ---
+
+    async def flush(self, user_ids=None):
+        """Write dirty carts (all, or just `user_ids`) to the database."""
+        pending = [(u, self._dirty[u]) for u in (user_ids or list(self._dirty)) if u in self._dirty]
+        now = _now_ms()
+        for start in range(0, len(pending), CART_FLUSH_CHUNK):
+            chunk = pending[start:start + CART_FLUSH_CHUNK]
+            updates = {}
+            for user_id, _ in chunk:
+                cart = self._carts.get(user_id)
+                updates[cart_path(user_id)] = {"items": cart, "updatedAt": now} if cart else None
+            await aio.reference("/").update(updates)
+            self.flushes += 1
+            self.paths_written += len(updates)
+            for user_id, version in chunk:
+                # Changed again while we were writing: stays dirty for the next flush
+                if self._dirty.get(user_id) == version:
+                    del self._dirty[user_id]
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                # Still dirty; the next tick tries again
+                print(f"Cart flush of {len(self._dirty)} carts failed: {e}")
+
+    async def start(self):
+        """Load the most recently updated carts and start the flusher."""
+        try:
+            recent = await aio.reference(CART_PATH).order_by_child("updatedAt") \
+                .limit_to_last(self.max_size).get() or {}
+        except Exception as e:
+            print(f"Cart snapshot not loaded, starting cold: {e}")
+            recent = {}
+        for user_id, data in recent.items():
+            if isinstance(data, dict) and user_id not in self._carts:
+                self._store(user_id, {k: v for k, v in (data.get("items") or {}).items()
+                                      if isinstance(v, dict)})
+        print(f"Loaded {len(recent)} carts")
+        if self.flush_interval:
+            self._flusher = asyncio.ensure_future(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flusher and write what is still dirty."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    def metrics(self):
+        return {"carts": len(self._carts), "dirty": len(self._dirty), "loads": self.loads,
+                "flushes": self.flushes, "pathsWritten": self.paths_written}
+
+
+cart_store = CartStore()
@@ -1,33 +1,49 @@
+import asyncio
+import hashlib
 import json
 import os
-from fastapi import FastAPI, HTTPException
+import sys
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
-import firebase_admin
-from firebase_admin import credentials, db
+from typing import Optional
+from models import BulkDelete, Product
 
-# --- CONFIGURATION ---
-# Check K8s mounted path first, then fall back to local file
-CRED_PATH = os.environ.get(
-    "GOOGLE_APPLICATION_CREDENTIALS",
-    "/app/serviceAccountKey.json"  # K8s mounted path
-)
-if not os.path.exists(CRED_PATH):
-    CRED_PATH = "serviceAccountKey.json"  # Local fallback
+# Shared data-access layer in ../shared-assets/ccb_db (same layout in the Docker images)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared-assets"))
+from ccb_db import reference  # noqa: E402
+from ccb_db import aio  # noqa: E402
+from ccb_catalog import ProductCache, SORTS  # noqa: E402
+from ccb_metrics import instrument  # noqa: E402
+from product_import import delete_products, import_products, iter_csv, iter_json, iter_ndjson  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
 
-DATABASE_URL = "https://ccb-db-41f73-default-rtdb.firebaseio.com/"
+# --- CONFIGURATION ---
+# Database backend (Firebase, local emulator or in-memory) is chosen by CCB_DB_BACKEND
 
-# --- FIREBASE SETUP ---
-if not firebase_admin._apps:
-    if not os.path.exists(CRED_PATH):
-        raise RuntimeError(f"FATAL: serviceAccountKey.json not found at {CRED_PATH}")
-    cred = credentials.Certificate(CRED_PATH)
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': DATABASE_URL
-    })
+# Seconds before the product snapshot is reloaded when the listener is down
+PRODUCT_CACHE_TTL = float(os.environ.get("PRODUCT_CACHE_TTL", "30"))
 
 app = FastAPI()
+instrument(app)
+
+product_cache = ProductCache(reference('products'), ttl=PRODUCT_CACHE_TTL)
+# Follows the snapshot, re-indexing only the products each change touches
+search_index = SearchIndex()
+product_cache.add_watcher(search_index.apply)
+
+@app.on_event("startup")
+def start_product_cache():
+    product_cache.start_listener()
+
+@app.on_event("shutdown")
+def stop_product_cache():
+    product_cache.stop_listener()
+
+async def current_snapshot():
+    """The product snapshot; a reload (rare: listener down or our own write) runs off the event loop."""
+    if product_cache.needs_reload():
+        return await asyncio.to_thread(product_cache.snapshot)
+    return product_cache.snapshot()
 
 # --- CORS ---
 app.add_middleware(
@@ -38,56 +54,151 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- MODELS ---
-class Product(BaseModel):
-    name: str
-    price: float
-    description: Optional[str] = None
-    stock: int = 0
-    categoryId: str = "general"
-    imageUrl: Optional[str] = ""  # This is the field we added
+# Content types accepted by POST /products/bulk
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
 
 # --- ROUTES ---
 
 @app.get("/products")
-def get_products():
-    """Fetch all products"""
-    ref = db.reference('products')
-    data = ref.get()
-    
-    if not data:
-        return []
-    
-    product_list = []
-    for key, value in data.items():
-        value['id'] = key
-        product_list.append(value)
-        
-    return product_list
+async def get_products(
+    request: Request,
+    categoryId: Optional[str] = None,
+    minPrice: Optional[float] = None,
+    maxPrice: Optional[float] = None,
+    inStock: bool = False,
+    q: Optional[str] = None,
+    sort: str = Query("id", pattern="^(" + "|".join(SORTS) + ")$"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """
+    Fetch products (served from the in-memory snapshot).
+    Optional filters, sort and limit/cursor paging; when a page is cut short
+    the cursor for the next one is returned in the X-Next-Cursor header.
+    """
+    snapshot = await current_snapshot()
+
+    if not request.query_params:
+        # Unfiltered catalog: pre-serialized body
+        body, etag = snapshot.body, snapshot.etag
+        next_cursor = None
+    else:
+        # Filtered responses are derived from the snapshot, so key the ETag on both
+        query = str(sorted(request.query_params.multi_items()))
+        etag = '"' + hashlib.sha1((snapshot.etag + query).encode()).hexdigest() + '"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        try:
+            page, next_cursor = snapshot.query(categoryId, minPrice, maxPrice, inStock,
+                                               q, sort, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        body = json.dumps(page).encode("utf-8")
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.post("/products/bulk")
+async def bulk_import_products(request: Request, upsert: bool = False):
+    """
+    Create or update many products in one request. The body is a JSON array,
+    NDJSON or CSV (by Content-Type), one product per row; rows with an "id"
+    update that product (or create it under that id with ?upsert=true).
+    Valid rows are written in chunked multi-path updates; the rest come back
+    in "errors" with their row number.
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type in NDJSON_TYPES:
+        rows = iter_ndjson(request.stream())
+    elif content_type in CSV_TYPES:
+        rows = iter_csv(request.stream())
+    elif content_type == "application/json":
+        try:
+            rows = iter_json(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        raise HTTPException(status_code=415, detail="Send application/json, application/x-ndjson or text/csv")
+
+    try:
+        return await import_products(rows, upsert)
+    finally:
+        product_cache.invalidate()
+
+@app.post("/products/bulk/delete")
+async def bulk_delete_products(request: BulkDelete):
+    """Delete many products by id; ids that don't exist come back in notFound"""
+    result = await delete_products(request.ids)
+    product_cache.invalidate()
+    return result
+
+@app.get("/products/availability")
+async def get_availability(ids: str = Query(..., description="Comma-separated product ids")):
+    """
+    Units in stock for up to 500 products, {id: stock} (null for unknown ids),
+    from the in-memory snapshot. Checkout reserves stock with a conditional
+    write (order-service/stock.py), so this is a hint, not a hold.
+    """
+    product_ids = [product_id for product_id in ids.split(",") if product_id]
+    if len(product_ids) > 500:
+        raise HTTPException(status_code=400, detail="At most 500 ids")
+    by_id = (await current_snapshot()).by_id
+    return {product_id: (by_id[product_id].get("stock") or 0) if product_id in by_id else None
+            for product_id in product_ids}
+
+@app.get("/products/search")
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """
+    Ranked search over name, category and description; the last word is
+    matched as a prefix, for typeahead (see search_index.py)
+    """
+    by_id = (await current_snapshot()).by_id
+    return [by_id[product_id] for product_id in search_index.search(q, limit)
+            if product_id in by_id]
+
+@app.get("/products/{product_id}")
+async def get_product(product_id: str):
+    """Fetch a single product by ID"""
+    product = (await current_snapshot()).by_id.get(product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
 
 @app.post("/products")
-def add_product(product: Product):
+async def add_product(product: Product):
     """Add a new product"""
-    ref = db.reference('products')
-    new_product_ref = ref.push(product.dict())
+    ref = aio.reference('products')
+    new_product_ref = await ref.push(product.dict())
+    product_cache.invalidate()
     return {"message": "Added", "id": new_product_ref.key}
 
 @app.delete("/products/{product_id}")
-def delete_product(product_id: str):
+async def delete_product(product_id: str):
     """Delete a product by ID"""
-    ref = db.reference(f'products/{product_id}')
-    if ref.get() is None:
+    ref = aio.reference(f'products/{product_id}')
+    if await ref.get(shallow=True) is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    ref.delete()
+    await ref.delete()
+    product_cache.invalidate()
     return {"message": "Product deleted successfully"}
 
 @app.put("/products/{product_id}")
-def update_product(product_id: str, product: Product):
+async def update_product(product_id: str, product: Product):
     """Update a product by ID"""
-    ref = db.reference(f'products/{product_id}')
-    if ref.get() is None:
+    ref = aio.reference(f'products/{product_id}')
+    if await ref.get(shallow=True) is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    ref.update(product.dict())
+    await ref.update(product.dict())
+    product_cache.invalidate()
     return {"message": "Product updated successfully"}
\ No newline at end of file
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class Product(BaseModel):
+    name: str
+    price: float
+    description: Optional[str] = None
+    stock: int = 0
+    categoryId: str = "general"
+    imageUrl: Optional[str] = ""  # This is the field we added
+
+# Bulk delete
+class BulkDelete(BaseModel):
+    ids: List[str]
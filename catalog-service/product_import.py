@@ -0,0 +1,207 @@
+"""
+Bulk product import and delete (POST /products/bulk, POST /products/bulk/delete).
+
+Rows come from a JSON array, NDJSON (one object per line) or CSV with a
+header row. NDJSON and CSV are parsed as the upload streams in. Each row is
+validated with the `Product` model. A row with an "id" updates that product;
+as with PUT, fields it leaves out go back to their defaults. A row without
+an "id" creates a product under a new push id. Accepted rows are committed
+`chunk_size` at a time, each chunk as one multi-path update of the root. The
+next chunk is parsed while the previous one is being written.
+
+A bad row (invalid JSON or field values, or an id that doesn't exist) is
+reported by its 1-based row number and skipped; the other rows still go in.
+One existence check covers the whole import: a shallow read of `products`.
+"""
+import asyncio
+import codecs
+import csv
+import json
+import os
+
+from pydantic import ValidationError
+
+from ccb_db import aio, generate_key
+from models import Product
+
+# Rows per multi-path update
+IMPORT_CHUNK_SIZE = int(os.environ.get("PRODUCT_IMPORT_CHUNK_SIZE", "500"))
+# RTDB key characters that would turn an id into a different path
+_INVALID_ID_CHARS = set("/.#$[]")
+
+
+# --- parsing ---
+# Every parser yields (row, data, error): data is the row's dict, or None
+# with error saying why the row couldn't be read.
+
+def iter_json(body: bytes):
+    """Rows of a JSON array body. Raises ValueError if the body isn't one."""
+    try:
+        rows = json.loads(body or b"null")
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of products")
+
+    async def generate():
+        for row, data in enumerate(rows, 1):
+            yield row, data, None
+    return generate()
+
+
+async def _lines(chunks):
+    """Decode a streamed UTF-8 body into lines (without line endings)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson(chunks):
+    """Rows of a streamed NDJSON body; blank lines are skipped."""
+    row = 0
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line), None
+        except ValueError as e:
+            yield row, None, f"Invalid JSON: {e}"
+
+
+async def iter_csv(chunks):
+    """
+    Rows of a streamed CSV body. The first record names the columns; empty
+    (or missing trailing) cells are left out so the model defaults apply.
+    """
+    header, record, row = None, None, 0
+    async for line in _lines(chunks):
+        record = line if record is None else record + "\n" + line
+        if record.count('"') % 2:
+            continue  # inside a quoted field that spans lines
+        values = next(csv.reader([record]), [])
+        record = None
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if not any(value.strip() for value in values):
+            continue
+        row += 1
+        if len(values) > len(header):
+            yield row, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row, {name: value for name, value in zip(header, values) if value != ""}, None
+    if record is not None:
+        yield row + 1, None, "Unterminated quoted field"
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}"
+                     for e in error.errors())
+
+
+# --- writing ---
+
+async def _commit(updates, rows, result):
+    """Write one chunk and account for its rows."""
+    try:
+        await aio.reference("/").update(updates)
+    except Exception as e:
+        print(f"Product import chunk of {len(rows)} rows not written: {e}")
+        for row, product_id, _ in rows:
+            result["ids"][row - 1] = None
+            result["errors"].append({"row": row, "id": product_id, "error": f"Write failed: {e}"})
+        return
+    for _, _, created in rows:
+        result["created" if created else "updated"] += 1
+
+
+async def import_products(rows, upsert=False, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validate and write products from an async iterator of (row, data, error).
+    With upsert, a row whose id doesn't exist yet creates it under that id.
+    Returns {"created", "updated", "ids", "errors"}; ids[n - 1] is the id
+    row n was written to (None if it wasn't).
+    """
+    existing = set(await aio.reference("products").get(shallow=True) or {})
+    result = {"created": 0, "updated": 0, "ids": [], "errors": []}
+
+    updates, chunk_rows, chunk_ids = {}, [], set()
+    writing = None  # the previous chunk's write, overlapping with parsing this one
+
+    async def flush():
+        nonlocal updates, chunk_rows, chunk_ids, writing
+        if writing is not None:
+            await writing
+        writing = asyncio.ensure_future(_commit(updates, chunk_rows, result)) if chunk_rows else None
+        updates, chunk_rows, chunk_ids = {}, [], set()
+
+    def reject(row, product_id, error):
+        result["ids"].append(None)
+        result["errors"].append({"row": row, "id": product_id, "error": error})
+
+    try:
+        async for row, data, error in rows:
+            if error is not None:
+                reject(row, None, error)
+                continue
+            if not isinstance(data, dict):
+                reject(row, None, "Expected an object")
+                continue
+            product_id = data.get("id")
+            if product_id is not None:
+                product_id = str(product_id)
+                if not product_id or _INVALID_ID_CHARS & set(product_id):
+                    reject(row, product_id, "Invalid id")
+                    continue
+                if product_id not in existing and not upsert:
+                    reject(row, product_id, "Product not found")
+                    continue
+            try:
+                product = Product(**{k: v for k, v in data.items() if k != "id"}).dict()
+            except ValidationError as e:
+                reject(row, product_id, _validation_message(e))
+                continue
+
+            # A product can't be created and patched in the same multi-path update
+            if product_id in chunk_ids:
+                await flush()
+            if product_id in existing:
+                for field, value in product.items():
+                    updates[f"products/{product_id}/{field}"] = value
+                created = False
+            else:
+                product_id = product_id or generate_key()
+                updates[f"products/{product_id}"] = {k: v for k, v in product.items() if v is not None}
+                existing.add(product_id)
+                created = True
+            chunk_ids.add(product_id)
+            chunk_rows.append((row, product_id, created))
+            result["ids"].append(product_id)
+            if len(chunk_rows) >= chunk_size:
+                await flush()
+    except (ValueError, UnicodeDecodeError) as e:
+        # The body itself is broken; keep what was read up to here
+        result["errors"].append({"row": len(result["ids"]) + 1, "id": None, "error": str(e)})
+
+    await flush()
+    await flush()
+    return result
+
+
+async def delete_products(product_ids, chunk_size=IMPORT_CHUNK_SIZE):
+    """Delete products by id in chunked multi-path updates. Returns {"deleted", "notFound"}."""
+    existing = set(await aio.reference("products").get(shallow=True) or {})
+    ids = list(dict.fromkeys(product_ids))
+    found = [product_id for product_id in ids if product_id in existing]
+    for start in range(0, len(found), chunk_size):
+        await aio.reference("/").update(
+            {f"products/{product_id}": None for product_id in found[start:start + chunk_size]})
+    return {"deleted": found, "notFound": [product_id for product_id in ids if product_id not in existing]}
@@ -0,0 +1,214 @@
+"""
+In-process product search index for GET /products/search.
+
+An inverted index over each product's `name`, `description` and
+`categoryId`. Text is lowercased and split into alphanumeric tokens. Each
+token maps to the products containing it, weighted by field: a name match
+counts most, then the category, then the description. A sorted vocabulary
+makes the last query term a prefix, so "linen sh" already finds "Linen
+Shirt" while the shopper is typing. Every earlier term must match a whole
+token.
+
+Results are ranked by the summed field weights. A term that matches a whole
+token scores full weight; one that only matches a prefix scores half.
+Ties go to the shorter name. Every term must match (AND). Each token's
+list is kept in that rank order, so a query walks one list best first and
+stops as soon as nothing further down can make the top `limit`. A common
+prefix like "s" costs about as much as a rare one.
+
+The index follows the product snapshot: ProductCache tells it which
+products each change touched (see add_watcher in ccb_catalog.py), and only
+those are re-tokenized. That covers our own writes and remote ones alike.
+"""
+import bisect
+import heapq
+import re
+import threading
+
+# Field -> weight of a token found in it
+FIELD_WEIGHTS = {"name": 3.0, "categoryId": 2.0, "description": 1.0}
+# Score factor for a term that only matches the start of a token
+PREFIX_FACTOR = 0.5
+# Changes touching more products than this rebuild the index and swap it in
+BULK_REINDEX = 1000
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text).lower()) if text else []
+
+
+def product_tokens(product):
+    """{token: weight} for one product; a token in several fields takes the highest weight."""
+    tokens = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(product.get(field)):
+            if tokens.get(token, 0) < weight:
+                tokens[token] = weight
+    return tokens
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # token -> [(-weight, name length, product id)], best first
+        self._postings = {}
+        self._vocabulary = []  # sorted tokens, for prefix lookups
+        self._docs = {}  # product id -> ({token: weight}, name length)
+
+    def __len__(self):
+        return len(self._docs)
+
+    # --- maintenance ---
+
+    def apply(self, changed):
+        """ProductCache watcher: re-index {productId: product or None}."""
+        if len(changed) > BULK_REINDEX:
+            self._reindex(changed)
+            return
+        for product_id, product in changed.items():
+            # One product per lock hold, so searches interleave with a full load
+            with self._lock:
+                self._remove(product_id)
+                if isinstance(product, dict):
+                    self._add(product_id, product)
+
+    def _reindex(self, changed):
+        """
+        Build fresh structures with `changed` applied, outside the lock, then
+        swap them in. A full load costs one sort per token instead of an
+        insort per posting, and searches keep using the old index meanwhile.
+        """
+        docs = dict(self._docs)
+        for product_id, product in changed.items():
+            if isinstance(product, dict):
+                docs[product_id] = (product_tokens(product), len(str(product.get("name") or "")))
+            else:
+                docs.pop(product_id, None)
+        postings = {}
+        for product_id, (tokens, name_length) in docs.items():
+            for token, weight in tokens.items():
+                postings.setdefault(token, []).append((-weight, name_length, product_id))
+        for entries in postings.values():
+            entries.sort()
+        vocabulary = sorted(postings)
+        with self._lock:
+            self._docs, self._postings, self._vocabulary = docs, postings, vocabulary
+
+    def _add(self, product_id, product):
+        tokens = product_tokens(product)
+        name_length = len(str(product.get("name") or ""))
+        self._docs[product_id] = (tokens, name_length)
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = []
+                bisect.insort(self._vocabulary, token)
+            bisect.insort(postings, (-weight, name_length, product_id))
+
+    def _remove(self, product_id):
+        doc = self._docs.pop(product_id, None)
+        if doc is None:
+            return
+        tokens, name_length = doc
+        for token, weight in tokens.items():
+            postings = self._postings[token]
+            del postings[bisect.bisect_left(postings, (-weight, name_length, product_id))]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+
+    # --- queries ---
+
+    def _expand(self, prefix):
+        """Vocabulary tokens starting with `prefix`."""
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\uffff", start)
+        return self._vocabulary[start:end]
+
+    def search(self, q, limit=10):
+        """Product ids matching every term of `q`, best first."""
+        terms = tokenize(q)
+        if not terms:
+            return []
+        *whole, last = dict.fromkeys(terms)
+        with self._lock:
+            expanded = self._expand(last)
+            if any(term not in self._postings for term in whole) or not expanded:
+                return []
+            docs = self._docs
+            # The most each term can add: the head of its (best first) list
+            whole_max = sum(-self._postings[t][0][0] for t in whole)
+            prefix_max = max(-self._postings[t][0][0] * _factor(t, last) for t in expanded)
+
+            # Drive from the shorter of the prefix's lists and the rarest whole term's
+            rarest = min(whole, key=lambda t: len(self._postings[t])) if whole else None
+            if rarest is None or \
+                    sum(len(self._postings[t]) for t in expanded) < len(self._postings[rarest]):
+                entries = self._prefix_entries(last, expanded)
+                others = whole_max
+
+                def score_of(product_id, prefix_score):
+                    return _whole_score(docs[product_id][0], whole, prefix_score)
+            else:
+                entries = iter(self._postings[rarest])
+                others = whole_max + self._postings[rarest][0][0] + prefix_max
+
+                def score_of(product_id, _):
+                    tokens = docs[product_id][0]
+                    prefix_score = _prefix_score(tokens, last)
+                    return _whole_score(tokens, whole, prefix_score) if prefix_score else 0
+
+            # Entries come best first, so no later one can beat its own score
+            # plus what the other terms add at most: stop once `limit` results
+            # rank ahead of that bound.
+            best = []  # up to `limit` (-score, name length, id), sorted
+            for weight, name_length, product_id in entries:
+                if len(best) == limit and best[-1] < (weight - others, name_length, product_id):
+                    break
+                score = score_of(product_id, -weight)
+                if score:
+                    bisect.insort(best, (-score, name_length, product_id))
+                    del best[limit:]
+            return [product_id for _, _, product_id in best]
+
+    def _prefix_entries(self, prefix, expanded):
+        """
+        (-score, name length, id) for every product with a token starting with
+        `prefix`, best first and each product once (at its best score): the
+        tokens' lists are each sorted, so merging them keeps the order.
+        """
+        def scored(token):
+            factor = _factor(token, prefix)
+            for weight, name_length, product_id in self._postings[token]:
+                yield weight * factor, name_length, product_id
+
+        seen = set()
+        for entry in heapq.merge(*(scored(t) for t in expanded)):
+            if entry[2] not in seen:
+                seen.add(entry[2])
+                yield entry
+
+
+def _factor(token, prefix):
+    return 1.0 if token == prefix else PREFIX_FACTOR
+
+
+def _prefix_score(tokens, prefix):
+    """Score of the best token starting with `prefix`, 0 if none does."""
+    best = 0.0
+    for token, weight in tokens.items():
+        if token.startswith(prefix):
+            best = max(best, weight * _factor(token, prefix))
+    return best
+
+
+def _whole_score(tokens, terms, score):
+    """`score` plus each term's weight, or 0 unless every term is one of the tokens."""
+    for term in terms:
+        weight = tokens.get(term)
+        if weight is None:
+            return 0
+        score += weight
+    return score
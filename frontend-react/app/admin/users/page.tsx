@@ -26,6 +26,8 @@ import {
 } from "@/components/ui/select"
 
 const API_URL = "/api"
+// Accounts fetched per request; the rest are loaded on demand ("Load more")
+const PAGE_SIZE = 100
 
 interface User {
     id: string
@@ -43,6 +45,10 @@ export default function UsersPage() {
     const router = useRouter()
     const [users, setUsers] = useState<User[]>([])
     const [admins, setAdmins] = useState<User[]>([])
+    // Cursor for each list's next page (from X-Next-Cursor), null when fully loaded
+    const [usersCursor, setUsersCursor] = useState<string | null>(null)
+    const [adminsCursor, setAdminsCursor] = useState<string | null>(null)
+    const [loadingMore, setLoadingMore] = useState(false)
     const [loading, setLoading] = useState(true)
     const [searchQuery, setSearchQuery] = useState("")
     const [activeTab, setActiveTab] = useState<"users" | "admins">("users")
@@ -63,8 +69,8 @@ export default function UsersPage() {
             const headers = { Authorization: `Bearer ${token}` }
 
             const [usersRes, adminsRes] = await Promise.all([
-                fetch(`${API_URL}/users`, { headers }),
-                fetch(`${API_URL}/users/admins`, { headers }),
+                fetch(`${API_URL}/users?limit=${PAGE_SIZE}`, { headers }),
+                fetch(`${API_URL}/users/admins?limit=${PAGE_SIZE}`, { headers }),
             ])
 
             const usersData = await usersRes.json()
@@ -72,12 +78,40 @@ export default function UsersPage() {
 
             setUsers(Array.isArray(usersData) ? usersData : [])
             setAdmins(Array.isArray(adminsData) ? adminsData : [])
+            setUsersCursor(usersRes.headers.get("X-Next-Cursor"))
+            setAdminsCursor(adminsRes.headers.get("X-Next-Cursor"))
         } catch (err) {
             console.error("Failed to fetch users:", err)
         }
         setLoading(false)
     }
 
+    const loadMore = async () => {
+        const cursor = activeTab === "users" ? usersCursor : adminsCursor
+        if (!token || !cursor) return
+        setLoadingMore(true)
+        try {
+            const path = activeTab === "users" ? "/users" : "/users/admins"
+            const res = await fetch(
+                `${API_URL}${path}?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(cursor)}`,
+                { headers: { Authorization: `Bearer ${token}` } },
+            )
+            const data = await res.json()
+            const page: User[] = Array.isArray(data) ? data : []
+            const next = res.headers.get("X-Next-Cursor")
+            if (activeTab === "users") {
+                setUsers((prev) => [...prev, ...page])
+                setUsersCursor(next)
+            } else {
+                setAdmins((prev) => [...prev, ...page])
+                setAdminsCursor(next)
+            }
+        } catch (err) {
+            console.error("Failed to load more users:", err)
+        }
+        setLoadingMore(false)
+    }
+
     useEffect(() => {
         // Wait for auth to finish loading before checking auth status
         if (isLoading) return
@@ -148,6 +182,7 @@ export default function UsersPage() {
     }
 
     const displayData = activeTab === "users" ? users : admins
+    const hasMore = (activeTab === "users" ? usersCursor : adminsCursor) !== null
     const filteredData = displayData.filter((user) => {
         const query = searchQuery.toLowerCase()
         return (
@@ -183,7 +218,7 @@ export default function UsersPage() {
                         className="gap-2"
                     >
                         <Users className="h-4 w-4" />
-                        Users ({users.length})
+                        Users ({users.length}{usersCursor ? "+" : ""})
                     </Button>
                     <Button
                         variant={activeTab === "admins" ? "default" : "outline"}
@@ -191,7 +226,7 @@ export default function UsersPage() {
                         className="gap-2"
                     >
                         <Shield className="h-4 w-4" />
-                        Admins ({admins.length})
+                        Admins ({admins.length}{adminsCursor ? "+" : ""})
                     </Button>
                 </div>
 
@@ -327,6 +362,14 @@ export default function UsersPage() {
                         </div>
                     </CardContent>
                 </Card>
+
+                {hasMore && !loading && (
+                    <div className="flex justify-center">
+                        <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+                            {loadingMore ? "Loading..." : "Load more"}
+                        </Button>
+                    </div>
+                )}
             </div>
 
             {/* Edit User Dialog */}
@@ -13,7 +13,7 @@ export default function AccessoriesCollectionPage() {
 
   // Fetch products from API
   useEffect(() => {
-    fetch('/api/products')
+    fetch('/api/products?categoryId=accessories')
       .then((res) => res.json())
       .then((data) => {
         setProducts(Array.isArray(data) ? data : [])
@@ -71,7 +71,7 @@ export default function AccessoriesCollectionPage() {
             </div>
           ) : (
             <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-6 mb-12">
-              {products.filter(p => p.categoryId === "accessories").map((product) => (
+              {products.map((product) => (
                 <ProductCard key={product.id} product={product} />
               ))}
             </div>
@@ -106,6 +106,22 @@ if errorlevel 1 (
     echo [WARNING] Some order-service dependencies may have failed
 )
 
+:: Install cart-service dependencies
+echo.
+echo Installing cart-service dependencies...
+pip install -r cart-service\requirements.txt
+if errorlevel 1 (
+    echo [WARNING] Some cart-service dependencies may have failed
+)
+
+:: Install wishlist-service dependencies
+echo.
+echo Installing wishlist-service dependencies...
+pip install -r wishlist-service\requirements.txt
+if errorlevel 1 (
+    echo [WARNING] Some wishlist-service dependencies may have failed
+)
+
 :: Install payment-service dependencies (if requirements exist)
 if exist "payment-service\requirements.txt" (
     echo.
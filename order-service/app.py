@@ -1,12 +1,22 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware
 
-# Local firebase config (no longer depends on shared-assets)
-from firebase_config import get_db
+# Database access through the shared ccb_db package (see firebase_config.py)
+from firebase_config import get_async_db, generate_key
+from ccb_metrics import instrument
+from user_orders import index_updates, fetch_user_orders
+from order_listing import list_orders, export_orders
+from stock import RESERVATION_TTL, OutOfStock, StockContention, order_items, stock_reserver
+from pricing import UnknownProducts, current_snapshot, price_order, product_cache
+from order_document import compact_order
+from sales_stats import read_stats
+from ccb_sales import placed_updates
 
 app = FastAPI()
+instrument(app)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,15 +25,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-db = get_db()
+db = get_async_db()
+
+@app.on_event("startup")
+def start_product_cache():
+    product_cache.start_listener()
+
+@app.on_event("shutdown")
+def stop_product_cache():
+    product_cache.stop_listener()
 
 from typing import Optional, List, Any
 
 class OrderRequest(BaseModel):
     userId: str
     cartItems: dict
-    totalPrice: float
-    # Additional fields for cross-device sync
+    # Client-side totals, line details and status are accepted for compatibility
+    # but not stored: the order is priced from the catalog (see pricing.py) and
+    # always starts out PENDING
+    totalPrice: Optional[float] = None
     customerEmail: Optional[str] = None
     customerName: Optional[str] = None
     items: Optional[List[Any]] = None
@@ -31,90 +51,124 @@ class OrderRequest(BaseModel):
     shipping: Optional[float] = None
     tax: Optional[float] = None
     total: Optional[float] = None
-    status: Optional[str] = "Pending"
     date: Optional[str] = None
     shippingAddress: Optional[str] = None
     orderNumber: Optional[int] = None
 
 @app.post("/order")
-def create_order(order: OrderRequest):
-    order_data = {
-        "userId": order.userId,
-        "customerEmail": order.customerEmail or order.userId,
-        "customerName": order.customerName or "Guest",
-        "status": order.status or "Pending",   
-        "totalPrice": order.totalPrice,
-        "total": order.total or order.totalPrice,
-        "subtotal": order.subtotal,
-        "shipping": order.shipping,
-        "tax": order.tax,
-        "items": order.items or order.cartItems,
-        "cartItems": order.cartItems,
-        "shippingAddress": order.shippingAddress,
-        "orderNumber": order.orderNumber or int(datetime.now().timestamp()),
-        "date": order.date or datetime.now().strftime("%Y-%m-%d"),
-        "createdAt": datetime.now().isoformat(),
-        "updatedAt": datetime.now().isoformat(),
-        "paymentId": ""
+async def create_order(order: OrderRequest):
+    try:
+        items = order_items(order.cartItems)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not items:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+
+    try:
+        lines, totals = price_order(items, order.cartItems, await current_snapshot())
+    except UnknownProducts as e:
+        raise HTTPException(status_code=400, detail={"message": "Unknown products",
+                                                     "productIds": e.product_ids})
+
+    # Hold the stock first; the order is only written once every item is reserved
+    try:
+        await stock_reserver.reserve(items)
+    except OutOfStock as e:
+        raise HTTPException(status_code=409, detail={"message": "Out of stock",
+                                                     "productIds": e.product_ids})
+    except StockContention as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    # Compact document; reads expand it to the full shape (see order_document.py)
+    order_data = compact_order(order, lines, totals)
+    # What the order holds, so payment-service can give it back (see stock.py)
+    order_data["reservation"] = {
+        "items": items,
+        "expiresAt": int((datetime.now().timestamp() + RESERVATION_TTL) * 1000),
     }
 
-    # Realtime Database: db.child("orders").push(data)
-    # db is now a Reference object (root) because we returned db.reference()
-    new_order_ref = db.child("orders").push(order_data)
+    # Write the order, its per-user index entries and the sales counters in
+    # one multi-path update; db is the async root reference (ccb_db.aio)
+    order_id = generate_key()
+    updates = {f"orders/{order_id}": order_data}
+    updates.update(index_updates(order_id, order_data))
+    updates.update(placed_updates(order_data))
+    try:
+        await db.update(updates)
+    except Exception:
+        await stock_reserver.release(items)
+        raise
 
     return {
         "message": "Order received! Processing payment...",
-        "orderId": new_order_ref.key
+        "orderId": order_id,
+        **totals,
     }
 
 
 @app.get("/orders/{email}")
-def get_orders_by_email(email: str):
-    """Fetch all orders for a user by their email address."""
+async def get_orders_by_email(
+    email: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    """
+    Fetch orders for a user by their email address, newest first.
+    With a limit, the cursor for the next page is returned in X-Next-Cursor.
+    """
     try:
-        # Get all orders from Firebase
-        orders_ref = db.child("orders").get()
-        
-        if not orders_ref:
-            return []
-        
-        user_orders = []
-        for order_id, order_data in orders_ref.items():
-            # Check if this order belongs to the user
-            if order_data.get("userId") == email or order_data.get("customerEmail") == email:
-                user_orders.append({
-                    "id": order_id,
-                    **order_data
-                })
-        
-        # Sort by createdAt descending (newest first)
-        user_orders.sort(key=lambda x: x.get("createdAt", ""), reverse=True)
-        
-        return user_orders
+        user_orders, next_cursor = await fetch_user_orders(db, email, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         return {"error": str(e), "orders": []}
 
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return user_orders
+
 
 @app.get("/orders")
-def get_all_orders():
-    """Fetch all orders (for admin)."""
+async def get_all_orders(
+    response: Response,
+    status: Optional[str] = None,
+    dateFrom: Optional[str] = None,
+    dateTo: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    Fetch orders (for admin), newest first, one page at a time.
+    The cursor for the next page is returned in X-Next-Cursor.
+    format=ndjson streams every matching order instead (limit/cursor ignored).
+    """
+    if format == "ndjson":
+        return StreamingResponse(export_orders(db, status, dateFrom, dateTo),
+                                 media_type="application/x-ndjson")
+
     try:
-        orders_ref = db.child("orders").get()
-        
-        if not orders_ref:
-            return []
-        
-        all_orders = []
-        for order_id, order_data in orders_ref.items():
-            all_orders.append({
-                "id": order_id,
-                **order_data
-            })
-        
-        # Sort by createdAt descending (newest first)
-        all_orders.sort(key=lambda x: x.get("createdAt", ""), reverse=True)
-        
-        return all_orders
+        all_orders, next_cursor = await list_orders(db, status, dateFrom, dateTo, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         return {"error": str(e), "orders": []}
 
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return all_orders
+
+
+@app.get("/stats")
+async def get_stats(
+    dateFrom: Optional[str] = None,
+    dateTo: Optional[str] = None,
+    top: int = Query(20, ge=1, le=100),
+):
+    """
+    Sales figures for the admin dashboard: totals, per day (the last 30 days
+    unless a range is given), per status and category, and the top products
+    by paid revenue. Reads only the `salesStats` aggregates.
+    """
+    return await read_stats(db, dateFrom, dateTo, top)
@@ -1,20 +1,11 @@
-import firebase_admin
-from firebase_admin import credentials, db
 import os
+import sys
 
-# Path to service account key (mounted via K8s secret)
-SERVICE_ACCOUNT_PATH = os.environ.get(
-    "GOOGLE_APPLICATION_CREDENTIALS", 
-    "/app/serviceAccountKey.json"
-)
-DATABASE_URL = "https://ccb-db-41f73-default-rtdb.firebaseio.com"
+# Shared data-access layer in ../shared-assets/ccb_db (same layout in the Docker images)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared-assets"))
+from ccb_db import get_db, generate_key  # noqa: E402
+from ccb_db.aio import get_db as get_async_db  # noqa: E402
 
-if not firebase_admin._apps:
-    cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
-    firebase_admin.initialize_app(cred, {
-        "databaseURL": DATABASE_URL
-    })
-
-def get_db():
-    """Get Firebase Realtime Database root reference."""
-    return db.reference()
+# Backend (Firebase, local emulator or in-memory) is chosen by CCB_DB_BACKEND;
+# see shared-assets/ccb_db/__init__.py. Request handlers use get_async_db().
+__all__ = ["get_db", "get_async_db", "generate_key"]
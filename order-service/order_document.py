@@ -0,0 +1,68 @@
+"""
+The stored order document and the shape the API returns.
+
+Orders are stored compactly. Lines are kept once, under `lines`, as
+`{productId: {"quantity", "price", "name", "categoryId"?, "size"?,
+"color"?}}`, and the only timestamp is `createdAt`. `updatedAt` and
+`paymentId` appear only once payment-service sets them. Everything the old format duplicated is derived
+when an order is read:
+
+  items      [{"id": productId, **line}]
+  cartItems  {productId: line}
+  total      totalPrice
+  date       createdAt's YYYY-MM-DD
+  updatedAt  createdAt, until the order is first updated
+  paymentId  ""
+
+expand_order() turns a stored order into that full shape. Orders written
+before the compact format (no `lines`) are returned otherwise unchanged, so
+both kinds can sit side by side in `orders`. Neither kind returns the
+fields only the services use: the stock hold (`reservation`) and
+payment-service's `claim` and `charge`.
+"""
+from datetime import datetime
+
+# Stored on the order for order-service and payment-service, never returned
+INTERNAL_FIELDS = ("reservation", "claim", "charge")
+
+# Every new order starts here; payment-service claims PENDING orders
+INITIAL_STATUS = "PENDING"
+
+
+def compact_order(order, lines, totals, created_at=None):
+    """The document to store for an OrderRequest priced into (lines, totals)."""
+    created_at = created_at or datetime.now().isoformat()
+    data = {
+        "userId": order.userId,
+        "customerName": order.customerName or "Guest",
+        "status": INITIAL_STATUS,
+        "lines": lines,
+        **totals,
+        "orderNumber": order.orderNumber or int(datetime.now().timestamp()),
+        "createdAt": created_at,
+    }
+    if order.customerEmail and order.customerEmail != order.userId:
+        data["customerEmail"] = order.customerEmail
+    if order.shippingAddress:
+        data["shippingAddress"] = order.shippingAddress
+    return data
+
+
+def expand_order(data):
+    """A stored order (compact or not) in the full shape the API has always returned."""
+    if not isinstance(data, dict):
+        return data
+    order = {key: value for key, value in data.items() if key not in INTERNAL_FIELDS}
+    if "lines" not in order:
+        return order
+    lines = order.pop("lines") or {}
+    created_at = order.get("createdAt") or ""
+    order.setdefault("customerEmail", order.get("userId"))
+    order.setdefault("shippingAddress", None)
+    order.setdefault("updatedAt", created_at)
+    order.setdefault("paymentId", "")
+    order["total"] = order.get("totalPrice")
+    order["date"] = created_at[:10]
+    order["items"] = [{"id": product_id, **line} for product_id, line in lines.items()]
+    order["cartItems"] = lines
+    return order
@@ -0,0 +1,88 @@
+"""
+Admin order listing.
+
+Orders are read newest first in fixed-size batches with
+``order_by_child("createdAt")`` range queries, so memory use depends on the
+batch size rather than on how many orders exist. Status filtering happens
+per batch. Orders are returned in their full shape (order_document.py).
+`db` is an async (ccb_db.aio) root reference.
+"""
+import json
+
+from order_document import expand_order
+from user_orders import encode_cursor, decode_cursor
+
+EXPORT_BATCH = 500
+
+
+async def iter_orders(db, status=None, date_from=None, date_to=None, after=None, batch=100):
+    """
+    Yield (order_id, order_data) newest first.
+
+    date_from/date_to are inclusive ISO dates (YYYY-MM-DD) matched against
+    createdAt; `after` is a (createdAt, orderId) position to continue from.
+    """
+    boundary = after
+    if after:
+        end = after[0]
+    elif date_to:
+        end = date_to + "\uf8ff"  # include every time on that day
+    else:
+        end = None
+
+    while True:
+        query = db.child("orders").order_by_child("createdAt")
+        if date_from:
+            query = query.start_at(date_from)
+        if end is not None:
+            query = query.end_at(end)
+        entries = await query.limit_to_last(batch).get() or {}
+
+        rows = [(data.get("createdAt") or "", order_id, data)
+                for order_id, data in entries.items() if isinstance(data, dict)]
+        rows.sort(key=lambda row: row[:2], reverse=True)
+
+        for created_at, order_id, data in rows:
+            # end_at is inclusive, so skip what earlier batches already covered
+            if boundary and (created_at, order_id) >= boundary:
+                continue
+            if status and str(data.get("status", "")).lower() != status.lower():
+                continue
+            yield order_id, data
+
+        if len(entries) < batch or not rows:
+            return
+        oldest = rows[-1][:2]
+        if oldest == boundary:
+            # A whole batch shares one createdAt; we can't page past it
+            return
+        boundary = oldest
+        end = oldest[0]
+
+
+async def list_orders(db, status=None, date_from=None, date_to=None, limit=50, cursor=None):
+    """Return (orders, next_cursor) for one page."""
+    after = decode_cursor(cursor) if cursor else None
+    # Status filtering drops rows, so read ahead in larger batches
+    batch = limit + 1 if not status else max(limit + 1, 200)
+
+    rows = []
+    async for row in iter_orders(db, status, date_from, date_to, after, batch):
+        rows.append(row)
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_id, last_data = rows[-1]
+        next_cursor = encode_cursor(last_data.get("createdAt") or "", last_id)
+
+    return [{"id": order_id, **expand_order(order_data)} for order_id, order_data in rows], next_cursor
+
+
+async def export_orders(db, status=None, date_from=None, date_to=None):
+    """Yield every matching order as one NDJSON line."""
+    async for order_id, order_data in iter_orders(db, status, date_from, date_to,
+                                                  batch=EXPORT_BATCH):
+        yield json.dumps({"id": order_id, **expand_order(order_data)}) + "\n"
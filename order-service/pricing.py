@@ -0,0 +1,75 @@
+"""
+Server-side order pricing.
+
+Prices come from the catalog, not from the request. Every line is looked up
+in a listener-backed snapshot of `products` (shared-assets/ccb_catalog.py),
+so pricing an order of any size is dictionary lookups with no database
+round trip. Shipping and tax follow the storefront's rules: free shipping
+over `FREE_SHIPPING_OVER`, otherwise `SHIPPING_FEE`, and `TAX_RATE` on the
+subtotal. Whatever totals the client sends are ignored.
+"""
+import asyncio
+import os
+
+from firebase_config import get_db
+from ccb_catalog import ProductCache
+
+# Seconds before the product snapshot is reloaded when the listener is down
+PRODUCT_CACHE_TTL = float(os.environ.get("PRODUCT_CACHE_TTL", "30"))
+# Connecticut sales tax
+TAX_RATE = float(os.environ.get("ORDER_TAX_RATE", "0.0635"))
+SHIPPING_FEE = float(os.environ.get("ORDER_SHIPPING_FEE", "15"))
+FREE_SHIPPING_OVER = float(os.environ.get("ORDER_FREE_SHIPPING_OVER", "100"))
+# Line options chosen by the shopper that are kept on the order
+LINE_OPTIONS = ("size", "color")
+
+
+class UnknownProducts(Exception):
+    def __init__(self, product_ids):
+        super().__init__(f"Not in the catalog: {', '.join(product_ids)}")
+        self.product_ids = product_ids
+
+
+product_cache = ProductCache(get_db().child("products"), ttl=PRODUCT_CACHE_TTL)
+
+
+async def current_snapshot():
+    """The product snapshot; a reload (listener down) runs off the event loop."""
+    if product_cache.needs_reload():
+        return await asyncio.to_thread(product_cache.snapshot)
+    return product_cache.snapshot()
+
+
+def price_order(items, cart_items, snapshot):
+    """
+    Price {productId: quantity} against a catalog snapshot. `cart_items` is
+    the request's cartItems, read only for the LINE_OPTIONS. Returns
+    (lines, totals): lines is {productId: {"quantity", "price", "name",
+    "categoryId"?, ...}},
+    totals has "subtotal", "shipping", "tax" and "totalPrice".
+    Raises UnknownProducts for ids the catalog can't price.
+    """
+    lines, unknown = {}, []
+    for product_id, quantity in items.items():
+        product = snapshot.by_id.get(product_id)
+        price = product.get("price") if product else None
+        if isinstance(price, bool) or not isinstance(price, (int, float)):
+            unknown.append(product_id)
+            continue
+        line = {"quantity": quantity, "price": price, "name": product.get("name") or ""}
+        if product.get("categoryId"):
+            # Sales by category count what the product was filed under when sold
+            line["categoryId"] = product["categoryId"]
+        entry = (cart_items or {}).get(product_id)
+        if isinstance(entry, dict):
+            line.update({k: entry[k] for k in LINE_OPTIONS if isinstance(entry.get(k), str)})
+        lines[product_id] = line
+    if unknown:
+        raise UnknownProducts(unknown)
+
+    subtotal = round(sum(line["price"] * line["quantity"] for line in lines.values()), 2)
+    shipping = 0.0 if not lines or subtotal > FREE_SHIPPING_OVER else SHIPPING_FEE
+    tax = round(subtotal * TAX_RATE, 2)
+    totals = {"subtotal": subtotal, "shipping": shipping, "tax": tax,
+              "totalPrice": round(subtotal + shipping + tax, 2)}
+    return lines, totals
@@ -0,0 +1,92 @@
+"""
+Sales figures for the admin dashboard, read from the `salesStats` aggregates.
+
+The counters are kept up to date on write by this service (placing an
+order) and payment-service (paying, failing or expiring it); see
+shared-assets/ccb_sales.py. GET /stats reads only those nodes, never
+`orders`. Money is stored in cents and returned in dollars.
+
+Run this module directly to recompute the aggregates from `orders` in one
+streaming pass (orders are read in batches, so memory depends on the batch
+size and the number of days, products and categories, not on the number of
+orders). Orders changing during the pass may be missed or counted twice, so
+run it when checkout is quiet:
+
+    python sales_stats.py
+"""
+import asyncio
+from collections import Counter
+
+from firebase_config import get_async_db
+from ccb_sales import STATS_PATH, order_contribution
+from order_listing import EXPORT_BATCH, iter_orders
+
+# Days returned when no range is given
+DEFAULT_DAYS = 30
+
+
+def _money(node):
+    """A counter node with *Cents fields converted to dollars (revenueCents -> revenue)."""
+    if not isinstance(node, dict):
+        return {}
+    return {(key[:-len("Cents")] if key.endswith("Cents") else key):
+            (value / 100 if key.endswith("Cents") else value)
+            for key, value in node.items()}
+
+
+async def read_stats(db, date_from=None, date_to=None, top=20):
+    """The dashboard figures; `db` is an async (ccb_db.aio) root reference."""
+    stats = db.child(STATS_PATH)
+    days = stats.child("days").order_by_key()
+    if date_from:
+        days = days.start_at(date_from)
+    if date_to:
+        days = days.end_at(date_to)
+    if not date_from and not date_to:
+        days = days.limit_to_last(DEFAULT_DAYS)
+    products = stats.child("products").order_by_child("revenueCents").limit_to_last(top)
+
+    totals, days, statuses, categories, products = await asyncio.gather(
+        stats.child("totals").get(), days.get(), stats.child("statuses").get(),
+        stats.child("categories").get(), products.get())
+
+    top_products = sorted(((product_id, _money(node)) for product_id, node in (products or {}).items()),
+                          key=lambda item: item[1].get("revenue", 0), reverse=True)
+    return {
+        "totals": _money(totals),
+        "days": [{"date": day, **_money(node)} for day, node in sorted((days or {}).items())],
+        "statuses": {status: _money(node) for status, node in (statuses or {}).items()},
+        "categories": {category: _money(node) for category, node in (categories or {}).items()},
+        "topProducts": [{"productId": product_id, **node} for product_id, node in top_products],
+    }
+
+
+def _nest(flat):
+    """{"a/b/c": n} -> {"a": {"b": {"c": n}}}"""
+    tree = {}
+    for path, value in flat.items():
+        *parents, leaf = path.split("/")
+        node = tree
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value
+    return tree
+
+
+async def rebuild():
+    """Recompute `salesStats` from every order."""
+    db = get_async_db()
+    totals = Counter()
+    count = 0
+    async for _, order_data in iter_orders(db, batch=EXPORT_BATCH):
+        totals.update(order_contribution(order_data))
+        count += 1
+    if totals:
+        await db.child(STATS_PATH).set(_nest(totals))
+    else:
+        await db.child(STATS_PATH).delete()
+    print(f"Aggregated {count} orders")
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
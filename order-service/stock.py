@@ -0,0 +1,173 @@
+"""
+Stock reservations for checkout.
+
+`products/{id}/stock` counts the units still available to sell. POST /order
+reserves an order's items out of stock before writing the order, so two
+checkouts can never both take the last unit. The order keeps a record of the
+hold under `reservation`: `{"items": {productId: quantity}, "expiresAt": ms}`.
+payment-service gives the stock back if the payment fails, or if the order
+is still PENDING when the hold expires (payment-service/reservations.py).
+
+Every change is a conditional write (ETag) to one product's stock node.
+Changes to the same product on this replica are coalesced. While one write
+for a product is in flight, new requests queue up. The next write then
+applies up to `max_batch` of them at once, granting them in arrival order
+while the stock lasts. A hot SKU therefore costs one round trip per batch
+rather than one (plus retries) per checkout. Only writes from other
+replicas or the catalog can conflict; those are retried against the
+current value that the 412 response carries.
+
+Reservations that span several products are taken per product, concurrently.
+If any product falls short, the ones already taken are put back.
+"""
+import asyncio
+import os
+import random
+
+from firebase_config import get_async_db
+
+# How long an unpaid order holds its stock
+RESERVATION_TTL = float(os.environ.get("STOCK_RESERVATION_TTL", "900"))
+# Most stock changes applied in one write (1 turns coalescing off)
+STOCK_MAX_BATCH = int(os.environ.get("STOCK_MAX_BATCH", "100"))
+# Conditional write attempts per batch before giving up
+STOCK_WRITE_RETRIES = int(os.environ.get("STOCK_WRITE_RETRIES", "50"))
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_ids):
+        super().__init__(f"Not enough stock for: {', '.join(product_ids)}")
+        self.product_ids = product_ids
+
+
+class StockContention(Exception):
+    """The stock node kept changing under us; the caller may retry."""
+
+
+def order_items(cart_items):
+    """
+    {productId: quantity} from an order's cartItems, which map each product
+    id to a quantity or to {"quantity": n, ...}. Raises ValueError.
+    """
+    items = {}
+    for product_id, entry in (cart_items or {}).items():
+        quantity = entry.get("quantity", 1) if isinstance(entry, dict) else entry
+        if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) \
+                or quantity != int(quantity) or quantity < 1:
+            raise ValueError(f"Invalid quantity for {product_id}")
+        if not product_id or set("/.#$[]") & set(product_id):
+            raise ValueError(f"Invalid product id: {product_id}")
+        items[product_id] = int(quantity)
+    return items
+
+
+class StockReserver:
+    def __init__(self, db=None, max_batch=STOCK_MAX_BATCH, retries=STOCK_WRITE_RETRIES):
+        self._db = db or get_async_db()
+        self.max_batch = max_batch
+        self.retries = retries
+        self._queues = {}  # product id -> [(delta, future)] waiting for the next write
+        self._known = {}  # product id -> (stock, etag) from our last read or write
+        self.writes = 0
+        self.conflicts = 0
+
+    async def reserve(self, items):
+        """Take {productId: quantity} out of stock, all or nothing. Raises OutOfStock."""
+        product_ids = list(items)
+        results = await asyncio.gather(*(self.adjust(p, -items[p]) for p in product_ids),
+                                       return_exceptions=True)
+        taken = {p: items[p] for p, ok in zip(product_ids, results) if ok is True}
+        if len(taken) == len(product_ids):
+            return
+        await self.release(taken)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        raise OutOfStock([p for p, ok in zip(product_ids, results) if ok is not True])
+
+    async def release(self, items):
+        """Put {productId: quantity} back."""
+        if items:
+            await asyncio.gather(*(self.adjust(p, quantity) for p, quantity in items.items()))
+
+    async def adjust(self, product_id, delta):
+        """
+        Add `delta` to a product's stock. A decrement is refused (False) if it
+        would take the stock below zero or the product has none; increments
+        always succeed (and are dropped for products that no longer exist).
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(product_id)
+        if queue is None:
+            self._queues[product_id] = [(delta, future)]
+            asyncio.ensure_future(self._drain(product_id))
+        else:
+            queue.append((delta, future))
+        return await future
+
+    async def _drain(self, product_id):
+        """Apply queued changes for one product, a batch per write, until none are left."""
+        queue = self._queues[product_id]
+        try:
+            while queue:
+                batch = queue[:self.max_batch]
+                del queue[:len(batch)]
+                try:
+                    granted = await self._write(product_id, [delta for delta, _ in batch])
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, future), ok in zip(batch, granted):
+                    if not future.done():
+                        future.set_result(ok)
+        finally:
+            del self._queues[product_id]
+
+    async def _write(self, product_id, deltas):
+        """Apply deltas to the stock node in one conditional write; returns which were granted."""
+        ref = self._db.child("products").child(product_id).child("stock")
+        if product_id in self._known:
+            stock, etag = self._known[product_id]
+            fresh = False
+        else:
+            stock, etag = await ref.get(etag=True)
+            fresh = True
+
+        for attempt in range(self.retries):
+            available = stock if isinstance(stock, (int, float)) else None
+            granted, new_stock = [], available
+            for delta in deltas:
+                ok = new_stock is not None and (delta >= 0 or new_stock + delta >= 0)
+                granted.append(delta >= 0 or ok)
+                if ok:
+                    new_stock += delta
+
+            if new_stock == available:
+                # Nothing to write; refusals only count if the value is current
+                if fresh:
+                    return granted
+                stock, etag = await ref.get(etag=True)
+                fresh = True
+                continue
+
+            ok, stock, etag = await ref.set_if_unchanged(etag, new_stock)
+            self.writes += 1
+            if ok:
+                if etag:
+                    self._known[product_id] = (new_stock, etag)
+                else:
+                    self._known.pop(product_id, None)
+                return granted
+            self.conflicts += 1
+            fresh = True
+            if attempt:
+                # Another writer keeps winning; back off a little
+                await asyncio.sleep(random.uniform(0, 0.005 * min(attempt, 10)))
+
+        self._known.pop(product_id, None)
+        raise StockContention(f"Stock for {product_id} changed concurrently, try again")
+
+
+stock_reserver = StockReserver()
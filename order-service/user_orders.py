@@ -0,0 +1,134 @@
+"""
+Per-user order index.
+
+Every order is fanned out to ``userOrders/{userKey}/{orderId} = createdAt``
+in the same multi-path update that writes the order, for both its userId
+and customerEmail. Order history then reads only that user's index (ordered
+by value, i.e. createdAt) and fetches just the orders on the requested page.
+
+Run this module directly to build the index from existing orders:
+
+    python user_orders.py
+
+User keys are escaped with '!'. The backfill also deletes the lists left by
+the first version of the index, which escaped with '%': the REST API decodes
+'%' sequences in request paths, so those lists were never found.
+"""
+import asyncio
+import base64
+import json
+
+from firebase_config import get_db
+from order_document import expand_order
+
+INDEX_PATH = "userOrders"
+MIGRATION_CHUNK = 500
+
+# Characters RTDB does not allow in keys, plus '%' and '?' which the REST API
+# would decode from the request URL. '!' is the escape ('!' first so it round-trips)
+_ESCAPES = [("!", "!21"), ("%", "!25"), ("?", "!3F"), (".", "!2E"), ("$", "!24"),
+            ("#", "!23"), ("[", "!5B"), ("]", "!5D"), ("/", "!2F")]
+
+
+def user_key(user: str) -> str:
+    """Turn a userId/email into a valid RTDB key."""
+    key = user
+    for char, escaped in _ESCAPES:
+        key = key.replace(char, escaped)
+    return key
+
+
+def index_updates(order_id: str, order_data: dict) -> dict:
+    """Multi-path update entries that index an order under its owner(s)."""
+    owners = {order_data.get("userId"), order_data.get("customerEmail")}
+    return {
+        f"{INDEX_PATH}/{user_key(owner)}/{order_id}": order_data.get("createdAt", "")
+        for owner in owners if owner
+    }
+
+
+def encode_cursor(created_at: str, order_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, order_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return created_at, order_id
+
+
+async def fetch_user_orders(db, user: str, limit=None, cursor=None):
+    """
+    Return (orders, next_cursor) for a user, newest first.
+    Without a limit every order of that user is returned.
+    `db` is an async (ccb_db.aio) root reference.
+    """
+    ref = db.child(INDEX_PATH).child(user_key(user))
+    after = decode_cursor(cursor) if cursor else None
+
+    if limit is None:
+        entries = await ref.get() or {}
+    else:
+        query = ref.order_by_value()
+        if after:
+            # end_at is inclusive, so one extra entry makes up for the cursor itself
+            query = query.end_at(after[0]).limit_to_last(limit + 2)
+        else:
+            query = query.limit_to_last(limit + 1)
+        entries = await query.get() or {}
+
+    keys = sorted(((created_at or "", order_id) for order_id, created_at in entries.items()),
+                  reverse=True)
+    if after:
+        keys = [k for k in keys if k < after]
+
+    next_cursor = None
+    if limit is not None and len(keys) > limit:
+        keys = keys[:limit]
+        next_cursor = encode_cursor(*keys[-1])
+
+    order_ids = [order_id for _, order_id in keys]
+    # Order documents on a page are fetched concurrently
+    docs = await asyncio.gather(*(db.child("orders").child(order_id).get()
+                                  for order_id in order_ids))
+
+    orders = []
+    for order_id, order_data in zip(order_ids, docs):
+        if isinstance(order_data, dict):
+            orders.append({"id": order_id, **expand_order(order_data)})
+    return orders, next_cursor
+
+
+def backfill():
+    """Index every existing order, in chunked multi-path updates."""
+    db = get_db()
+    orders = db.child("orders").get() or {}
+
+    updates = {}
+    indexed = 0
+    for order_id, order_data in orders.items():
+        if not isinstance(order_data, dict):
+            continue
+        updates.update(index_updates(order_id, order_data))
+        indexed += 1
+        if len(updates) >= MIGRATION_CHUNK:
+            db.update(updates)
+            updates = {}
+
+    if updates:
+        db.update(updates)
+    print(f"Indexed {indexed} orders")
+
+    # Keys in an update body aren't URL-decoded, so old '%' keys can be deleted this way
+    index = db.child(INDEX_PATH)
+    legacy = [key for key in index.get(shallow=True) or {} if "%" in key]
+    for start in range(0, len(legacy), MIGRATION_CHUNK):
+        index.update({key: None for key in legacy[start:start + MIGRATION_CHUNK]})
+    if legacy:
+        print(f"Removed {len(legacy)} user lists with '%'-escaped keys")
+
+
+if __name__ == "__main__":
+    backfill()
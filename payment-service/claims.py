@@ -0,0 +1,60 @@
+"""
+Order claims, so several payment-service replicas can share the work.
+
+Before charging, a worker moves the order PENDING -> PROCESSING in an RTDB
+transaction and records who holds it and until when. Only the worker whose
+transaction commits processes the order; everyone else (other replicas,
+replayed listener events, reconciliation) backs off. A PROCESSING order
+whose lease has run out belongs to a crashed worker and can be claimed again.
+"""
+import os
+import socket
+import time
+
+# Pod name in K8s (see deployments.yaml), host-pid locally
+WORKER_ID = os.environ.get("PAYMENT_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+# Must comfortably exceed the time one payment takes
+LEASE_SECONDS = float(os.environ.get("PAYMENT_LEASE_SECONDS", "300"))
+
+
+class NotClaimable(Exception):
+    """Raised inside the transaction to abort it without writing."""
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def lease_expired(order_data, now_ms=None):
+    claim = order_data.get("claim") or {}
+    return claim.get("leaseExpiresAt", 0) <= (now_ms or _now_ms())
+
+
+def is_claimable(order_data):
+    status = order_data.get("status")
+    if status == "PENDING":
+        return True
+    return status == "PROCESSING" and lease_expired(order_data)
+
+
+def claim_order(db, order_id):
+    """
+    Atomically claim an order for this worker.
+    Returns the claimed order data, or None if someone else has it.
+    """
+    def claim(current):
+        if not isinstance(current, dict) or not is_claimable(current):
+            raise NotClaimable()
+        return {
+            **current,
+            "status": "PROCESSING",
+            "claim": {
+                "workerId": WORKER_ID,
+                "leaseExpiresAt": _now_ms() + int(LEASE_SECONDS * 1000),
+            },
+        }
+
+    try:
+        return db.child("orders").child(order_id).transaction(claim)
+    except NotClaimable:
+        return None
@@ -0,0 +1,89 @@
+"""
+Asyncio engine for payment jobs.
+
+Jobs run as coroutines on an event loop owned by a background thread, so
+thousands of payments can wait on the gateway at once without a thread
+each. submit() is called from the RTDB listener thread; once `max_pending`
+jobs are outstanding it blocks, which is the backpressure. The same order is
+never outstanding twice, so the listener and the reconciliation pass can
+both submit it safely.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class PaymentEngine:
+    def __init__(self, handler, max_pending=5000):
+        self._handler = handler  # async handler(order_id, order_data)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = set()  # order ids submitted and not finished
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._accepting = True
+
+        self.completed = 0
+        self.failed = 0
+        self._latencies = deque(maxlen=1000)  # seconds, most recent jobs
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="payment-engine",
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, order_id, order_data):
+        """Schedule an order. Returns False if it is already pending or we are draining."""
+        with self._lock:
+            if not self._accepting or order_id in self._pending:
+                return False
+            self._pending.add(order_id)
+        self._slots.acquire()
+        asyncio.run_coroutine_threadsafe(
+            self._run(order_id, order_data, time.monotonic()), self.loop)
+        return True
+
+    async def _run(self, order_id, order_data, submitted_at):
+        ok = False
+        try:
+            await self._handler(order_id, order_data)
+            ok = True
+        except Exception as e:
+            print(f" [ERROR] Payment for order {order_id} failed: {e!r}")
+        finally:
+            with self._lock:
+                self._pending.discard(order_id)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._latencies.append(time.monotonic() - submitted_at)
+                self._idle.notify_all()
+            self._slots.release()
+
+    def drain(self, timeout=None):
+        """Stop accepting jobs, wait for outstanding ones and stop the loop."""
+        with self._lock:
+            self._accepting = False
+            drained = self._idle.wait_for(lambda: not self._pending, timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+        return drained
+
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            pending, completed, failed = len(self._pending), self.completed, self.failed
+
+        def pct(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        return {
+            "pending": pending,
+            "completed": completed,
+            "failed": failed,
+            "latency_p50_s": round(pct(0.50), 3),
+            "latency_p95_s": round(pct(0.95), 3),
+        }
@@ -0,0 +1,116 @@
+"""
+Payment gateway adapters.
+
+An adapter implements ``async charge(order_id, amount, currency)`` and
+returns a dict describing the charge, raising GatewayError for failures
+worth retrying and PaymentDeclined for final ones. `order_id` is the
+idempotency key: charging an order again returns its original charge
+instead of taking the money twice, so a payment retried after a crash or a
+failed write is safe. GatewayClient wraps an
+adapter with a cap on concurrent calls, a per-call timeout and retries with
+jittered exponential backoff.
+"""
+import asyncio
+import os
+import random
+import uuid
+
+
+class GatewayError(Exception):
+    """Transient gateway failure; the charge may be retried."""
+
+
+class PaymentDeclined(GatewayError):
+    """The gateway refused the charge; retrying won't help."""
+
+
+class PaymentGateway:
+    """Base class for gateway adapters."""
+
+    async def charge(self, order_id, amount, currency):
+        raise NotImplementedError
+
+
+class SimulatedGateway(PaymentGateway):
+    """Local stand-in with configurable latency and failure rates."""
+
+    def __init__(self, latency=3.0, failure_rate=0.0, decline_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self._charges = {}  # order id -> charge, for idempotent retries
+
+    async def charge(self, order_id, amount, currency):
+        await asyncio.sleep(self.latency * random.uniform(0.8, 1.2))
+        if order_id in self._charges:
+            return self._charges[order_id]
+        roll = random.random()
+        if roll < self.decline_rate:
+            raise PaymentDeclined("Card declined")
+        if roll < self.decline_rate + self.failure_rate:
+            raise GatewayError("Gateway unavailable")
+        charge = self._charges[order_id] = {"method": "VISA", "transactionId": uuid.uuid4().hex}
+        return charge
+
+
+GATEWAYS = {
+    "simulated": lambda: SimulatedGateway(
+        latency=float(os.environ.get("PAYMENT_GATEWAY_DELAY", "3")),
+        failure_rate=float(os.environ.get("PAYMENT_GATEWAY_FAILURE_RATE", "0")),
+        decline_rate=float(os.environ.get("PAYMENT_GATEWAY_DECLINE_RATE", "0")),
+    ),
+}
+
+
+def get_gateway():
+    """Build the adapter selected by PAYMENT_GATEWAY (default: simulated)."""
+    name = os.environ.get("PAYMENT_GATEWAY", "simulated")
+    if name not in GATEWAYS:
+        raise RuntimeError(f"Unknown PAYMENT_GATEWAY: {name}")
+    return GATEWAYS[name]()
+
+
+class GatewayClient:
+    def __init__(self, gateway, concurrency=500, timeout=10.0, retries=3, backoff=0.5):
+        self.gateway = gateway
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._concurrency = concurrency
+        self._slots = None  # created on the engine's event loop
+        self.waiting = 0
+        self.in_flight = 0
+
+    async def charge(self, order_id, amount, currency="USD"):
+        """
+        Charge with retries. Raises the last error once retries run out (a
+        GatewayError if the last attempt timed out).
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._concurrency)
+
+        attempt = 0
+        while True:
+            self.waiting += 1
+            async with self._slots:
+                self.waiting -= 1
+                self.in_flight += 1
+                try:
+                    return await asyncio.wait_for(
+                        self.gateway.charge(order_id, amount, currency), self.timeout)
+                except PaymentDeclined:
+                    raise
+                except (GatewayError, asyncio.TimeoutError) as e:
+                    error = e
+                finally:
+                    self.in_flight -= 1
+
+            attempt += 1
+            if attempt > self.retries:
+                if isinstance(error, asyncio.TimeoutError):
+                    # A GatewayError, so the payment is recorded as failed
+                    # instead of leaving the order claimed until its lease runs out
+                    raise GatewayError(f"Gateway timed out after {self.timeout}s") from error
+                raise error
+            # Exponential backoff with full jitter, outside the semaphore
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
@@ -1,53 +1,124 @@
+import asyncio
+import os
+import signal
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-# Local firebase config (no longer depends on shared-assets)
-from firebase_config import get_db
+# Database access through the shared ccb_db package (see firebase_config.py)
+from firebase_config import get_db, generate_key
+from ccb_metrics import LATENCY_BUCKETS, start_metrics_server
+from prometheus_client import REGISTRY, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from engine import PaymentEngine
+from gateway import GatewayClient, GatewayError, get_gateway
+from claims import WORKER_ID, claim_order, is_claimable, lease_expired
+from reservations import expire_order, hold_expired, release_reservation
+from ccb_sales import status_updates
 
 # Get Realtime Database root reference
 db = get_db()
 
+# --- CONFIGURATION ---
+# Gateway adapter settings (PAYMENT_GATEWAY, PAYMENT_GATEWAY_DELAY, ...) are read in gateway.py
+PAYMENT_CONCURRENCY = int(os.environ.get("PAYMENT_CONCURRENCY", "500"))
+PAYMENT_MAX_PENDING = int(os.environ.get("PAYMENT_MAX_PENDING", "5000"))
+GATEWAY_TIMEOUT = float(os.environ.get("PAYMENT_GATEWAY_TIMEOUT", "10"))
+GATEWAY_RETRIES = int(os.environ.get("PAYMENT_GATEWAY_RETRIES", "3"))
+# Threads for the blocking Firebase calls made from the event loop
+DB_THREADS = int(os.environ.get("PAYMENT_DB_THREADS", "8"))
+# How often to re-scan for PENDING orders, expired claims and expired stock holds
+RECONCILE_INTERVAL = float(os.environ.get("PAYMENT_RECONCILE_INTERVAL", "60"))
+METRICS_INTERVAL = float(os.environ.get("PAYMENT_METRICS_INTERVAL", "30"))
+# Prometheus /metrics port (0 disables)
+METRICS_PORT = int(os.environ.get("PAYMENT_METRICS_PORT", "9102"))
 
-def process_payment(order_id, order_data):
+
+gateway = GatewayClient(get_gateway(), concurrency=PAYMENT_CONCURRENCY,
+                        timeout=GATEWAY_TIMEOUT, retries=GATEWAY_RETRIES)
+
+PROCESSING_TIME = Histogram("payment_processing_seconds",
+                            "Time from claiming an order to recording its payment",
+                            ["outcome"], buckets=LATENCY_BUCKETS + (30, 60))
+
+
+async def process_payment(order_id, order_data):
     """
     Handles payment logic for a single order.
-    Runs in a separate thread.
+    Runs as a coroutine on the payment engine's event loop.
     """
 
-    # Safety check (idempotency)
-    if order_data.get("status") != "PENDING":
+    # Claim the order first (idempotency across replicas and replayed events)
+    order_data = await asyncio.to_thread(claim_order, db, order_id)
+    if order_data is None:
         return
 
-    print(f"\n[EVENT] Processing payment for order: {order_id}")
+    print(f"\n[EVENT] Processing payment for order: {order_id} (worker {WORKER_ID})")
+    started = time.perf_counter()
+
+    # A charge made by an earlier attempt whose final write failed is not
+    # repeated. The gateway also treats order_id as an idempotency key, which
+    # covers a crash before the charge was recorded.
+    charge = order_data.get("charge")
+    if charge is None:
+        try:
+            charge = await gateway.charge(order_id, order_data.get("totalPrice"))
+        except GatewayError as e:
+            await asyncio.to_thread(record_payment, order_id, order_data, None, e)
+            PROCESSING_TIME.labels("failed").observe(time.perf_counter() - started)
+            print(f" Order {order_id} payment FAILED: {e}")
+            raise
+        await asyncio.to_thread(db.child("orders").child(order_id).child("charge").set, charge)
+
+    payment_id = await asyncio.to_thread(record_payment, order_id, order_data, charge)
+    PROCESSING_TIME.labels("paid").observe(time.perf_counter() - started)
+    print(f" Order {order_id} marked as PAID")
+    print(f" Payment record created: {payment_id}")
 
-    # Simulate payment gateway delay
-    print(" Contacting payment gateway...")
-    time.sleep(3)
 
-    # 1 Create payment record
+def record_payment(order_id, order_data, charge, error=None):
+    """Write the payment record and the order's final status. Returns the payment id."""
+    succeeded = error is None
+
     payment_data = {
         "orderId": order_id,
-        "method": "VISA",
-        "status": "SUCCESS",
+        "method": charge["method"] if succeeded else "VISA",
+        "status": "SUCCESS" if succeeded else "FAILED",
         "amount": order_data.get("totalPrice"),
         "currency": "USD",
         "createdAt": datetime.now().isoformat()
     }
-
-    payment_ref = db.child("payments").push(payment_data)
-    payment_id = payment_ref.key
-
-    # 2 Update order
-    db.child("orders").child(order_id).update({
-        "status": "PAID",
-        "paymentStatus": "SUCCESS",
-        "paymentId": payment_id,
-        "updatedAt": datetime.now().isoformat()
+    if succeeded:
+        payment_data["transactionId"] = charge["transactionId"]
+    else:
+        payment_data["error"] = str(error)
+
+    # Payment record, order status and sales counters in one multi-path
+    # update, so there is never a payment whose order still looks
+    # PENDING/PROCESSING. Claimed orders are counted as PENDING (ccb_sales).
+    payment_id = generate_key()
+    order_path = f"orders/{order_id}"
+    status = "PAID" if succeeded else "PAYMENT_FAILED"
+    db.update({
+        **status_updates(order_data, "PENDING", status),
+        f"payments/{payment_id}": payment_data,
+        f"{order_path}/status": status,
+        f"{order_path}/paymentStatus": payment_data["status"],
+        f"{order_path}/paymentId": payment_id,
+        f"{order_path}/updatedAt": datetime.now().isoformat(),
+        f"{order_path}/claim": None,
+        f"{order_path}/charge": None,
     })
+    if not succeeded:
+        # The order won't be fulfilled; put its stock back on sale
+        released = release_reservation(db, order_id)
+        if released:
+            print(f" Released stock held by order {order_id}: {released}")
+    return payment_id
 
-    print(f" Order {order_id} marked as PAID")
-    print(f" Payment record created: {payment_id}")
+
+engine = None
 
 
 def order_listener(event):
@@ -56,36 +127,113 @@ def order_listener(event):
     Fires when orders change.
     """
 
-    # We only care about new orders
-    if event.event_type != "put":
-        return
-
+    # The initial full snapshot is handled by reconcile()
     if not event.path or event.path == "/":
+        # Multi-path updates (order-service writes orders that way) arrive
+        # as a patch of whole orders keyed by id
+        if event.event_type != "patch" or not isinstance(event.data, dict):
+            return
+        orders = {k: v for k, v in event.data.items() if "/" not in k}
+    elif event.event_type == "put" and event.path.count("/") == 1:
+        # A single new order
+        orders = {event.path.lstrip("/"): event.data}
+    else:
         return
 
-    order_id = event.path.lstrip("/")
-    order_data = event.data
+    for order_id, order_data in orders.items():
+        if isinstance(order_data, dict) and is_claimable(order_data):
+            engine.submit(order_id, order_data)
 
-    if not isinstance(order_data, dict):
-        return
-
-    if order_data.get("status") == "PENDING":
-        thread = threading.Thread(
-            target=process_payment,
-            args=(order_id, order_data)
-        )
-        thread.start()
 
+def reconcile():
+    """
+    Queue every order still PENDING (e.g. placed while we were down) and
+    every PROCESSING order whose worker's lease ran out (crashed replica).
+    PENDING orders whose stock hold has run out are expired instead.
+    """
+    orders = db.child("orders")
+    pending = orders.order_by_child("status").equal_to("PENDING").get() or {}
+    processing = orders.order_by_child("status").equal_to("PROCESSING").get() or {}
+    stale = {k: v for k, v in processing.items() if isinstance(v, dict) and lease_expired(v)}
+
+    expired = [k for k, v in pending.items() if isinstance(v, dict) and hold_expired(v)]
+    expired = [order_id for order_id in expired if expire_order(db, order_id)]
+    for order_id in expired:
+        pending.pop(order_id)
+    if expired:
+        print(f"[RECONCILE] Expired {len(expired)} unpaid orders and released their stock")
+
+    queued = 0
+    for order_id, order_data in list(pending.items()) + list(stale.items()):
+        if isinstance(order_data, dict) and engine.submit(order_id, order_data):
+            queued += 1
+    if queued:
+        print(f"[RECONCILE] Queued {queued} orders ({len(stale)} with expired leases)")
+
+
+def metrics():
+    return {**engine.metrics(), "gateway_waiting": gateway.waiting,
+            "gateway_in_flight": gateway.in_flight}
+
+
+class PaymentCollector:
+    """Exports the engine and gateway counters on /metrics at scrape time."""
+
+    def collect(self):
+        if engine is None:
+            return
+        m = metrics()
+        yield GaugeMetricFamily("payment_queue_depth", "Orders submitted and not finished",
+                                value=m["pending"])
+        yield GaugeMetricFamily("payment_gateway_waiting", "Charges waiting for a gateway slot",
+                                value=m["gateway_waiting"])
+        yield GaugeMetricFamily("payment_gateway_in_flight", "Charges in progress at the gateway",
+                                value=m["gateway_in_flight"])
+        yield CounterMetricFamily("payment_jobs_completed", "Payment jobs finished",
+                                  value=m["completed"])
+        yield CounterMetricFamily("payment_jobs_failed", "Payment jobs that raised",
+                                  value=m["failed"])
+
+
+def main():
+    global engine
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
 
-if __name__ == "__main__":
     print("------------------------------------------------")
     print(" PAYMENT SERVICE STARTED")
+    print(f" Gateway concurrency: {PAYMENT_CONCURRENCY}, max pending: {PAYMENT_MAX_PENDING}")
     print(" Listening for PENDING orders...")
     print("------------------------------------------------")
 
+    engine = PaymentEngine(process_payment, max_pending=PAYMENT_MAX_PENDING)
+    engine.loop.set_default_executor(ThreadPoolExecutor(max_workers=DB_THREADS))
+    if METRICS_PORT:
+        REGISTRY.register(PaymentCollector())
+        start_metrics_server(METRICS_PORT)
+
     orders_ref = db.child("orders")
-    orders_ref.listen(order_listener)
+    listener = orders_ref.listen(order_listener)
+    reconcile()
+
+    # Keep process alive, re-scanning and reporting periodically
+    last_reconcile = last_metrics = time.monotonic()
+    while not stop.wait(1):
+        now = time.monotonic()
+        if now - last_reconcile >= RECONCILE_INTERVAL:
+            reconcile()
+            last_reconcile = now
+        if now - last_metrics >= METRICS_INTERVAL:
+            print(f"[METRICS] {metrics()}")
+            last_metrics = now
+
+    # Anything not finished in time stays PENDING for the next reconcile()
+    print("[SHUTDOWN] Draining payment queue...")
+    listener.close()
+    engine.drain(timeout=25)
+    print(f"[SHUTDOWN] Done {metrics()}")
 
-    # Keep process alive
-    while True:
-        time.sleep(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Giving reserved stock back.
+
+order-service takes an order's items out of `products/{id}/stock` at checkout
+and records them on the order under `reservation` (see order-service/stock.py).
+They go back when the payment fails, or when an order is still PENDING after
+`reservation.expiresAt`; such an order is marked EXPIRED.
+
+Release is at most once. A transaction on the order's `reservation` stamps
+`releasedAt` first, and only the caller whose stamp commits returns the
+units. A crash between the stamp and the stock writes therefore leaves units
+unsold rather than sold twice.
+"""
+import time
+from datetime import datetime
+
+from ccb_sales import status_updates
+from claims import NotClaimable
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def hold_expired(order_data, now_ms=None):
+    reservation = order_data.get("reservation") or {}
+    expires_at = reservation.get("expiresAt")
+    return bool(reservation.get("items")) and not reservation.get("releasedAt") \
+        and expires_at is not None and expires_at <= (now_ms or _now_ms())
+
+
+def release_reservation(db, order_id):
+    """Return an order's reserved stock. Returns the {productId: quantity} released, or {}."""
+    def stamp(current):
+        if not isinstance(current, dict) or not current.get("items") or current.get("releasedAt"):
+            raise NotClaimable()
+        return {**current, "releasedAt": datetime.now().isoformat()}
+
+    try:
+        reservation = db.child("orders").child(order_id).child("reservation").transaction(stamp)
+    except NotClaimable:
+        return {}
+
+    items = reservation["items"]
+    for product_id, quantity in items.items():
+        # Products deleted since checkout stay deleted
+        db.child("products").child(product_id).child("stock").transaction(
+            lambda stock, quantity=quantity: stock + quantity
+            if isinstance(stock, (int, float)) else stock)
+    return items
+
+
+def expire_order(db, order_id):
+    """
+    Mark an order EXPIRED if it is still PENDING with an expired hold, and
+    release its stock. Returns False if it moved on (claimed, paid) first.
+    """
+    def expire(current):
+        if not isinstance(current, dict) or current.get("status") != "PENDING" \
+                or not hold_expired(current):
+            raise NotClaimable()
+        return {**current, "status": "EXPIRED", "updatedAt": datetime.now().isoformat()}
+
+    try:
+        order_data = db.child("orders").child(order_id).transaction(expire)
+    except NotClaimable:
+        return False
+    db.update(status_updates(order_data, "PENDING", "EXPIRED"))
+    release_reservation(db, order_id)
+    return True
@@ -0,0 +1,192 @@
+"""
+Payment processing when database writes fail between its steps, or the
+gateway never answers.
+
+Runs process_payment against the in-memory RTDB (CCB_DB_BACKEND=memory)
+with writes made to fail, then lets the lease run out and processes the
+order again, as reconcile() would:
+
+    cd payment-service && python -m pytest -q test_payment_failures.py
+"""
+import asyncio
+import os
+
+os.environ["CCB_DB_BACKEND"] = "memory"
+
+import pytest  # noqa: E402
+
+import claims  # noqa: E402
+import main  # noqa: E402
+from gateway import GatewayClient, GatewayError, PaymentDeclined, SimulatedGateway  # noqa: E402
+
+ORDER_ID = "order-1"
+
+
+class CountingGateway(SimulatedGateway):
+    """Simulated gateway that counts calls and can decline or hang on every charge."""
+
+    def __init__(self, decline=False, hang=False):
+        super().__init__(latency=0)
+        self.decline = decline
+        self.hang = hang
+        self.calls = 0
+
+    async def charge(self, order_id, amount, currency):
+        self.calls += 1
+        if self.hang:
+            await asyncio.sleep(60)
+        if self.decline:
+            raise PaymentDeclined("Card declined")
+        return await super().charge(order_id, amount, currency)
+
+
+class StubEngine:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, order_id, order_data):
+        self.submitted.append(order_id)
+        return True
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    # Reservation as order-service leaves it: 2 units held, 1 left on sale
+    main.db.set({
+        "products": {"p1": {"name": "Shirt", "price": 40, "stock": 1}},
+        "orders": {ORDER_ID: {
+            "userId": "a@b.com", "status": "PENDING", "totalPrice": 80,
+            "createdAt": "2026-01-01T10:00:00",
+            "lines": {"p1": {"quantity": 2, "price": 40, "name": "Shirt"}},
+            "reservation": {"items": {"p1": 2}, "expiresAt": 2 ** 50},
+        }},
+    })
+    # Leases run out as soon as they are taken, so the retry can claim
+    monkeypatch.setattr(claims, "LEASE_SECONDS", 0)
+    monkeypatch.setattr(main, "engine", StubEngine())
+    gateway = CountingGateway()
+    monkeypatch.setattr(main, "gateway", GatewayClient(gateway, retries=0))
+    return gateway
+
+
+def fail_writes(monkeypatch, matches):
+    """Make db.update / db.set raise, without writing, for paths matching `matches`."""
+    reference = type(main.db)
+    update, set_ = reference.update, reference.set
+
+    def failing_update(self, value):
+        if any(matches(f"{self.path}/{path}") for path in value):
+            raise ConnectionError("injected update failure")
+        return update(self, value)
+
+    def failing_set(self, value):
+        if matches(self.path):
+            raise ConnectionError("injected set failure")
+        return set_(self, value)
+
+    monkeypatch.setattr(reference, "update", failing_update)
+    monkeypatch.setattr(reference, "set", failing_set)
+    return lambda: (monkeypatch.setattr(reference, "update", update),
+                    monkeypatch.setattr(reference, "set", set_))
+
+
+def process():
+    asyncio.run(main.process_payment(ORDER_ID, main.db.child(f"orders/{ORDER_ID}").get()))
+
+
+def retry():
+    """What the next reconcile() pass does with the stuck order."""
+    main.reconcile()
+    assert main.engine.submitted == [ORDER_ID]
+    process()
+
+
+def order():
+    return main.db.child(f"orders/{ORDER_ID}").get()
+
+
+def stock():
+    return main.db.child("products/p1/stock").get()
+
+
+def payments():
+    return list((main.db.child("payments").get() or {}).values())
+
+
+def test_failed_status_write_is_finished_without_charging_again(gateway, monkeypatch):
+    restore = fail_writes(monkeypatch, lambda path: path.endswith("/status"))
+    with pytest.raises(ConnectionError):
+        process()
+
+    # Claimed and charged, with the charge recorded; nothing else written
+    assert order()["status"] == "PROCESSING"
+    assert order()["claim"]["workerId"] == claims.WORKER_ID
+    assert order()["charge"]["transactionId"]
+    assert payments() == []
+    assert stock() == 1
+
+    restore()
+    retry()
+    assert gateway.calls == 1
+    assert order()["status"] == "PAID"
+    assert "claim" not in order() and "charge" not in order()
+    [payment] = payments()
+    assert payment["status"] == "SUCCESS" and order()["paymentId"]
+    # Sold: the held units stay out of stock
+    assert stock() == 1 and "releasedAt" not in order()["reservation"]
+    assert main.db.child("salesStats/statuses/PAID/orders").get() == 1
+
+
+def test_unrecorded_charge_is_not_taken_twice(gateway, monkeypatch):
+    restore = fail_writes(monkeypatch, lambda path: path.endswith("/charge"))
+    with pytest.raises(ConnectionError):
+        process()
+    assert order()["status"] == "PROCESSING" and "charge" not in order()
+    first = gateway._charges[ORDER_ID]
+
+    restore()
+    retry()
+    # Charged again with the same idempotency key: the gateway returns the original charge
+    assert gateway.calls == 2
+    [payment] = payments()
+    assert payment["transactionId"] == first["transactionId"]
+    assert order()["status"] == "PAID" and "claim" not in order()
+
+
+def test_failed_payment_releases_stock_once(gateway, monkeypatch):
+    gateway.decline = True
+    restore = fail_writes(monkeypatch, lambda path: path.endswith("/status"))
+    with pytest.raises(ConnectionError):
+        process()
+
+    # The status write failed, so the hold is still in place
+    assert order()["status"] == "PROCESSING"
+    assert stock() == 1 and "releasedAt" not in order()["reservation"]
+
+    restore()
+    with pytest.raises(PaymentDeclined):
+        retry()
+    assert order()["status"] == "PAYMENT_FAILED" and "claim" not in order()
+    assert stock() == 3 and order()["reservation"]["releasedAt"]
+    [payment] = payments()
+    assert payment["status"] == "FAILED"
+
+    # A repeated release (replayed job, another replica) returns nothing more
+    assert main.release_reservation(main.db, ORDER_ID) == {}
+    assert stock() == 3
+
+
+def test_gateway_timeouts_fail_the_payment(gateway, monkeypatch):
+    gateway.hang = True
+    monkeypatch.setattr(main, "gateway", GatewayClient(gateway, timeout=0.01, retries=2, backoff=0))
+    with pytest.raises(GatewayError, match="timed out"):
+        process()
+
+    # Every attempt timed out: recorded as failed, not left claimed for reconcile() to retry
+    assert gateway.calls == 3
+    assert order()["status"] == "PAYMENT_FAILED" and "claim" not in order()
+    assert stock() == 3 and order()["reservation"]["releasedAt"]
+    [payment] = payments()
+    assert payment["status"] == "FAILED" and "timed out" in payment["error"]
+    main.reconcile()
+    assert main.engine.submitted == []
@@ -25,28 +25,42 @@ echo Starting services in separate terminals...
 echo.
 
 :: Start User Profile Service (Port 8000)
-echo [1/4] Starting User Profile Service on port 8000...
+echo [1/6] Starting User Profile Service on port 8000...
 start "User Profile Service - Port 8000" cmd /k "cd /d "%~dp0" && call .venv\Scripts\activate.bat && cd user-profile-service && python -m uvicorn app:app --port 8000"
 
 :: Wait a moment for the service to start
 timeout /t 2 /nobreak >nul
 
 :: Start Catalog Service (Port 8001)
-echo [2/4] Starting Catalog Service on port 8001...
+echo [2/6] Starting Catalog Service on port 8001...
 start "Catalog Service - Port 8001" cmd /k "cd /d "%~dp0" && call .venv\Scripts\activate.bat && cd catalog-service && python -m uvicorn app:app --port 8001"
 
 :: Wait a moment for the service to start
 timeout /t 2 /nobreak >nul
 
 :: Start Order Service (Port 8002)
-echo [3/4] Starting Order Service on port 8002...
+echo [3/6] Starting Order Service on port 8002...
 start "Order Service - Port 8002" cmd /k "cd /d "%~dp0" && call .venv\Scripts\activate.bat && cd order-service && python -m uvicorn app:app --port 8002"
 
 :: Wait a moment for the service to start
 timeout /t 2 /nobreak >nul
 
+:: Start Cart Service (Port 8003)
+echo [4/6] Starting Cart Service on port 8003...
+start "Cart Service - Port 8003" cmd /k "cd /d "%~dp0" && call .venv\Scripts\activate.bat && cd cart-service && python -m uvicorn app:app --port 8003"
+
+:: Wait a moment for the service to start
+timeout /t 2 /nobreak >nul
+
+:: Start Wishlist Service (Port 8004)
+echo [5/6] Starting Wishlist Service on port 8004...
+start "Wishlist Service - Port 8004" cmd /k "cd /d "%~dp0" && call .venv\Scripts\activate.bat && cd wishlist-service && python -m uvicorn app:app --port 8004"
+
+:: Wait a moment for the service to start
+timeout /t 2 /nobreak >nul
+
 :: Start Frontend (Port 3000)
-echo [4/4] Starting Frontend on port 3000...
+echo [6/6] Starting Frontend on port 3000...
 start "Frontend - Port 3000" cmd /k "cd /d "%~dp0\frontend-react" && npm run dev"
 
 :: Wait for services to initialize
@@ -68,6 +82,8 @@ echo Services running in separate terminal windows:
 echo   - User Profile Service: http://localhost:8000 (API docs: /docs)
 echo   - Catalog Service:      http://localhost:8001 (API docs: /docs)
 echo   - Order Service:        http://localhost:8002 (API docs: /docs)
+echo   - Cart Service:         http://localhost:8003 (API docs: /docs)
+echo   - Wishlist Service:     http://localhost:8004 (API docs: /docs)
 echo   - Frontend:             http://localhost:3000
 echo.
 echo To stop all services, close the terminal windows or press Ctrl+C in each.
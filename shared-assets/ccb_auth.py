@@ -0,0 +1,89 @@
+"""
+Access token issuing and verification shared by the services.
+
+Tokens are issued by user-profile-service (POST /auth/login) and signed with
+JWT_SECRET_KEY, so any service configured with the same key can authenticate
+a request locally instead of calling user-profile-service:
+
+    from ccb_auth import InvalidTokenError, verify_token
+    claims = verify_token(token)   # {'sub': ..., 'role': ..., 'exp': ...}
+
+Verified tokens are kept in a bounded LRU keyed by the token's SHA-256, so a
+client reusing its token skips the signature check. Entries are dropped once
+the token's exp has passed, so a cached token never outlives its expiry.
+Needs python-jose.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from jose import JWTError, jwt
+
+SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "simple_secret_key")
+ALGORITHM = "HS256"
+TOKEN_LIFETIME = timedelta(days=1)
+# Verified tokens remembered per process
+TOKEN_CACHE_SIZE = int(os.environ.get("JWT_CACHE_SIZE", "10000"))
+
+
+class InvalidTokenError(Exception):
+    pass
+
+
+class TokenVerifier:
+    def __init__(self, secret_key=SECRET_KEY, algorithm=ALGORITHM, max_size=TOKEN_CACHE_SIZE):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # sha256(token) -> (claims, exp)
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token):
+        """Return the token's claims, or raise InvalidTokenError."""
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                claims, exp = entry
+                if exp is None or exp > time.time():
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return dict(claims)
+                del self._cache[key]
+            self.misses += 1
+
+        try:
+            claims = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except JWTError as e:
+            raise InvalidTokenError(str(e))
+
+        if self.max_size:
+            with self._lock:
+                self._cache[key] = (claims, claims.get("exp"))
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+        return dict(claims)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_verifier = TokenVerifier()
+
+
+def verify_token(token):
+    """Claims of a token issued by create_token(); raises InvalidTokenError."""
+    return _verifier.verify(token)
+
+
+def create_token(data: dict, lifetime: timedelta = TOKEN_LIFETIME):
+    to_encode = data.copy()
+    to_encode.update({"exp": datetime.utcnow() + lifetime})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
@@ -0,0 +1,330 @@
+"""
+In-process snapshot of the `products` tree, shared by the services that read
+the catalog (catalog-service, wishlist-service):
+
+    from ccb_catalog import ProductCache
+    products = ProductCache(reference('products'))
+    products.start_listener()
+    products.snapshot().by_id.get(product_id)
+
+The snapshot is kept fresh by an RTDB listener on `products`. If the listener
+can't be started (or drops), it falls back to reloading after `ttl` seconds.
+The secondary indexes used for filtering are built once per change, and the
+JSON body and its ETag the first time a snapshot is served, so serving GET
+/products is just handing back bytes.
+
+Checkout writes `products/{id}/stock` for every order, so most changes touch
+a few products without moving them in any index. Those are patched into the
+current snapshot's indexes (see Snapshot.patched) instead of rebuilding
+them, and the body is not serialized again until someone asks for it.
+Adding or deleting a product, or changing its price or category, builds a
+new snapshot.
+
+Structures that are cheaper to patch than to rebuild (catalog-service's
+search index) register with add_watcher(). They are told which products
+each change touched, whether it came from the listener or from a reload.
+"""
+import base64
+import bisect
+import copy
+import hashlib
+import json
+import threading
+import time
+
+
+class ProductCache:
+    def __init__(self, ref, ttl=30.0):
+        self._ref = ref  # reference('products')
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._products = {}
+        self._snapshot = Snapshot({})
+        self._loaded_at = 0.0
+        self._stale = True
+        self._listener = None
+        self._watchers = []
+
+    def add_watcher(self, callback):
+        """
+        Call `callback({productId: product or None})` with the products each
+        change touched (None: deleted). Runs on the thread that applied the
+        change, with the cache locked.
+        """
+        self._watchers.append(callback)
+
+    def _notify(self, changed):
+        if not changed or not self._watchers:
+            return
+        touched = {product_id: self._products.get(product_id) for product_id in changed}
+        for callback in self._watchers:
+            try:
+                callback(touched)
+            except Exception as e:
+                print(f"Product watcher failed: {e}")
+
+    @staticmethod
+    def _diff(old, new):
+        return [product_id for product_id in old.keys() | new.keys()
+                if old.get(product_id) != new.get(product_id)]
+
+    # --- listener ---
+
+    def start_listener(self):
+        """Subscribe to `products`. Returns False if we must rely on the TTL."""
+        try:
+            self._listener = self._ref.listen(self._on_event)
+            return True
+        except Exception as e:
+            print(f"Product listener unavailable, using {self.ttl}s TTL: {e}")
+            self._listener = None
+            return False
+
+    def stop_listener(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _on_event(self, event):
+        segments = [s for s in (event.path or "").split("/") if s]
+        with self._lock:
+            if not segments:
+                if event.event_type == "put":
+                    old, self._products = self._products, dict(event.data or {})
+                    changed = self._diff(old, self._products)
+                else:
+                    changed = set()
+                    for product_id, value in (event.data or {}).items():
+                        self._apply(product_id.split("/"), value, patch=False)
+                        changed.add(product_id.split("/")[0])
+            else:
+                self._apply(segments, event.data, patch=event.event_type == "patch")
+                changed = [segments[0]]
+            self._refresh(changed)
+            self._notify(changed)
+
+    def _apply(self, segments, value, patch):
+        product_id, fields = segments[0], segments[1:]
+        if not fields and not patch:
+            if value is None:
+                self._products.pop(product_id, None)
+            else:
+                self._products[product_id] = value
+            return
+
+        product = self._products.setdefault(product_id, {})
+        if not isinstance(product, dict):
+            product = self._products[product_id] = {}
+        if patch:
+            # patch data is {field: value} relative to the event path
+            for field, child in (value or {}).items():
+                self._set_field(product, fields + field.split("/"), child)
+        else:
+            self._set_field(product, fields, value)
+
+    @staticmethod
+    def _set_field(node, fields, value):
+        for field in fields[:-1]:
+            node = node.setdefault(field, {})
+        if value is None:
+            node.pop(fields[-1], None)
+        else:
+            node[fields[-1]] = value
+
+    # --- snapshot ---
+
+    def _rebuild(self):
+        """Build a new snapshot from self._products. Caller holds the lock."""
+        self._snapshot = Snapshot(self._products)
+        self._loaded_at = time.monotonic()
+        self._stale = False
+
+    def _refresh(self, changed):
+        """Patch the snapshot for `changed` products, or rebuild it. Caller holds the lock."""
+        snapshot = self._snapshot.patched(self._products, changed)
+        if snapshot is None:
+            self._rebuild()
+            return
+        self._snapshot = snapshot
+        self._loaded_at = time.monotonic()
+        self._stale = False
+
+    def _reload(self):
+        data = self._ref.get() or {}
+        with self._lock:
+            old, self._products = self._products, dict(data)
+            self._rebuild()
+            if self._watchers:
+                self._notify(self._diff(old, self._products))
+
+    def invalidate(self):
+        """
+        Called after our own writes. With the listener running they arrive
+        as events like everyone else's, so nothing is reloaded; without it,
+        the next read goes to Firebase.
+        """
+        if self._listener is None:
+            self._stale = True
+
+    def needs_reload(self):
+        """True if the next snapshot() call will go to Firebase."""
+        expired = self._listener is None and time.monotonic() - self._loaded_at > self.ttl
+        return self._stale or expired
+
+    def snapshot(self):
+        """Return the current Snapshot, reloading from Firebase if needed."""
+        if self.needs_reload():
+            self._reload()
+        return self._snapshot
+
+
+def _price(product):
+    price = product.get("price")
+    return price if isinstance(price, (int, float)) else 0
+
+
+# sort key -> (key function, descending)
+SORTS = {
+    "id": (lambda p: (p["id"],), False),
+    "newest": (lambda p: (p["id"],), True),  # push ids are chronological
+    "price": (lambda p: (_price(p), p["id"]), False),
+    "-price": (lambda p: (_price(p), p["id"]), True),
+    "name": (lambda p: (str(p.get("name") or "").lower(), p["id"]), False),
+    "-name": (lambda p: (str(p.get("name") or "").lower(), p["id"]), True),
+}
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Raises ValueError for anything we didn't produce."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, list) or not key:
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+class Snapshot:
+    """
+    View of the catalog at one point in time, with secondary indexes on
+    categoryId and price. The full JSON body is serialized once, on first
+    use. Products are never modified; a patch puts new ones in their slots.
+    """
+
+    def __init__(self, products):
+        self.items = []
+        for key, value in products.items():
+            if not isinstance(value, dict):
+                continue
+            self.items.append({**value, "id": key})
+        self._body = self._etag = None
+
+        self.by_id = {p["id"]: p for p in self.items}
+        self.by_category = {}
+        in_category = {}
+        for p in self.items:
+            bucket = self.by_category.setdefault(p.get("categoryId"), [])
+            in_category[p["id"]] = len(bucket)
+            bucket.append(p)
+        self.by_price = sorted(self.items, key=SORTS["price"][0])
+        self.prices = [_price(p) for p in self.by_price]
+        # product id -> (index in items, in its by_category list, in by_price)
+        self._slots = {p["id"]: [i, in_category[p["id"]], None] for i, p in enumerate(self.items)}
+        for i, p in enumerate(self.by_price):
+            self._slots[p["id"]][2] = i
+
+    @property
+    def body(self):
+        if self._body is None:
+            self._body = json.dumps(self.items).encode("utf-8")
+        return self._body
+
+    @property
+    def etag(self):
+        if self._etag is None:
+            self._etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+        return self._etag
+
+    def patched(self, products, changed):
+        """
+        A snapshot with the `changed` products replaced by their values in
+        `products`, or None if any of them was added or deleted or changed
+        price or category, which needs a new Snapshot.
+
+        Nothing moves, so the products are swapped into their slots in the
+        lists and dicts this snapshot shares with the new one: the cost
+        depends on the number of products changed, not on the catalog size.
+        A request still holding this snapshot sees each product either
+        before or after the change.
+        """
+        replaced = {}
+        for product_id in changed:
+            old, new = self.by_id.get(product_id), products.get(product_id)
+            if old is None or not isinstance(new, dict) or _price(new) != _price(old) \
+                    or new.get("categoryId") != old.get("categoryId"):
+                return None
+            replaced[product_id] = {**new, "id": product_id}
+        if not replaced:
+            return self
+
+        for product_id, product in replaced.items():
+            item, in_category, in_price = self._slots[product_id]
+            self.items[item] = product
+            self.by_category[product.get("categoryId")][in_category] = product
+            self.by_price[in_price] = product
+            self.by_id[product_id] = product
+        snapshot = copy.copy(self)
+        snapshot._body = snapshot._etag = None
+        return snapshot
+
+    def query(self, category_id=None, min_price=None, max_price=None, in_stock=False,
+              q=None, sort="id", limit=None, cursor=None):
+        """Return (page, next_cursor) for the given filters."""
+        if category_id is not None:
+            candidates = self.by_category.get(category_id, [])
+        elif min_price is not None or max_price is not None:
+            lo = bisect.bisect_left(self.prices, min_price) if min_price is not None else 0
+            hi = bisect.bisect_right(self.prices, max_price) if max_price is not None else len(self.prices)
+            candidates = self.by_price[lo:hi]
+        else:
+            candidates = self.items
+
+        text = q.lower() if q else None
+        matches = []
+        for p in candidates:
+            if min_price is not None and _price(p) < min_price:
+                continue
+            if max_price is not None and _price(p) > max_price:
+                continue
+            if in_stock and not (p.get("stock") or 0) > 0:
+                continue
+            if text and text not in str(p.get("name") or "").lower() \
+                    and text not in str(p.get("description") or "").lower():
+                continue
+            matches.append(p)
+
+        sort_key, descending = SORTS[sort]
+        matches.sort(key=sort_key)
+        keys = [sort_key(p) for p in matches]
+
+        if cursor is not None:
+            after = decode_cursor(cursor)
+            try:
+                if descending:
+                    matches = matches[:bisect.bisect_left(keys, after)]
+                else:
+                    matches = matches[bisect.bisect_right(keys, after):]
+            except TypeError:
+                raise ValueError("Cursor does not match sort order")
+        if descending:
+            matches.reverse()
+
+        if limit is None or len(matches) <= limit:
+            return matches, None
+        page = matches[:limit]
+        return page, encode_cursor(sort_key(page[-1]))
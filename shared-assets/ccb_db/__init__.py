@@ -0,0 +1,145 @@
+"""
+Shared data-access layer for the CCB services.
+
+CCB_DB_BACKEND picks where the data lives:
+
+    firebase  (default) the production Firebase RTDB, via firebase_admin
+    emulator  firebase_admin against a local RTDB emulator at CCB_DB_EMULATOR_HOST
+              (``python -m ccb_db.emulator`` or the Firebase emulator suite)
+    memory    an in-process MemoryDatabase; nothing is shared between processes
+
+Every backend hands out objects with the firebase_admin ``Reference`` /
+``Query`` API, so service code is the same whichever one is selected.
+
+Async handlers use ``ccb_db.aio``, the same API with awaitable calls.
+
+add_call_observer() registers a callback that is told about every REST call
+made to the database (firebase and emulator backends), for metrics.
+"""
+import os
+import threading
+import time
+
+from .push_id import generate_key
+
+BACKEND = os.environ.get("CCB_DB_BACKEND", "firebase")
+DATABASE_URL = os.environ.get("CCB_DATABASE_URL", "https://ccb-db-41f73-default-rtdb.firebaseio.com")
+EMULATOR_HOST = os.environ.get("CCB_DB_EMULATOR_HOST", "localhost:9000")
+EMULATOR_NAMESPACE = os.environ.get("CCB_DB_EMULATOR_NAMESPACE", "ccb")
+
+_backend = None
+_backend_lock = threading.Lock()
+_observers = []
+
+
+def add_call_observer(callback):
+    """Call ``callback(operation, path, seconds, nbytes)`` after every database call."""
+    if callback not in _observers:
+        _observers.append(callback)
+
+
+def _notify_call(operation, path, seconds, nbytes):
+    for callback in _observers:
+        callback(operation, path, seconds, nbytes)
+
+
+def _operation(method, kwargs):
+    method = method.lower()
+    if method == "get":
+        return "query" if "orderBy=" in (kwargs.get("params") or "") else "get"
+    if method == "put" and "if-match" in (kwargs.get("headers") or {}):
+        return "set_if_unchanged"  # one transaction attempt
+    return {"put": "set", "patch": "update", "post": "push"}.get(method, method)
+
+
+def _observe_requests(db):
+    """Time each REST call firebase_admin makes and report it to the observers."""
+    request = db._Client.request
+    if getattr(request, "observed", False):
+        return
+
+    def observed_request(self, method, url, **kwargs):
+        start = time.perf_counter()
+        nbytes = 0
+        try:
+            response = request(self, method, url, **kwargs)
+            nbytes = len(response.content)
+            return response
+        finally:
+            if _observers:
+                path = url.lstrip("/")
+                if path.endswith(".json"):
+                    path = path[:-len(".json")]
+                _notify_call(_operation(method, kwargs), path, time.perf_counter() - start, nbytes)
+
+    observed_request.observed = True
+    db._Client.request = observed_request
+
+
+def _credentials_path():
+    # K8s mounted secret first, then a key next to wherever the service runs
+    path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", "/app/serviceAccountKey.json")
+    if not os.path.exists(path):
+        path = os.path.join(os.getcwd(), "serviceAccountKey.json")
+    if not os.path.exists(path):
+        raise RuntimeError(f"FATAL: serviceAccountKey.json not found at {path}")
+    return path
+
+
+def _firebase():
+    import firebase_admin
+    from firebase_admin import credentials, db
+
+    if not firebase_admin._apps:
+        path = _credentials_path()
+        firebase_admin.initialize_app(credentials.Certificate(path), {"databaseURL": DATABASE_URL})
+        print(f"Firebase connected using: {path}")
+    _observe_requests(db)
+    return db
+
+
+def _emulator():
+    import firebase_admin
+    from firebase_admin import db
+
+    if not firebase_admin._apps:
+        # An emulator URL makes firebase_admin skip auth entirely
+        url = f"http://{EMULATOR_HOST}?ns={EMULATOR_NAMESPACE}"
+        firebase_admin.initialize_app(options={"databaseURL": url})
+        print(f"Firebase emulator at: {url}")
+    _observe_requests(db)
+    return db
+
+
+def _memory():
+    from .memory import MemoryDatabase
+    return MemoryDatabase()
+
+
+BACKENDS = {
+    "firebase": _firebase,
+    "emulator": _emulator,
+    "memory": _memory,
+}
+
+
+def get_backend():
+    """The selected backend: anything with a ``reference(path)`` method."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if BACKEND not in BACKENDS:
+                    raise RuntimeError(f"Unknown CCB_DB_BACKEND: {BACKEND}")
+                _backend = BACKENDS[BACKEND]()
+    return _backend
+
+
+def reference(path="/"):
+    """Get a database reference for a specific path."""
+    return get_backend().reference(path)
+
+
+def get_db():
+    """Get the database root reference."""
+    return reference()
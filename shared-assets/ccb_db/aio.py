@@ -0,0 +1,268 @@
+"""
+Async access to the Realtime Database, for ``async def`` handlers.
+
+Talks to the RTDB REST API over one pooled keep-alive httpx.AsyncClient per
+event loop, with the OAuth token cached until shortly before it expires, so
+concurrent requests overlap their database round trips instead of each
+holding a threadpool thread. The API mirrors firebase_admin's, awaited:
+
+    orders = aio.reference("orders")
+    order = await orders.child(order_id).get()
+    latest = await orders.order_by_child("createdAt").limit_to_last(20).get()
+
+With CCB_DB_BACKEND=memory calls go straight to the in-process database.
+Listeners stay on the sync API; they run on their own thread anyway.
+"""
+import asyncio
+import json
+import os
+import time
+import weakref
+from collections import OrderedDict
+
+import httpx
+
+import ccb_db
+from .memory import index_value, sort_key
+
+MAX_CONNECTIONS = int(os.environ.get("CCB_DB_MAX_CONNECTIONS", "100"))
+TIMEOUT = float(os.environ.get("CCB_DB_TIMEOUT", "10"))
+TRANSACTION_RETRIES = 25
+# Refresh the OAuth token this long before it expires
+TOKEN_MARGIN_SECONDS = 300
+
+
+class DatabaseError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class TransactionAbortedError(DatabaseError):
+    def __init__(self):
+        super().__init__(409, "Transaction aborted after too many retries")
+
+
+def _split(path):
+    return [seg for seg in (path or "").split("/") if seg]
+
+
+class _Transport:
+    """HTTP plumbing shared by all references on one event loop."""
+
+    def __init__(self):
+        if ccb_db.BACKEND == "emulator":
+            self.base_url = f"http://{ccb_db.EMULATOR_HOST}"
+            self.params = {"ns": ccb_db.EMULATOR_NAMESPACE}
+            self._credential = None
+        else:
+            import firebase_admin
+
+            ccb_db.get_backend()  # initializes the app and its credential
+            self.base_url = ccb_db.DATABASE_URL.rstrip("/")
+            self.params = {}
+            self._credential = firebase_admin.get_app().credential.get_credential()
+        self._token_lock = asyncio.Lock()
+        self.client = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                max_keepalive_connections=MAX_CONNECTIONS),
+        )
+
+    async def _auth_header(self):
+        if self._credential is None:
+            return {"Authorization": "Bearer owner"}  # what the emulator expects
+        expiry = self._credential.expiry
+        if not self._credential.token or expiry is None or \
+                expiry.timestamp() - time.time() < TOKEN_MARGIN_SECONDS:
+            async with self._token_lock:
+                # Another request may have refreshed it while we waited
+                expiry = self._credential.expiry
+                if not self._credential.token or expiry is None or \
+                        expiry.timestamp() - time.time() < TOKEN_MARGIN_SECONDS:
+                    from google.auth.transport.requests import Request
+                    await asyncio.to_thread(self._credential.refresh, Request())
+        return {"Authorization": f"Bearer {self._credential.token}"}
+
+    async def request(self, operation, method, path, params=None, headers=None, body=None):
+        url = f"{self.base_url}/{path}.json" if path else f"{self.base_url}/.json"
+        headers = {**(headers or {}), **(await self._auth_header())}
+        content = None if body is None else json.dumps(body)
+        start = time.perf_counter()
+        nbytes = 0
+        try:
+            response = await self.client.request(method, url, params={**self.params, **(params or {})},
+                                                 headers=headers, content=content)
+            nbytes = len(response.content)
+        finally:
+            if ccb_db._observers:
+                ccb_db._notify_call(operation, path, time.perf_counter() - start, nbytes)
+        if response.status_code >= 400 and response.status_code != 412:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            raise DatabaseError(response.status_code, message)
+        return response
+
+
+_transports = weakref.WeakKeyDictionary()
+
+
+def _transport():
+    loop = asyncio.get_running_loop()
+    transport = _transports.get(loop)
+    if transport is None:
+        transport = _transports[loop] = _Transport()
+    return transport
+
+
+class Reference:
+    def __init__(self, segments):
+        self._segments = segments
+
+    @property
+    def key(self):
+        return self._segments[-1] if self._segments else None
+
+    @property
+    def path(self):
+        return "/" + "/".join(self._segments)
+
+    @property
+    def parent(self):
+        if not self._segments:
+            return None
+        return Reference(self._segments[:-1])
+
+    def child(self, path):
+        return Reference(self._segments + _split(path))
+
+    def _path(self):
+        return "/".join(self._segments)
+
+    async def get(self, etag=False, shallow=False):
+        params = {"shallow": "true"} if shallow else None
+        headers = {"X-Firebase-ETag": "true"} if etag else None
+        response = await _transport().request("get", "GET", self._path(), params, headers)
+        if etag:
+            return response.json(), response.headers.get("ETag")
+        return response.json()
+
+    async def set(self, value):
+        if value is None:
+            raise ValueError("Value must not be None.")
+        await _transport().request("set", "PUT", self._path(), {"print": "silent"}, body=value)
+
+    async def set_if_unchanged(self, expected_etag, value):
+        response = await _transport().request("set_if_unchanged", "PUT", self._path(),
+                                              headers={"if-match": expected_etag}, body=value)
+        if response.status_code == 412:
+            return False, response.json(), response.headers.get("ETag")
+        return True, value, response.headers.get("ETag")
+
+    async def update(self, value):
+        if not value or not isinstance(value, dict):
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        await _transport().request("update", "PATCH", self._path(), {"print": "silent"}, body=value)
+
+    async def push(self, value=""):
+        if value is None:
+            raise ValueError("Value must not be None.")
+        response = await _transport().request("push", "POST", self._path(), body=value)
+        return self.child(response.json()["name"])
+
+    async def delete(self):
+        await _transport().request("delete", "DELETE", self._path(), {"print": "silent"})
+
+    async def transaction(self, transaction_update):
+        """
+        Same contract as firebase_admin: ``transaction_update`` gets the current
+        value and returns the new one; raising aborts without writing.
+        """
+        current, etag = await self.get(etag=True)
+        for _ in range(TRANSACTION_RETRIES):
+            new_value = transaction_update(current)
+            ok, current, etag = await self.set_if_unchanged(etag, new_value)
+            if ok:
+                return new_value
+        raise TransactionAbortedError()
+
+    def order_by_child(self, path):
+        return Query(self, path)
+
+    def order_by_key(self):
+        return Query(self, "$key")
+
+    def order_by_value(self):
+        return Query(self, "$value")
+
+
+class Query:
+    def __init__(self, ref, order_by):
+        self._ref = ref
+        self._order_by = order_by
+        self._params = {"orderBy": json.dumps(order_by)}
+
+    def limit_to_first(self, limit):
+        self._params["limitToFirst"] = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self._params["limitToLast"] = limit
+        return self
+
+    def start_at(self, start):
+        self._params["startAt"] = json.dumps(start)
+        return self
+
+    def end_at(self, end):
+        self._params["endAt"] = json.dumps(end)
+        return self
+
+    def equal_to(self, value):
+        self._params["equalTo"] = json.dumps(value)
+        return self
+
+    async def get(self):
+        response = await _transport().request("query", "GET", self._ref._path(), self._params)
+        data = response.json()
+        if not isinstance(data, dict):
+            return data
+        # The REST API filters but doesn't order the JSON object it returns
+        keys = sorted(data, key=lambda k: sort_key(index_value(self._order_by, k, data[k]), k))
+        return OrderedDict((k, data[k]) for k in keys)
+
+
+class _MemoryReference:
+    """Awaitable wrapper over a MemoryDatabase reference or query."""
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in ("key", "path"):
+            return attr
+        if name in ("parent",):
+            return _MemoryReference(attr)
+        if name in ("child", "order_by_child", "order_by_key", "order_by_value",
+                    "limit_to_first", "limit_to_last", "start_at", "end_at", "equal_to"):
+            return lambda *args: _MemoryReference(attr(*args))
+
+        async def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return _MemoryReference(result) if name == "push" else result
+        return call
+
+
+def reference(path="/"):
+    """Get an async database reference for a specific path."""
+    if ccb_db.BACKEND == "memory":
+        return _MemoryReference(ccb_db.reference(path))
+    return Reference(_split(path))
+
+
+def get_db():
+    """Get the async database root reference."""
+    return reference()
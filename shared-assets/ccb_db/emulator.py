@@ -0,0 +1,205 @@
+"""
+Local Realtime Database emulator.
+
+Serves a MemoryDatabase over the RTDB REST protocol (the part firebase_admin
+speaks: GET with ordered queries, shallow reads and ETags, PUT with
+if-match, PATCH, POST, DELETE and event-stream listens), so several service
+processes can share one local database. Point them at it with
+CCB_DB_BACKEND=emulator.
+
+    cd shared-assets && python -m ccb_db.emulator --port 9000
+
+--latency adds a fixed delay to every request, to stand in for the round
+trip to a hosted database when measuring how the services behave under
+concurrency.
+"""
+import argparse
+import json
+import queue
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .memory import MemoryDatabase
+
+# firebase_admin's ListenerRegistration.close() blocks until the stream's next
+# message, so keep-alives are sent often to keep shutdown quick
+KEEP_ALIVE_SECONDS = 2
+
+
+class RTDBRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive request
+    disable_nagle_algorithm = True
+    database = None  # set by make_server()
+    latency = 0.0  # seconds added to every request
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- request parsing ---
+
+    def _parse(self):
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        if path.endswith(".json"):
+            path = path[:-len(".json")]
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if self.latency:
+            time.sleep(self.latency)
+        return self.database.reference(path or "/"), params
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _send(self, status, value=None, etag=None, silent=False):
+        payload = b"" if silent else json.dumps(value).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, message):
+        self._send(status, {"error": message})
+
+    @staticmethod
+    def _query(ref, params):
+        order_by = json.loads(params["orderBy"])
+        if order_by == "$key":
+            query = ref.order_by_key()
+        elif order_by == "$value":
+            query = ref.order_by_value()
+        else:
+            query = ref.order_by_child(order_by)
+        if "equalTo" in params:
+            query = query.equal_to(json.loads(params["equalTo"]))
+        if "startAt" in params:
+            query = query.start_at(json.loads(params["startAt"]))
+        if "endAt" in params:
+            query = query.end_at(json.loads(params["endAt"]))
+        if "limitToFirst" in params:
+            query = query.limit_to_first(int(params["limitToFirst"]))
+        if "limitToLast" in params:
+            query = query.limit_to_last(int(params["limitToLast"]))
+        return query
+
+    # --- verbs ---
+
+    def do_GET(self):
+        ref, params = self._parse()
+        if "text/event-stream" in self.headers.get("Accept", ""):
+            return self._stream(ref)
+        try:
+            if "orderBy" in params:
+                value = self._query(ref, params).get()
+                return self._send(200, value)
+            value, etag = ref.get(etag=True, shallow=params.get("shallow") == "true")
+        except (ValueError, KeyError) as e:
+            return self._error(400, str(e))
+        if self.headers.get("X-Firebase-ETag") == "true":
+            return self._send(200, value, etag=etag)
+        self._send(200, value)
+
+    def do_PUT(self):
+        ref, params = self._parse()
+        value = self._body()
+        expected = self.headers.get("if-match")
+        if expected is not None:
+            ok, current, etag = ref.set_if_unchanged(expected, value)
+            return self._send(200 if ok else 412, current, etag=etag)
+        if value is None:
+            ref.delete()
+        else:
+            ref.set(value)
+        self._send(200, value, silent=params.get("print") == "silent")
+
+    def do_PATCH(self):
+        ref, params = self._parse()
+        value = self._body()
+        try:
+            ref.update(value)
+        except ValueError as e:
+            return self._error(400, str(e))
+        self._send(200, value, silent=params.get("print") == "silent")
+
+    def do_POST(self):
+        ref, _ = self._parse()
+        value = self._body()
+        if value is None:
+            return self._error(400, "Value must not be None.")
+        self._send(200, {"name": ref.push(value).key})
+
+    def do_DELETE(self):
+        ref, params = self._parse()
+        ref.delete()
+        self._send(200, None, silent=params.get("print") == "silent")
+
+    def _stream(self, ref):
+        events = queue.Queue()
+        registration = ref.listen(events.put)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=KEEP_ALIVE_SECONDS)
+                    data = {"path": event.path, "data": event.data}
+                    chunk = f"event: {event.event_type}\ndata: {json.dumps(data)}\n\n"
+                except queue.Empty:
+                    chunk = "event: keep-alive\ndata: null\n\n"
+                self.wfile.write(chunk.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            registration.close()
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections when hundreds of clients
+    # (service connection pools) connect at once
+    request_queue_size = 1024
+
+
+def make_server(host="127.0.0.1", port=9000, database=None, latency=0.0):
+    """An emulator server over ``database`` (a fresh MemoryDatabase by default)."""
+    handler = type("Handler", (RTDBRequestHandler,),
+                   {"database": database or MemoryDatabase(), "latency": latency})
+    server = _Server((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Realtime Database emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--seed", help="JSON file to load as the initial database")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="milliseconds added to every request (simulated network round trip)")
+    args = parser.parse_args()
+
+    database = MemoryDatabase()
+    if args.seed:
+        with open(args.seed) as f:
+            database.reference("/").set(json.load(f))
+
+    server = make_server(args.host, args.port, database, args.latency / 1000)
+    print(f"RTDB emulator listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+In-memory Realtime Database.
+
+Implements the subset of ``firebase_admin.db.Reference`` / ``Query`` the
+services use (get, set, update, push, delete, transaction, ordered queries,
+listen, and the timestamp / increment server values) on a plain JSON tree,
+so services and benchmarks can run without the cloud database. Also the
+storage behind the HTTP emulator (emulator.py).
+
+Reads return a JSON round-tripped copy of the stored data, so the cost of
+"downloading" a large subtree is still paid by the caller, as it would be
+with the real REST client.
+"""
+import hashlib
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from .push_id import generate_key
+
+
+def _split(path):
+    return [seg for seg in (path or "").split("/") if seg]
+
+
+def _etag(payload):
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+
+def _copy(value):
+    if value is None:
+        return None
+    return json.loads(json.dumps(value))
+
+
+def index_value(order_by, key, value):
+    """The value a child is ordered by: its key, itself or a (nested) child."""
+    if order_by == "$key":
+        return key
+    if order_by == "$value":
+        return value
+    node = value
+    for seg in _split(order_by):
+        node = node.get(seg) if isinstance(node, dict) else None
+    return node
+
+
+def sort_key(index, key):
+    # Same type ordering as RTDB: null < false < true < numbers < strings < objects
+    if index is None:
+        return (0, 0, key)
+    if index is False:
+        return (1, 0, key)
+    if index is True:
+        return (2, 0, key)
+    if isinstance(index, (int, float)):
+        return (3, index, key)
+    if isinstance(index, str):
+        return (4, index, key)
+    return (5, 0, key)
+
+
+def server_values(value, current):
+    """
+    Resolve RTDB server values in a value being written over ``current``:
+    {".sv": "timestamp"} and {".sv": {"increment": n}} (a missing or
+    non-numeric current value counts as 0).
+    """
+    if not isinstance(value, dict):
+        return value
+    if ".sv" in value and len(value) == 1:
+        sv = value[".sv"]
+        if sv == "timestamp":
+            return int(time.time() * 1000)
+        if isinstance(sv, dict) and isinstance(sv.get("increment"), (int, float)):
+            numeric = isinstance(current, (int, float)) and not isinstance(current, bool)
+            return (current if numeric else 0) + sv["increment"]
+        raise ValueError(f"Unsupported server value: {sv!r}")
+    return {k: server_values(v, current.get(k) if isinstance(current, dict) else None)
+            for k, v in value.items()}
+
+
+class Event:
+    """Same shape as ``firebase_admin.db.Event``."""
+
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class ListenerRegistration:
+    def __init__(self, db, segments, callback):
+        self._db = db
+        self.segments = segments
+        self.callback = callback
+
+    def close(self):
+        self._db._remove_listener(self)
+
+
+class MemoryDatabase:
+    """Thread-safe JSON tree with optional per-call latency."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._root = {}
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._events = queue.Queue()
+        self._dispatcher = None
+        self.calls = 0
+        self.bytes_read = 0
+
+    def reference(self, path="/"):
+        return Reference(self, _split(path))
+
+    # --- internals ---
+
+    def _round_trip(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read(self, segments):
+        node = self._root
+        for seg in segments:
+            if not isinstance(node, dict) or seg not in node:
+                return None
+            node = node[seg]
+        return node
+
+    def _write(self, segments, value):
+        if not segments:
+            self._root = value if isinstance(value, dict) else {}
+            return
+        node = self._root
+        parents = []
+        for seg in segments[:-1]:
+            child = node.get(seg)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = {}
+                node[seg] = child
+            parents.append((node, seg))
+            node = child
+        if value is None:
+            node.pop(segments[-1], None)
+            # RTDB drops empty parents
+            for parent, seg in reversed(parents):
+                if parent[seg]:
+                    break
+                del parent[seg]
+        else:
+            node[segments[-1]] = value
+
+    def _emit(self, listener, event):
+        # Like the real SDK, callbacks run on a background thread, in order
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+            self._dispatcher.start()
+        self._events.put((listener, event))
+
+    def _dispatch(self):
+        while True:
+            listener, event = self._events.get()
+            try:
+                if listener in self._listeners:
+                    listener.callback(event)
+            except Exception as e:
+                print(f"memory db listener error: {e!r}")
+            finally:
+                self._events.task_done()
+
+    def wait_for_events(self):
+        """Block until every queued listener event has been delivered."""
+        self._events.join()
+
+    def _notify(self, segments, event_type, data):
+        if event_type == "patch":
+            self._notify_patch(segments, data)
+            return
+        for listener in list(self._listeners):
+            base = listener.segments
+            if segments[:len(base)] == base:
+                rel = segments[len(base):]
+                self._emit(listener, Event("put", "/" + "/".join(rel), _copy(data)))
+            elif base[:len(segments)] == segments:
+                # Write above the listener: deliver the listener's slice
+                self._emit(listener, Event("put", "/", _copy(self._read(base))))
+
+    def _notify_patch(self, segments, data):
+        for listener in list(self._listeners):
+            base = listener.segments
+            if segments[:len(base)] == base:
+                rel = segments[len(base):]
+                self._emit(listener, Event("patch", "/" + "/".join(rel), _copy(data)))
+                continue
+            # Multi-path update above the listener: forward the paths under it
+            changes = {}
+            for path, value in data.items():
+                full = segments + _split(path)
+                if full[:len(base)] == base and len(full) > len(base):
+                    changes["/".join(full[len(base):])] = value
+                elif base[:len(full)] == full:
+                    self._emit(listener, Event("put", "/", _copy(self._read(base))))
+            if changes:
+                self._emit(listener, Event("patch", "/", _copy(changes)))
+
+    def _remove_listener(self, registration):
+        with self._lock:
+            if registration in self._listeners:
+                self._listeners.remove(registration)
+
+
+class Reference:
+    def __init__(self, db, segments):
+        self._db = db
+        self._segments = segments
+
+    @property
+    def key(self):
+        return self._segments[-1] if self._segments else None
+
+    @property
+    def path(self):
+        return "/" + "/".join(self._segments)
+
+    @property
+    def parent(self):
+        if not self._segments:
+            return None
+        return Reference(self._db, self._segments[:-1])
+
+    def child(self, path):
+        return Reference(self._db, self._segments + _split(path))
+
+    def get(self, etag=False, shallow=False):
+        self._db._round_trip()
+        with self._db._lock:
+            value = self._db._read(self._segments)
+            if shallow and isinstance(value, dict):
+                value = {k: True for k in value}
+            payload = json.dumps(value)
+        self._db.bytes_read += len(payload)
+        data = json.loads(payload)
+        if etag:
+            return data, _etag(payload)
+        return data
+
+    def set(self, value):
+        if value is None:
+            raise ValueError("Value must not be None.")
+        self._db._round_trip()
+        with self._db._lock:
+            value = server_values(_copy(value), self._db._read(self._segments))
+            self._db._write(self._segments, value)
+            self._db._notify(self._segments, "put", value)
+
+    def set_if_unchanged(self, expected_etag, value):
+        self._db._round_trip()
+        with self._db._lock:
+            current = self._db._read(self._segments)
+            payload = json.dumps(current)
+            if _etag(payload) != expected_etag:
+                return False, json.loads(payload), _etag(payload)
+            value = server_values(_copy(value), current)
+            self._db._write(self._segments, _copy(value))
+            self._db._notify(self._segments, "put", value)
+            return True, _copy(value), _etag(json.dumps(value))
+
+    def update(self, value):
+        if not value or not isinstance(value, dict):
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        self._db._round_trip()
+        with self._db._lock:
+            resolved = {}
+            for path, child in value.items():
+                segments = self._segments + _split(path)
+                resolved[path] = server_values(_copy(child), self._db._read(segments))
+                self._db._write(segments, _copy(resolved[path]))
+            self._db._notify(self._segments, "patch", resolved)
+
+    def push(self, value=""):
+        if value is None:
+            raise ValueError("Value must not be None.")
+        ref = self.child(generate_key())
+        if value != "":
+            ref.set(value)
+        return ref
+
+    def delete(self):
+        self._db._round_trip()
+        with self._db._lock:
+            self._db._write(self._segments, None)
+            self._db._notify(self._segments, "put", None)
+
+    def transaction(self, transaction_update):
+        with self._db._lock:
+            current = self.get()
+            new_value = transaction_update(current)
+            self._db._round_trip()
+            self._db._write(self._segments, _copy(new_value))
+            self._db._notify(self._segments, "put", new_value)
+            return new_value
+
+    def listen(self, callback):
+        registration = ListenerRegistration(self._db, self._segments, callback)
+        with self._db._lock:
+            self._db._listeners.append(registration)
+            self._db._emit(registration, Event("put", "/", _copy(self._db._read(self._segments))))
+        return registration
+
+    def order_by_child(self, path):
+        return Query(self, path)
+
+    def order_by_key(self):
+        return Query(self, "$key")
+
+    def order_by_value(self):
+        return Query(self, "$value")
+
+
+class Query:
+    def __init__(self, ref, order_by):
+        self._ref = ref
+        self._order_by = order_by
+        self._start = None
+        self._end = None
+        self._first = None
+        self._last = None
+
+    def limit_to_first(self, limit):
+        self._first = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self._last = limit
+        return self
+
+    def start_at(self, start):
+        self._start = start
+        return self
+
+    def end_at(self, end):
+        self._end = end
+        return self
+
+    def equal_to(self, value):
+        self._start = self._end = value
+        return self
+
+    def get(self):
+        ref = self._ref
+        ref._db._round_trip()
+        with ref._db._lock:
+            data = ref._db._read(ref._segments)
+            if not isinstance(data, dict):
+                return _copy(data)
+            entries = []
+            for key, value in data.items():
+                entries.append((sort_key(index_value(self._order_by, key, value), key), key, value))
+        entries.sort(key=lambda e: e[0])
+
+        if self._start is not None:
+            lo = sort_key(self._start, "")
+            entries = [e for e in entries if e[0][:2] >= lo[:2]]
+        if self._end is not None:
+            hi = sort_key(self._end, "")
+            entries = [e for e in entries if e[0][:2] <= hi[:2]]
+        if self._first is not None:
+            entries = entries[:self._first]
+        if self._last is not None:
+            entries = entries[-self._last:] if self._last else []
+
+        payload = json.dumps({key: value for _, key, value in entries})
+        ref._db.bytes_read += len(payload)
+        decoded = json.loads(payload)
+        return OrderedDict((key, decoded[key]) for _, key, _ in entries)
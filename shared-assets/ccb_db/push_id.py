@@ -0,0 +1,36 @@
+"""Push ids generated locally, so new records can go into a multi-path update."""
+import random
+import threading
+import time
+
+# Same alphabet and layout as the ids generated by push()
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+_last_push_time = 0
+_last_rand_chars = [0] * 12
+_push_lock = threading.Lock()
+
+
+def generate_key():
+    """
+    Generate a chronologically ordered push id locally, without a round trip,
+    so it can be used in a multi-path update.
+    """
+    global _last_push_time, _last_rand_chars
+    with _push_lock:
+        now = int(time.time() * 1000)
+        if now == _last_push_time:
+            # Same millisecond: increment the random part to keep ordering
+            for i in range(11, -1, -1):
+                if _last_rand_chars[i] != 63:
+                    _last_rand_chars[i] += 1
+                    break
+                _last_rand_chars[i] = 0
+        else:
+            _last_push_time = now
+            _last_rand_chars = [random.randrange(64) for _ in range(12)]
+
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        return "".join(reversed(time_chars)) + "".join(PUSH_CHARS[i] for i in _last_rand_chars)
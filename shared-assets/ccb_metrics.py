@@ -0,0 +1,136 @@
+"""
+Prometheus metrics shared by the services.
+
+    from ccb_metrics import instrument
+    instrument(app)
+
+records latency, response size and in-flight count for every route, times
+each database call made through ccb_db (operation, path, bytes returned) and
+serves it all on GET /metrics. With SERVER_TIMING=1 every response also gets
+a Server-Timing header splitting its time into database and application
+(our code plus JSON serialization) time.
+
+Background workers without an HTTP app call start_metrics_server(port).
+Metrics are per process; run one uvicorn worker per pod (as the K8s
+manifests do) or each worker will only report its own share.
+"""
+import contextvars
+import os
+import re
+import time
+
+from prometheus_client import (CONTENT_TYPE_LATEST, Counter, Gauge, Histogram,
+                               generate_latest, start_http_server)
+
+import ccb_db
+
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+REQUESTS = Counter("http_requests_total", "HTTP requests", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency",
+                            ["method", "route"], buckets=LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "HTTP response body size",
+                          ["method", "route"], buckets=SIZE_BUCKETS)
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served")
+
+DB_LATENCY = Histogram("ccb_db_call_duration_seconds", "Database call latency",
+                       ["operation", "path"], buckets=LATENCY_BUCKETS)
+DB_RESPONSE_SIZE = Histogram("ccb_db_response_bytes", "Database response size",
+                             ["operation", "path"], buckets=SIZE_BUCKETS)
+
+# [database seconds, database calls] for the request being served. Sync
+# handlers run in a copy of this context, so they add to the same list.
+_request_timing = contextvars.ContextVar("ccb_request_timing", default=None)
+
+_NAME = re.compile(r"[A-Za-z_]+")
+
+
+def path_template(path):
+    """
+    Collapse ids in a database path so it can be a metric label:
+    users/3f2a.../auth -> users/{id}/auth. The first segment is always kept;
+    after that anything that isn't a plain word is treated as an id.
+    """
+    segments = [s for s in path.split("/") if s]
+    return "/".join(s if i == 0 or _NAME.fullmatch(s) else "{id}"
+                    for i, s in enumerate(segments)) or "/"
+
+
+def _observe_db_call(operation, path, seconds, nbytes):
+    label = path_template(path)
+    DB_LATENCY.labels(operation, label).observe(seconds)
+    DB_RESPONSE_SIZE.labels(operation, label).observe(nbytes)
+    timing = _request_timing.get()
+    if timing is not None:
+        timing[0] += seconds
+        timing[1] += 1
+
+
+def _server_timing(start, timing):
+    total = (time.perf_counter() - start) * 1000
+    db_ms = timing[0] * 1000
+    return (f'db;dur={db_ms:.1f};desc="{timing[1]} calls", '
+            f'app;dur={total - db_ms:.1f}, total;dur={total:.1f}').encode("latin-1")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timing = [0.0, 0]
+        token = _request_timing.set(timing)
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", _server_timing(start, timing))]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            IN_FLIGHT.dec()
+            _request_timing.reset(token)
+            # Route template, not the raw path, to keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            REQUESTS.labels(method, route, str(status)).inc()
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            RESPONSE_SIZE.labels(method, route).observe(size)
+
+
+def instrument(app):
+    """Add request/database metrics and a /metrics endpoint to a FastAPI app."""
+    from fastapi import Response  # not needed by workers without an HTTP app
+
+    def metrics_response():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    ccb_db.add_call_observer(_observe_db_call)
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_response, methods=["GET"], include_in_schema=False)
+
+
+def start_metrics_server(port):
+    """Serve /metrics from a background thread, for workers without an HTTP app."""
+    ccb_db.add_call_observer(_observe_db_call)
+    start_http_server(port)
@@ -0,0 +1,138 @@
+"""
+Sales aggregates for the admin dashboard, maintained on write.
+
+`salesStats` holds counters that order-service and payment-service change
+in the same multi-path update as the write they describe. The changes are
+increment server values, so concurrent writers add up instead of
+overwriting each other:
+
+    totals                   {orders, revenueCents, paidOrders, paidRevenueCents}
+    days/{YYYY-MM-DD}        the same, by the day the order was placed
+    statuses/{status}        {orders, revenueCents} currently in that status
+    products/{productId}     {units, orders, revenueCents} sold (paid)
+    categories/{categoryId}  the same, by each line's category at checkout
+
+Money is counted in integer cents, so increments never pick up float error.
+Placing an order counts it in totals, on its day and under its status.
+Payment moves it from PENDING to PAID, which adds the paid counters and the
+product and category sales, or to PAYMENT_FAILED. Expiry moves it to
+EXPIRED. PROCESSING is a claim rather than a stage and is counted as
+PENDING.
+
+    from ccb_sales import placed_updates, status_updates
+    db.update({**order_writes, **placed_updates(order_data)})
+
+order-service/sales_stats.py recomputes everything from `orders`.
+"""
+from collections import Counter
+
+STATS_PATH = "salesStats"
+UNCATEGORIZED = "uncategorized"
+_INVALID_KEY_CHARS = set("/.#$[]")
+
+
+def _key(value, default):
+    """`value` if it can be an RTDB key, else `default`."""
+    if isinstance(value, str) and value and not _INVALID_KEY_CHARS & set(value):
+        return value
+    return default
+
+
+def cents(amount):
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        return 0
+    return int(round(amount * 100))
+
+
+def order_day(order_data):
+    return _key((order_data.get("createdAt") or "")[:10], "unknown")
+
+
+def stats_status(status):
+    return "PENDING" if status == "PROCESSING" else _key(status, "UNKNOWN")
+
+
+def order_lines(order_data):
+    """
+    [(productId, quantity, unit price in cents, categoryId)] for an order,
+    compact (`lines`) or written before it (`cartItems`, priced from `items`).
+    """
+    lines = order_data.get("lines")
+    if not isinstance(lines, dict):
+        listed = {item.get("id"): item for item in order_data.get("items") or []
+                  if isinstance(item, dict)}
+        lines = {}
+        for product_id, entry in (order_data.get("cartItems") or {}).items():
+            entry = entry if isinstance(entry, dict) else {"quantity": entry}
+            lines[product_id] = {**listed.get(product_id, {}), **entry}
+
+    result = []
+    for product_id, line in lines.items():
+        if not isinstance(line, dict):
+            continue
+        quantity = line.get("quantity", 1)
+        if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or quantity < 1:
+            continue
+        result.append((product_id, int(quantity), cents(line.get("price")),
+                       _key(line.get("categoryId"), UNCATEGORIZED)))
+    return result
+
+
+def _placed(order_data):
+    day, revenue = order_day(order_data), cents(order_data.get("totalPrice"))
+    return Counter({"totals/orders": 1, "totals/revenueCents": revenue,
+                    f"days/{day}/orders": 1, f"days/{day}/revenueCents": revenue})
+
+
+def _in_status(order_data, status, sign):
+    status = stats_status(status)
+    return Counter({f"statuses/{status}/orders": sign,
+                    f"statuses/{status}/revenueCents": sign * cents(order_data.get("totalPrice"))})
+
+
+def _paid(order_data):
+    day, revenue = order_day(order_data), cents(order_data.get("totalPrice"))
+    deltas = Counter({"totals/paidOrders": 1, "totals/paidRevenueCents": revenue,
+                      f"days/{day}/paidOrders": 1, f"days/{day}/paidRevenueCents": revenue})
+    categories = set()
+    for product_id, quantity, price, category in order_lines(order_data):
+        deltas[f"products/{product_id}/units"] += quantity
+        deltas[f"products/{product_id}/orders"] += 1
+        deltas[f"products/{product_id}/revenueCents"] += quantity * price
+        deltas[f"categories/{category}/units"] += quantity
+        deltas[f"categories/{category}/revenueCents"] += quantity * price
+        categories.add(category)
+    for category in categories:
+        deltas[f"categories/{category}/orders"] += 1
+    return deltas
+
+
+def increments(deltas):
+    """Multi-path update entries applying {path under salesStats: delta}."""
+    return {f"{STATS_PATH}/{path}": {".sv": {"increment": delta}}
+            for path, delta in deltas.items() if delta}
+
+
+def placed_updates(order_data):
+    """Update entries counting a newly placed order."""
+    deltas = _placed(order_data)
+    deltas.update(_in_status(order_data, order_data.get("status"), 1))
+    return increments(deltas)
+
+
+def status_updates(order_data, old_status, new_status):
+    """Update entries moving an order between statuses (and counting the sale if it is now PAID)."""
+    deltas = _in_status(order_data, old_status, -1)
+    deltas.update(_in_status(order_data, new_status, 1))
+    if new_status == "PAID":
+        deltas.update(_paid(order_data))
+    return increments(deltas)
+
+
+def order_contribution(order_data):
+    """Everything one order in its current status adds to the aggregates, for rebuilds."""
+    deltas = _placed(order_data)
+    deltas.update(_in_status(order_data, order_data.get("status"), 1))
+    if order_data.get("status") == "PAID":
+        deltas.update(_paid(order_data))
+    return deltas
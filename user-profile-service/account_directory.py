@@ -0,0 +1,69 @@
+"""
+Account id -> kind directory.
+
+Every account gets an entry at ``accountDirectory/{id}`` holding
+``{"table": "users" | "admins", "email": <email>}`` so endpoints that address
+an account by id (admin update, status, delete, bulk) resolve it with one
+small read instead of probing `users/{id}` and then `admins/{id}`. The entry
+is written with the account at signup and removed with it on delete.
+
+Run this module directly to backfill the directory from existing data:
+
+    python account_directory.py
+"""
+import asyncio
+
+from database import get_ref, get_async_ref
+
+DIRECTORY_PATH = "accountDirectory"
+TABLES = ("users", "admins")
+# RTDB key characters that would turn an id into a different path
+_INVALID_ID_CHARS = set("/.#$[]")
+
+
+def directory_path(account_id: str) -> str:
+    """Path of an account's directory entry, for use in multi-path updates."""
+    return f"{DIRECTORY_PATH}/{account_id}"
+
+
+def directory_entry(table: str, email: str) -> dict:
+    return {"table": table, "email": email}
+
+
+async def resolve(account_id: str):
+    """Return the directory entry ({'table', 'email'}) for an account id, or None."""
+    if not account_id or _INVALID_ID_CHARS & set(account_id):
+        return None
+    entry = await get_async_ref(directory_path(account_id)).get()
+    if not isinstance(entry, dict) or entry.get("table") not in TABLES:
+        return None
+    return entry
+
+
+async def resolve_many(account_ids):
+    """{account id: entry} for the ids that exist (lookups run concurrently)."""
+    ids = list(dict.fromkeys(account_ids))
+    entries = await asyncio.gather(*(resolve(account_id) for account_id in ids))
+    return {account_id: entry for account_id, entry in zip(ids, entries) if entry}
+
+
+def backfill():
+    """Build directory entries for every existing user and admin."""
+    updates = {}
+    # Users last so they win if an id exists in both tables (lookups checked users first)
+    for table in ("admins", "users"):
+        accounts = get_ref(table).get() or {}
+        for account_id, data in accounts.items():
+            if not isinstance(data, dict):
+                continue
+            email = data.get("auth", {}).get("email", "")
+            updates[directory_path(account_id)] = directory_entry(table, email)
+
+    paths = list(updates)
+    for start in range(0, len(paths), 1000):
+        get_ref("/").update({path: updates[path] for path in paths[start:start + 1000]})
+    print(f"Indexed {len(updates)} account ids")
+
+
+if __name__ == "__main__":
+    backfill()
@@ -1,8 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers import auth, profile, users
+# Importing the routers put shared-assets on sys.path (see database.py)
+from ccb_metrics import instrument
+from profile_cache import profile_cache
 
 app = FastAPI(title="CCB User Service")
+instrument(app)
+
+@app.on_event("startup")
+def start_profile_cache():
+    profile_cache.start_listener()
+
+@app.on_event("shutdown")
+def stop_profile_cache():
+    profile_cache.stop_listener()
 
 # CORS
 app.add_middleware(
@@ -19,5 +31,5 @@ app.include_router(profile.router)
 app.include_router(users.router)
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Service Running"}
@@ -1,26 +1,20 @@
-import firebase_admin
-from firebase_admin import credentials, db
 import os
+import sys
 
-# 1. Setup Firebase - Check K8s mounted path first, then fall back to local
-SERVICE_ACCOUNT_PATH = os.environ.get(
-    "GOOGLE_APPLICATION_CREDENTIALS",
-    "/app/serviceAccountKey.json"  # K8s mounted path
-)
-# Fall back to local file if mounted path doesn't exist
-if not os.path.exists(SERVICE_ACCOUNT_PATH):
-    SERVICE_ACCOUNT_PATH = os.path.join(os.path.dirname(__file__), "serviceAccountKey.json")
+# Shared data-access layer in ../shared-assets/ccb_db (same layout in the Docker images)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared-assets"))
+import ccb_db  # noqa: E402
+from ccb_db import aio, generate_key  # noqa: E402, F401
 
-DATABASE_URL = "https://ccb-db-41f73-default-rtdb.firebaseio.com"
+# Backend (Firebase, local emulator or in-memory) is chosen by CCB_DB_BACKEND;
+# see shared-assets/ccb_db/__init__.py
 
-if not firebase_admin._apps:
-    if os.path.exists(SERVICE_ACCOUNT_PATH):
-        cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
-        firebase_admin.initialize_app(cred, {"databaseURL": DATABASE_URL})
-        print(f"Firebase connected using: {SERVICE_ACCOUNT_PATH}")
-    else:
-        raise RuntimeError(f"FATAL: serviceAccountKey.json not found at {SERVICE_ACCOUNT_PATH}")
 
 def get_ref(path):
     """Get a database reference for a specific path."""
-    return db.reference(path)
+    return ccb_db.reference(path)
+
+
+def get_async_ref(path):
+    """Get an async database reference (awaitable get/set/update...) for request handlers."""
+    return aio.reference(path)
@@ -0,0 +1,87 @@
+"""
+Email -> account index.
+
+Every account gets an entry at ``emailIndex/{email_key}`` holding
+``{"table": "users" | "admins", "id": <account id>}`` so login and signup can
+find an account with a single small read instead of downloading every user
+and admin.
+
+Run this module directly to backfill the index from existing data:
+
+    python email_index.py
+
+Keys are escaped with '!'. The backfill also deletes entries left by the
+first version of the index, which escaped with '%': the REST API decodes
+'%' sequences in request paths, so those entries were never found.
+"""
+from database import get_ref, get_async_ref
+
+INDEX_PATH = "emailIndex"
+
+# Characters RTDB does not allow in keys, plus '%' and '?' which the REST API
+# would decode from the request URL. '!' is the escape ('!' first so it round-trips)
+_ESCAPES = [("!", "!21"), ("%", "!25"), ("?", "!3F"), (".", "!2E"), ("$", "!24"),
+            ("#", "!23"), ("[", "!5B"), ("]", "!5D"), ("/", "!2F")]
+
+
+def email_key(email: str) -> str:
+    """Turn an email into a valid RTDB key."""
+    key = email
+    for char, escaped in _ESCAPES:
+        key = key.replace(char, escaped)
+    return key
+
+
+def index_path(email: str) -> str:
+    """Path of an email's index entry, for use in multi-path updates."""
+    return f"{INDEX_PATH}/{email_key(email)}"
+
+
+async def lookup_email(email: str):
+    """Return the index entry ({'table', 'id'}) for an email, or None."""
+    entry = await get_async_ref(index_path(email)).get()
+    if not isinstance(entry, dict):
+        return None
+    return entry
+
+
+async def claim_email(email: str, table: str, account_id: str) -> bool:
+    """
+    Atomically reserve an email for a new account.
+    Returns False if the email already belongs to another account.
+    """
+    entry = {"table": table, "id": account_id}
+
+    def claim(current):
+        return current if current else entry
+
+    result = await get_async_ref(index_path(email)).transaction(claim)
+    return result == entry
+
+
+def backfill():
+    """Build index entries for every existing user and admin."""
+    updates = {}
+    # Users last so they win if an email exists in both tables (login checked users first)
+    for table in ("admins", "users"):
+        accounts = get_ref(table).get() or {}
+        for account_id, data in accounts.items():
+            if not isinstance(data, dict):
+                continue
+            email = data.get("auth", {}).get("email")
+            if email:
+                updates[index_path(email)] = {"table": table, "id": account_id}
+
+    if updates:
+        get_ref("/").update(updates)
+    print(f"Indexed {len(updates)} accounts")
+
+    # Keys in an update body aren't URL-decoded, so old '%' keys can be deleted this way
+    legacy = [key for key in get_ref(INDEX_PATH).get(shallow=True) or {} if "%" in key]
+    if legacy:
+        get_ref(INDEX_PATH).update({key: None for key in legacy})
+        print(f"Removed {len(legacy)} entries with '%'-escaped keys")
+
+
+if __name__ == "__main__":
+    backfill()
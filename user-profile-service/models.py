@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 # Signup Models
 class UserSignup(BaseModel):
@@ -26,3 +26,13 @@ class UpdateProfile(BaseModel):
     city: Optional[str] = None
     state: Optional[str] = None
     zip: Optional[str] = None
+
+# Admin bulk updates
+class AccountUpdate(BaseModel):
+    id: str
+    name: Optional[str] = None
+    phone: Optional[str] = None
+    status: Optional[str] = None
+
+class BulkAccountUpdate(BaseModel):
+    accounts: List[AccountUpdate]
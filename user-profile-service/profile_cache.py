@@ -0,0 +1,165 @@
+"""
+Per-process cache of account profiles (`users/{id}/profile`, `admins/{id}/profile`).
+
+Entries are (profile, etag) pairs, kept for `ttl` seconds and at most
+`max_size` of them (least recently used go first). Our own writes update the
+cache directly (write-through). Other replicas learn about them from
+`profileChanges/{table}/{id}`: every profile write also stores a fresh marker
+there, and the listener drops the matching entry when one arrives from
+another replica. If the listener can't be started, entries simply expire
+after `ttl`.
+
+The etag is None when a write didn't report one (admin multi-path updates);
+readers get the profile either way, conditional writers fetch a fresh etag.
+"""
+import asyncio
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from database import generate_key, get_async_ref, get_ref
+
+# Seconds a cached profile may be served; the listener usually drops it sooner
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL", "60"))
+PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", "10000"))
+
+CHANGES_PATH = "profileChanges"
+REPLICA_ID = os.environ.get("PROFILE_REPLICA_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class ProfileCache:
+    def __init__(self, ttl=60.0, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()  # the listener runs on its own thread
+        self._entries = OrderedDict()  # path -> (profile, etag, stored_at)
+        self._generation = 0  # bumped by every invalidation
+        self._listener = None
+        self._pending = set()  # marker writes still in flight
+        self.hits = 0
+        self.misses = 0
+
+    # --- reads ---
+
+    async def get(self, path):
+        """(profile, etag) for `path`, from the cache or the database. profile is None if missing."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and time.monotonic() - entry[2] < self.ttl:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        profile, etag = await get_async_ref(path).get(etag=True)
+        with self._lock:
+            # Don't cache a value that may have been invalidated while we read it
+            if profile and generation == self._generation:
+                self._store(path, profile, etag)
+        return profile, etag
+
+    # --- writes ---
+
+    def put(self, path, profile, etag=None):
+        """Write-through after we changed `path` ourselves."""
+        with self._lock:
+            if profile:
+                self._store(path, profile, etag)
+            else:
+                self._entries.pop(path, None)
+
+    def patch(self, path, updates):
+        """Write-through for a partial write: merge `updates` into the cached profile, if any."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                profile = {k: v for k, v in {**entry[0], **updates}.items() if v is not None}
+                self._store(path, profile, None)  # etag of the merged value is unknown
+
+    def invalidate(self, path):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(path, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _store(self, path, profile, etag):
+        """Caller holds the lock."""
+        self._entries[path] = (profile, etag, time.monotonic())
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    # --- cross-replica invalidation ---
+
+    @staticmethod
+    def change_marker(path):
+        """{marker path: value} to include in a multi-path update that writes `path`."""
+        table, account_id = path.split("/")[:2]
+        return {f"{CHANGES_PATH}/{table}/{account_id}": {"replica": REPLICA_ID, "key": generate_key()}}
+
+    def announce(self, path, updates=None):
+        """
+        Write the change marker for `path` in the background, after a write
+        that couldn't carry it, together with any `updates` derived from the
+        change (multi-path, e.g. the account summary).
+        """
+        async def write_marker():
+            try:
+                await get_async_ref("/").update({**(updates or {}), **self.change_marker(path)})
+            except Exception as e:
+                print(f"Profile change marker for {path} not written: {e}")
+
+        task = asyncio.get_running_loop().create_task(write_marker())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def start_listener(self):
+        """Subscribe to profile change markers. Returns False if we must rely on the TTL."""
+        try:
+            self._listener = get_ref(CHANGES_PATH).listen(self._on_event)
+            return True
+        except Exception as e:
+            print(f"Profile change listener unavailable, using {self.ttl}s TTL: {e}")
+            self._listener = None
+            return False
+
+    def stop_listener(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _on_event(self, event):
+        segments = [s for s in (event.path or "").split("/") if s]
+        if not segments:
+            if event.event_type == "put":
+                # Initial snapshot, or a reconnect after which we may have missed markers
+                self.clear()
+                return
+            # multi-path update: {"users/{id}": marker, ...}
+            changes = [c for key, value in (event.data or {}).items()
+                       for c in _changes(key.split("/"), value)]
+        else:
+            changes = _changes(segments, event.data)
+
+        for table, account_id, marker in changes:
+            if isinstance(marker, dict) and marker.get("replica") == REPLICA_ID:
+                continue  # our own write, already in the cache
+            self.invalidate(f"{table}/{account_id}/profile")
+
+
+def _changes(segments, data):
+    """(table, account id, marker) for data written at profileChanges/<segments>."""
+    if len(segments) == 1:
+        return [(segments[0], account_id, marker) for account_id, marker in (data or {}).items()]
+    # A marker, or part of one (then we can't tell who wrote it)
+    return [(segments[0], segments[1], data if len(segments) == 2 else None)]
+
+
+profile_cache = ProfileCache(ttl=PROFILE_CACHE_TTL, max_size=PROFILE_CACHE_SIZE)
@@ -1,88 +1,101 @@
 from fastapi import APIRouter, HTTPException
-from database import get_ref
+from database import get_async_ref
 from models import UserSignup, AdminSignup, LoginRequest
-from utils import hash_password, verify_password, create_token
+from utils import hash_password, verify_password, needs_rehash, create_token
+from email_index import lookup_email, claim_email, index_path
+from user_summaries import make_summary, summary_path
+from account_directory import directory_entry, directory_path
 import uuid
 import datetime
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/signup/user")
-def signup_user(user: UserSignup):
-    users_ref = get_ref("users")
-    
-    # Check if email exists
-    all_users = users_ref.get() or {}
-    for u in all_users.values():
-        if u.get("auth", {}).get("email") == user.email:
-            raise HTTPException(400, "Email already exists")
-
+async def signup_user(user: UserSignup):
     user_id = str(uuid.uuid4())
-    new_user = {
-        "auth": {
-            "email": user.email,
-            "password": hash_password(user.password),
-            "createdAt": str(datetime.datetime.now()),
-            "lastLoginAt": ""
-        },
-        "profile": {
-            "name": user.name,
-            "phone": user.phone,
-            "role": "user",
-            "status": "active"
+
+    # Reserve the email (fails if any user or admin already has it)
+    if not await claim_email(user.email, "users", user_id):
+        raise HTTPException(400, "Email already exists")
+
+    # Everything after the claim releases it on failure (including a full hash pool)
+    try:
+        new_user = {
+            "auth": {
+                "email": user.email,
+                "password": await hash_password(user.password),
+                "createdAt": str(datetime.datetime.now()),
+                "lastLoginAt": ""
+            },
+            "profile": {
+                "name": user.name,
+                "phone": user.phone,
+                "role": "user",
+                "status": "active"
+            }
         }
-    }
-    users_ref.child(user_id).set(new_user)
+        # Account, its admin-list summary and directory entry in one write
+        await get_async_ref("/").update({
+            f"users/{user_id}": new_user,
+            directory_path(user_id): directory_entry("users", user.email),
+            summary_path("users", user_id): make_summary("users", user_id, new_user["auth"],
+                                                         new_user["profile"]),
+        })
+    except Exception:
+        await get_async_ref(index_path(user.email)).delete()
+        raise
     return {"message": "User registered", "user_id": user_id}
 
 @router.post("/signup/admin")
-def signup_admin(admin: AdminSignup):
-    admins_ref = get_ref("admins")
-    
-    all_admins = admins_ref.get() or {}
-    for a in all_admins.values():
-        if a.get("auth", {}).get("email") == admin.email:
-            raise HTTPException(400, "Email already exists")
-
+async def signup_admin(admin: AdminSignup):
     admin_id = str(uuid.uuid4())
-    new_admin = {
-        "auth": {
-            "email": admin.email,
-            "password": hash_password(admin.password),
-            "createdAt": str(datetime.datetime.now()),
-            "lastLoginAt": ""
-        },
-        "profile": {
-            "name": admin.name,
-            "role": "admin",
-            "status": "active"
+
+    if not await claim_email(admin.email, "admins", admin_id):
+        raise HTTPException(400, "Email already exists")
+
+    try:
+        new_admin = {
+            "auth": {
+                "email": admin.email,
+                "password": await hash_password(admin.password),
+                "createdAt": str(datetime.datetime.now()),
+                "lastLoginAt": ""
+            },
+            "profile": {
+                "name": admin.name,
+                "role": "admin",
+                "status": "active"
+            }
         }
-    }
-    admins_ref.child(admin_id).set(new_admin)
+        await get_async_ref("/").update({
+            f"admins/{admin_id}": new_admin,
+            directory_path(admin_id): directory_entry("admins", admin.email),
+            summary_path("admins", admin_id): make_summary("admins", admin_id, new_admin["auth"],
+                                                           new_admin["profile"]),
+        })
+    except Exception:
+        await get_async_ref(index_path(admin.email)).delete()
+        raise
     return {"message": "Admin registered", "admin_id": admin_id}
 
 @router.post("/login")
-def login(creds: LoginRequest):
-    # Check Users
-    users = get_ref("users").get() or {}
-    for uid, data in users.items():
-        # Skip invalid entries (might be bool or other non-dict types)
-        if not isinstance(data, dict):
-            continue
-        if data.get("auth", {}).get("email") == creds.email:
-            if verify_password(creds.password, data["auth"]["password"]):
-                token = create_token({"sub": uid, "role": "user"})
-                return {"access_token": token, "token_type": "bearer", "role": "user"}
-    
-    # Check Admins
-    admins = get_ref("admins").get() or {}
-    for aid, data in admins.items():
-        # Skip invalid entries (might be bool or other non-dict types)
-        if not isinstance(data, dict):
-            continue
-        if data.get("auth", {}).get("email") == creds.email:
-            if verify_password(creds.password, data["auth"]["password"]):
-                token = create_token({"sub": aid, "role": "admin"})
-                return {"access_token": token, "token_type": "bearer", "role": "admin"}
+async def login(creds: LoginRequest):
+    # Resolve the account through the email index (one small read)
+    entry = await lookup_email(creds.email)
+    if entry:
+        table, account_id = entry["table"], entry["id"]
+        auth = await get_async_ref(f"{table}/{account_id}/auth").get()
+        if isinstance(auth, dict) and auth.get("email") == creds.email:
+            if await verify_password(creds.password, auth["password"]):
+                # Upgrade hashes made with an old cost factor while we have the password
+                if needs_rehash(auth["password"]):
+                    try:
+                        await get_async_ref(f"{table}/{account_id}/auth").update(
+                            {"password": await hash_password(creds.password)})
+                    except HTTPException:
+                        pass  # hash pool busy; upgrade on a later login
+                role = "user" if table == "users" else "admin"
+                token = create_token({"sub": account_id, "role": role})
+                return {"access_token": token, "token_type": "bearer", "role": role}
 
     raise HTTPException(400, "Invalid credentials")
@@ -1,30 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException
-from database import get_ref
+from database import get_async_ref
 from models import UpdateProfile
+from profile_cache import profile_cache
+from user_summaries import summary_updates
 from utils import get_current_user
 
 router = APIRouter(prefix="/profile", tags=["Profile"])
 
+WRITE_RETRIES = 5
+
+def _table(user):
+    return "users" if user["role"] == "user" else "admins"
+
+def _profile_path(user):
+    return f"{_table(user)}/{user['sub']}/profile"
+
 @router.get("/me")
-def get_my_profile(user: dict = Depends(get_current_user)):
-    table = "users" if user["role"] == "user" else "admins"
-    ref = get_ref(f"{table}/{user['sub']}/profile")
-    
-    profile = ref.get()
+async def get_my_profile(user: dict = Depends(get_current_user)):
+    profile, _ = await profile_cache.get(_profile_path(user))
     if not profile:
         raise HTTPException(404, "Profile not found")
     return profile
 
 @router.put("/me")
-def update_my_profile(update: UpdateProfile, user: dict = Depends(get_current_user)):
-    table = "users" if user["role"] == "user" else "admins"
-    ref = get_ref(f"{table}/{user['sub']}/profile")
-    
-    if not ref.get():
-        raise HTTPException(404, "Profile not found")
-
+async def update_my_profile(update: UpdateProfile, user: dict = Depends(get_current_user)):
+    path = _profile_path(user)
+    ref = get_async_ref(path)
     data = update.dict(exclude_unset=True)
-    if data:
-        ref.update(data)
-        
+
+    # Write against the cached version; if it changed (or we have no etag for
+    # it) the 412 carries the current profile and we retry on top of that
+    profile, etag = await profile_cache.get(path)
+    for _ in range(WRITE_RETRIES):
+        if not profile:
+            profile_cache.invalidate(path)
+            raise HTTPException(404, "Profile not found")
+        if not data:
+            break
+        updated = {k: v for k, v in {**profile, **data}.items() if v is not None}
+        ok, profile, etag = await ref.set_if_unchanged(etag or "", updated)
+        if ok:
+            profile_cache.put(path, updated, etag)
+            profile_cache.announce(path, summary_updates(_table(user), user["sub"], data))
+            break
+    else:
+        raise HTTPException(409, "Profile changed concurrently, try again")
+
     return {"message": "Updated", "updates": data}
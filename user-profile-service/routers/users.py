@@ -1,140 +1,168 @@
-from fastapi import APIRouter, Depends, HTTPException
-from database import get_ref
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import Optional
+from database import get_async_ref
 from utils import get_current_user
+from email_index import index_path
+from account_directory import directory_path, resolve, resolve_many
+from models import BulkAccountUpdate
+from profile_cache import profile_cache
+from user_summaries import list_summaries, summary_path, summary_updates
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-def require_admin(user: dict = Depends(get_current_user)):
+async def require_admin(user: dict = Depends(get_current_user)):
     """Middleware to ensure user is admin"""
     if user.get("role") != "admin":
         raise HTTPException(403, "Admin access required")
     return user
 
+async def _list_accounts(table, response, email, name, status, limit, cursor):
+    try:
+        accounts, next_cursor = await list_summaries(table, email, name, status, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return accounts
+
 @router.get("/")
-def get_all_users(admin: dict = Depends(require_admin)):
-    """Get all users (admin only)"""
-    users_ref = get_ref("users")
-    users_data = users_ref.get() or {}
-    
-    users_list = []
-    for uid, data in users_data.items():
-        if not isinstance(data, dict):
-            continue
-        users_list.append({
-            "id": uid,
-            "email": data.get("auth", {}).get("email", ""),
-            "name": data.get("profile", {}).get("name", ""),
-            "phone": data.get("profile", {}).get("phone", ""),
-            "role": data.get("profile", {}).get("role", "user"),
-            "status": data.get("profile", {}).get("status", "active"),
-            "createdAt": data.get("auth", {}).get("createdAt", ""),
-            "lastLoginAt": data.get("auth", {}).get("lastLoginAt", ""),
-        })
-    
-    return users_list
+async def get_all_users(
+    response: Response,
+    email: Optional[str] = None,
+    name: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(require_admin),
+):
+    """
+    Get users (admin only), sorted by email, from the userSummaries projection.
+    email/name are prefix searches, status an exact match. With a limit, the
+    cursor for the next page is returned in X-Next-Cursor.
+    """
+    return await _list_accounts("users", response, email, name, status, limit, cursor)
 
 @router.get("/admins")
-def get_all_admins(admin: dict = Depends(require_admin)):
-    """Get all admins (admin only)"""
-    admins_ref = get_ref("admins")
-    admins_data = admins_ref.get() or {}
-    
-    admins_list = []
-    for aid, data in admins_data.items():
-        if not isinstance(data, dict):
-            continue
-        admins_list.append({
-            "id": aid,
-            "email": data.get("auth", {}).get("email", ""),
-            "name": data.get("profile", {}).get("name", ""),
-            "role": "admin",
-            "status": data.get("profile", {}).get("status", "active"),
-            "createdAt": data.get("auth", {}).get("createdAt", ""),
-            "lastLoginAt": data.get("auth", {}).get("lastLoginAt", ""),
-        })
-    
-    return admins_list
+async def get_all_admins(
+    response: Response,
+    email: Optional[str] = None,
+    name: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(require_admin),
+):
+    """Get admins (admin only); same search and paging as GET /users/"""
+    return await _list_accounts("admins", response, email, name, status, limit, cursor)
+
+STATUSES = ("active", "suspended")
+# Accounts accepted by one POST /users/bulk request
+BULK_MAX_ACCOUNTS = 500
+LABELS = {"users": "User", "admins": "Admin"}
+
+def _profile_writes(table, account_id, updates):
+    """
+    Multi-path writes applying `updates` to an account's profile, with its
+    summary and profile change marker. Returns (writes, updates applied).
+    """
+    if table == "admins":
+        updates = {k: v for k, v in updates.items() if k != "phone"}  # admins have no phone
+    if not updates:
+        return {}, updates
+    path = f"{table}/{account_id}/profile"
+    writes = {f"{path}/{field}": value for field, value in updates.items()}
+    writes.update(summary_updates(table, account_id, updates))
+    writes.update(profile_cache.change_marker(path))
+    return writes, updates
+
+async def _update_profile(user_id, updates):
+    """
+    Apply `updates` to the user's or admin's profile. Returns ("User"/"Admin",
+    the updates applied), or (None, None) if there is no such account.
+    """
+    entry = await resolve(user_id)
+    if entry is None:
+        return None, None
+    table = entry["table"]
+    writes, updates = _profile_writes(table, user_id, updates)
+    if writes:
+        await get_async_ref("/").update(writes)
+        profile_cache.patch(f"{table}/{user_id}/profile", updates)
+    return LABELS[table], updates
 
 @router.put("/{user_id}")
-def update_user(user_id: str, name: str = None, phone: str = None, status: str = None, admin: dict = Depends(require_admin)):
+async def update_user(user_id: str, name: str = None, phone: str = None, status: str = None, admin: dict = Depends(require_admin)):
     """Update user information (admin only)"""
-    # Check users first
-    user_ref = get_ref(f"users/{user_id}/profile")
-    user = user_ref.get()
-    
-    if user:
-        updates = {}
-        if name is not None:
-            updates["name"] = name
-        if phone is not None:
-            updates["phone"] = phone
-        if status is not None:
-            if status not in ["active", "suspended"]:
-                raise HTTPException(400, "Status must be 'active' or 'suspended'")
-            updates["status"] = status
-        if updates:
-            user_ref.update(updates)
-        return {"message": "User updated", "updates": updates}
-    
-    # Check admins
-    admin_ref = get_ref(f"admins/{user_id}/profile")
-    admin_data = admin_ref.get()
-    
-    if admin_data:
-        updates = {}
-        if name is not None:
-            updates["name"] = name
-        if status is not None:
-            if status not in ["active", "suspended"]:
-                raise HTTPException(400, "Status must be 'active' or 'suspended'")
-            updates["status"] = status
-        if updates:
-            admin_ref.update(updates)
-        return {"message": "Admin updated", "updates": updates}
-    
-    raise HTTPException(404, "User not found")
+    if status is not None and status not in STATUSES:
+        raise HTTPException(400, "Status must be 'active' or 'suspended'")
+
+    updates = {}
+    if name is not None:
+        updates["name"] = name
+    if phone is not None:
+        updates["phone"] = phone
+    if status is not None:
+        updates["status"] = status
+
+    label, updates = await _update_profile(user_id, updates)
+    if label is None:
+        raise HTTPException(404, "User not found")
+    return {"message": f"{label} updated", "updates": updates}
 
 @router.put("/{user_id}/status")
-def update_user_status(user_id: str, status: str, admin: dict = Depends(require_admin)):
+async def update_user_status(user_id: str, status: str, admin: dict = Depends(require_admin)):
     """Update user status (active/suspended)"""
-    if status not in ["active", "suspended"]:
+    if status not in STATUSES:
         raise HTTPException(400, "Status must be 'active' or 'suspended'")
     
-    # Check users first
-    user_ref = get_ref(f"users/{user_id}/profile")
-    user = user_ref.get()
-    
-    if user:
-        user_ref.update({"status": status})
-        return {"message": f"User status updated to {status}"}
-    
-    # Check admins
-    admin_ref = get_ref(f"admins/{user_id}/profile")
-    admin_data = admin_ref.get()
-    
-    if admin_data:
-        admin_ref.update({"status": status})
-        return {"message": f"Admin status updated to {status}"}
-    
-    raise HTTPException(404, "User not found")
+    label, _ = await _update_profile(user_id, {"status": status})
+    if label is None:
+        raise HTTPException(404, "User not found")
+    return {"message": f"{label} status updated to {status}"}
+
+@router.post("/bulk")
+async def bulk_update_users(request: BulkAccountUpdate, admin: dict = Depends(require_admin)):
+    """
+    Update many users/admins in one multi-path write (admin only), e.g.
+    {"accounts": [{"id": "...", "status": "suspended"}, ...]}.
+    Ids that don't exist are returned in notFound; the rest are applied together.
+    """
+    if len(request.accounts) > BULK_MAX_ACCOUNTS:
+        raise HTTPException(400, f"At most {BULK_MAX_ACCOUNTS} accounts per request")
+    changes = {}
+    for account in request.accounts:
+        updates = account.dict(exclude_unset=True, exclude={"id"})
+        if "status" in updates and updates["status"] not in STATUSES:
+            raise HTTPException(400, "Status must be 'active' or 'suspended'")
+        changes.setdefault(account.id, {}).update(updates)
+
+    entries = await resolve_many(changes)
+    writes, applied = {}, {}
+    for account_id, entry in entries.items():
+        account_writes, applied[account_id] = _profile_writes(entry["table"], account_id,
+                                                              changes[account_id])
+        writes.update(account_writes)
+    if writes:
+        await get_async_ref("/").update(writes)
+    for account_id, updates in applied.items():
+        profile_cache.patch(f"{entries[account_id]['table']}/{account_id}/profile", updates)
+
+    return {"updated": list(applied), "notFound": [i for i in changes if i not in entries]}
 
 @router.delete("/{user_id}")
-def delete_user(user_id: str, admin: dict = Depends(require_admin)):
+async def delete_user(user_id: str, admin: dict = Depends(require_admin)):
     """Delete a user (admin only)"""
-    # Check users first
-    user_ref = get_ref(f"users/{user_id}")
-    user = user_ref.get()
-    
-    if user:
-        user_ref.delete()
-        return {"message": "User deleted successfully"}
-    
-    # Check admins
-    admin_ref = get_ref(f"admins/{user_id}")
-    admin_data = admin_ref.get()
-    
-    if admin_data:
-        admin_ref.delete()
-        return {"message": "Admin deleted successfully"}
-    
-    raise HTTPException(404, "User not found")
+    entry = await resolve(user_id)
+    if entry is None:
+        raise HTTPException(404, "User not found")
+    table = entry["table"]
+
+    # Remove the account with its index, summary and directory entries in one write
+    profile_path = f"{table}/{user_id}/profile"
+    updates = {f"{table}/{user_id}": None, summary_path(table, user_id): None,
+               directory_path(user_id): None, **profile_cache.change_marker(profile_path)}
+    if entry.get("email"):
+        updates[index_path(entry["email"])] = None
+    await get_async_ref("/").update(updates)
+    profile_cache.invalidate(profile_path)
+    return {"message": f"{LABELS[table]} deleted successfully"}
@@ -0,0 +1,187 @@
+"""
+Account summaries for the admin user lists.
+
+``userSummaries/{table}/{id}`` holds just what the admin page shows (email,
+name, phone, role, status, createdAt, lastLoginAt) plus three sort keys, so
+listing and searching accounts never downloads the `users`/`admins` trees
+with their password hashes:
+
+    emailKey    "<lowercased email>\t<id>"
+    nameKey     "<lowercased name>\t<id>"
+    statusKey   "<status>\t<id>"
+
+The id suffix keeps every key unique, so pages can resume from the last key
+seen; the tab sorts before any printable character, so "bob" still comes
+before "bob2". Every write that changes those fields also writes the summary
+(signup, profile updates, status changes, deletes).
+
+Run this module directly to build summaries for existing accounts:
+
+    python user_summaries.py
+"""
+import base64
+import json
+
+from database import get_ref, get_async_ref
+
+SUMMARY_PATH = "userSummaries"
+_SORT_KEYS = ("emailKey", "nameKey", "statusKey")
+_SEPARATOR = "\t"
+
+
+def summary_path(table: str, account_id: str) -> str:
+    """Path of an account's summary, for use in multi-path updates."""
+    return f"{SUMMARY_PATH}/{table}/{account_id}"
+
+
+def _sort_key(value, account_id):
+    return f"{str(value or '').lower()}{_SEPARATOR}{account_id}"
+
+
+def make_summary(table: str, account_id: str, auth: dict, profile: dict) -> dict:
+    """The summary document for an account."""
+    summary = {
+        "email": auth.get("email", ""),
+        "name": profile.get("name", ""),
+        "role": "admin" if table == "admins" else profile.get("role", "user"),
+        "status": profile.get("status", "active"),
+        "createdAt": auth.get("createdAt", ""),
+        "lastLoginAt": auth.get("lastLoginAt", ""),
+    }
+    if table == "users":
+        summary["phone"] = profile.get("phone", "")
+    summary["emailKey"] = _sort_key(summary["email"], account_id)
+    summary["nameKey"] = _sort_key(summary["name"], account_id)
+    summary["statusKey"] = _sort_key(summary["status"], account_id)
+    return summary
+
+
+def summary_updates(table: str, account_id: str, profile_updates: dict) -> dict:
+    """Multi-path updates that mirror a profile change into the summary."""
+    path = summary_path(table, account_id)
+    updates = {}
+    for field in ("name", "phone", "status"):
+        if field in profile_updates:
+            updates[f"{path}/{field}"] = profile_updates[field]
+    if "name" in profile_updates:
+        updates[f"{path}/nameKey"] = _sort_key(profile_updates["name"], account_id)
+    if "status" in profile_updates:
+        updates[f"{path}/statusKey"] = _sort_key(profile_updates["status"], account_id)
+    return updates
+
+
+def encode_cursor(index: str, after: str) -> str:
+    raw = json.dumps([index, after]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        index, after = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if index not in _SORT_KEYS or not isinstance(after, str):
+        raise ValueError("Invalid cursor")
+    return index, after
+
+
+async def iter_summaries(table, index, start=None, end=None, after=None, status=None, batch=100):
+    """
+    Yield (account_id, summary) in `index` order, for index values in
+    [start, end] and after `after`; `status` is checked per row. With
+    batch=None everything in range is read with one query.
+    """
+    while True:
+        query = get_async_ref(f"{SUMMARY_PATH}/{table}").order_by_child(index)
+        low = after if after is not None else start
+        if low is not None:
+            query = query.start_at(low)
+        if end is not None:
+            query = query.end_at(end)
+        if batch is not None:
+            query = query.limit_to_first(batch)
+        entries = await query.get() or {}
+
+        rows = sorted((data.get(index) or "", account_id, data)
+                      for account_id, data in entries.items() if isinstance(data, dict))
+        for key, account_id, data in rows:
+            # start_at is inclusive, so skip what the last page ended on
+            if after is not None and key <= after:
+                continue
+            if status and data.get("status") != status:
+                continue
+            yield account_id, data
+
+        if batch is None or len(entries) < batch or not rows:
+            return
+        after = rows[-1][0]
+
+
+async def list_summaries(table, email=None, name=None, status=None, limit=None, cursor=None):
+    """
+    Return (accounts, next_cursor) for one page of `table`, sorted by email
+    (or by name when searching by name). email/name are case-insensitive
+    prefixes. Without a limit every matching account is returned.
+    """
+    status = status.lower() if status else None
+    if email:
+        index, prefix = "emailKey", email.lower()
+    elif name:
+        index, prefix = "nameKey", name.lower()
+    elif status:
+        index, prefix = "statusKey", status + _SEPARATOR
+    else:
+        index, prefix = "emailKey", None
+    start, end = (prefix, prefix + "\uf8ff") if prefix is not None else (None, None)
+
+    after = None
+    if cursor:
+        cursor_index, after = decode_cursor(cursor)
+        if cursor_index != index:
+            raise ValueError("Cursor does not match the search")
+
+    if limit is None:
+        batch = None
+    else:
+        # A status filter on an email/name search drops rows, so read ahead
+        batch = limit + 1 if not status or index == "statusKey" else max(limit + 1, 200)
+
+    rows = []
+    async for row in iter_summaries(table, index, start, end, after, status, batch):
+        rows.append(row)
+        if limit is not None and len(rows) > limit:
+            break
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(index, rows[-1][1][index])
+
+    accounts = []
+    for account_id, data in rows:
+        account = {"id": account_id}
+        account.update((k, v) for k, v in data.items() if k not in _SORT_KEYS)
+        accounts.append(account)
+    return accounts, next_cursor
+
+
+def backfill():
+    """Build summaries for every existing user and admin."""
+    updates = {}
+    for table in ("users", "admins"):
+        accounts = get_ref(table).get() or {}
+        for account_id, data in accounts.items():
+            if not isinstance(data, dict):
+                continue
+            updates[summary_path(table, account_id)] = make_summary(
+                table, account_id, data.get("auth") or {}, data.get("profile") or {})
+
+    paths = list(updates)
+    for start in range(0, len(paths), 1000):
+        get_ref("/").update({path: updates[path] for path in paths[start:start + 1000]})
+    print(f"Summarized {len(updates)} accounts")
+
+
+if __name__ == "__main__":
+    backfill()
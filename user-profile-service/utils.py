@@ -1,41 +1,71 @@
+import asyncio
 import bcrypt
-from jose import jwt, JWTError
-from datetime import datetime, timedelta
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from typing import Optional
 
-# Config
-SECRET_KEY = "simple_secret_key"
-ALGORITHM = "HS256"
+import database  # noqa: F401  (puts ../shared-assets on sys.path)
+# Tokens are signed and checked by the shared ccb_auth module, so other
+# services can verify them with the same JWT_SECRET_KEY
+from ccb_auth import InvalidTokenError, create_token, verify_token  # noqa: E402
+
+# Password hashing: bcrypt cost factor and a dedicated, bounded pool so a
+# burst of logins/signups can't take every request thread.
+# bcrypt releases the GIL, so threads are enough.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", "2"))
+# Hash jobs allowed to wait for a worker before we answer 429
+HASH_MAX_QUEUE = int(os.environ.get("HASH_MAX_QUEUE", "16"))
+
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_MAX_QUEUE)
 
 # OAuth2 Scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def hash_password(password: str) -> str:
+async def _run_hash_job(fn, *args):
+    """Run a bcrypt call on the hash pool, or 429 if it is saturated."""
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(429, "Too many login attempts, try again shortly",
+                            headers={"Retry-After": "1"})
+    try:
+        future = _hash_pool.submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    # Freed when the job is done (or cancelled before it started), not when
+    # the request is: a cancelled request leaves bcrypt running on the pool
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return await asyncio.wrap_future(future)
+
+async def hash_password(password: str) -> str:
     """Hash a password using bcrypt."""
     # Truncate to 72 bytes (bcrypt limitation)
     password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
+    salt = bcrypt.gensalt(BCRYPT_ROUNDS)
+    hashed = await _run_hash_job(bcrypt.hashpw, password_bytes, salt)
     return hashed.decode('utf-8')
 
-def verify_password(plain: str, hashed: str) -> bool:
+async def verify_password(plain: str, hashed: str) -> bool:
     """Verify a password against a bcrypt hash."""
     # Truncate to 72 bytes (bcrypt limitation)
     plain_bytes = plain.encode('utf-8')[:72]
     hashed_bytes = hashed.encode('utf-8')
-    return bcrypt.checkpw(plain_bytes, hashed_bytes)
+    return await _run_hash_job(bcrypt.checkpw, plain_bytes, hashed_bytes)
 
-def create_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=1)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+def needs_rehash(hashed: str) -> bool:
+    """True if a stored hash was made with a different cost than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload # Returns dict: {'sub': user_id, 'role': role}
-    except JWTError:
+        # Verified tokens are cached (until exp), so repeat requests skip the signature check
+        return verify_token(token) # Returns dict: {'sub': user_id, 'role': role}
+    except InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
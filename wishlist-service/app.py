@@ -0,0 +1,141 @@
+import asyncio
+import os
+import sys
+from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.security import OAuth2PasswordBearer
+from pydantic import BaseModel, Field
+from typing import Annotated, List
+
+# Shared data-access layer in ../shared-assets/ccb_db (same layout in the Docker images)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared-assets"))
+from ccb_db import reference  # noqa: E402
+from ccb_auth import InvalidTokenError, verify_token  # noqa: E402
+from ccb_catalog import ProductCache  # noqa: E402
+from ccb_metrics import instrument  # noqa: E402
+from wishlists import WISHLIST_MAX_ITEMS, WishlistFull, wishlist_store  # noqa: E402
+
+# --- CONFIGURATION ---
+# Database backend (Firebase, local emulator or in-memory) is chosen by CCB_DB_BACKEND;
+# the wishlist size limit is read in wishlists.py
+
+# Seconds before the product snapshot is reloaded when the listener is down
+PRODUCT_CACHE_TTL = float(os.environ.get("PRODUCT_CACHE_TTL", "30"))
+# Most products per GET /wishlist/counts
+MAX_COUNT_IDS = 100
+
+app = FastAPI(title="CCB Wishlist Service")
+instrument(app)
+
+# The same listener-backed catalog snapshot catalog-service serves from;
+# wishlists are hydrated from it without calling catalog-service
+product_cache = ProductCache(reference('products'), ttl=PRODUCT_CACHE_TTL)
+
+@app.on_event("startup")
+def start_product_cache():
+    product_cache.start_listener()
+
+@app.on_event("shutdown")
+def stop_product_cache():
+    product_cache.stop_listener()
+
+async def current_snapshot():
+    """The product snapshot; a reload (listener down) runs off the event loop."""
+    if product_cache.needs_reload():
+        return await asyncio.to_thread(product_cache.snapshot)
+    return product_cache.snapshot()
+
+# --- CORS ---
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Tokens come from user-profile-service (POST /auth/login)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+
+async def current_user_id(token: str = Depends(oauth2_scheme)):
+    """The signed-in shopper's id; wishlists belong to `users` accounts only."""
+    try:
+        claims = verify_token(token)
+    except InvalidTokenError:
+        raise HTTPException(401, "Invalid token")
+    if claims.get("role") != "user":
+        raise HTTPException(403, "Only customer accounts have a wishlist")
+    return claims["sub"]
+
+# --- MODELS ---
+ProductId = Annotated[str, Field(min_length=1, pattern=r"^[^/.#$\[\]]+$")]
+
+class WishlistItems(BaseModel):
+    productIds: List[ProductId] = Field(..., min_length=1, max_length=WISHLIST_MAX_ITEMS)
+
+def hydrate(wishlist, snapshot):
+    """
+    Wishlist entries with their product data, newest first, resolved against
+    the snapshot in one pass; ids no longer in the catalog are listed apart.
+    """
+    items, missing = [], []
+    entries = sorted(wishlist.items(), reverse=True,
+                     key=lambda e: (e[1] if isinstance(e[1], (int, float)) else 0, e[0]))
+    for product_id, added_at in entries:
+        product = snapshot.by_id.get(product_id)
+        if product is None:
+            missing.append(product_id)
+        else:
+            items.append({**product, "addedAt": added_at})
+    return {"items": items, "missing": missing, "count": len(wishlist)}
+
+# --- ROUTES ---
+
+@app.get("/wishlist")
+async def get_wishlist(user_id: str = Depends(current_user_id)):
+    """The shopper's wishlist with product details (one database read)"""
+    wishlist = await wishlist_store.get(user_id)
+    return hydrate(wishlist, await current_snapshot())
+
+@app.get("/wishlist/ids")
+async def get_wishlist_ids(user_id: str = Depends(current_user_id)):
+    """Just the product ids, e.g. to mark hearts on a product grid"""
+    return {"productIds": list(await wishlist_store.get(user_id))}
+
+@app.post("/wishlist/items")
+async def add_items(body: WishlistItems, user_id: str = Depends(current_user_id)):
+    """Add one or more products; ids not in the catalog are reported, not added"""
+    snapshot = await current_snapshot()
+    known = [p for p in body.productIds if p in snapshot.by_id]
+    not_found = [p for p in body.productIds if p not in snapshot.by_id]
+    try:
+        added, count = await wishlist_store.add(user_id, known)
+    except WishlistFull as e:
+        raise HTTPException(400, str(e))
+    return {"added": added, "notFound": not_found, "count": count}
+
+@app.post("/wishlist/items/remove")
+async def remove_items(body: WishlistItems, user_id: str = Depends(current_user_id)):
+    """Remove one or more products"""
+    removed, count = await wishlist_store.remove(user_id, body.productIds)
+    return {"removed": removed, "count": count}
+
+@app.delete("/wishlist/items/{product_id}")
+async def remove_item(product_id: str, user_id: str = Depends(current_user_id)):
+    """Remove a product"""
+    removed, count = await wishlist_store.remove(user_id, [product_id])
+    if not removed:
+        raise HTTPException(404, "Product not in wishlist")
+    return {"removed": removed, "count": count}
+
+@app.get("/wishlist/counts")
+async def get_counts(ids: str = Query(..., description="Comma-separated product ids")):
+    """How many wishlists hold each product"""
+    product_ids = list(dict.fromkeys(p for p in ids.split(",") if p))
+    if not product_ids or len(product_ids) > MAX_COUNT_IDS:
+        raise HTTPException(400, f"Between 1 and {MAX_COUNT_IDS} product ids")
+    return await wishlist_store.counts(product_ids)
+
+@app.get("/")
+async def root():
+    return {"message": "Service Running"}
@@ -0,0 +1,114 @@
+"""
+Wishlist storage and the per-product wishlisted counter.
+
+A wishlist is `wishlists/{userId}/{productId}: addedAt` (ms): product ids
+only. Names, prices and images come from the catalog snapshot when the
+wishlist is read (see app.py), so editing a product never touches wishlists
+and reading one costs a single database read however long it is.
+
+`wishlistCounts/{productId}` is the number of wishlists holding a product.
+It changes in the same multi-path update as the wishlist itself, through
+increment server values, so replicas adding and removing concurrently never
+overwrite each other's counts. Only real changes count: the wishlist is
+read first, and ids that are already there (or already gone) are skipped.
+Requests for the same user are serialized within a replica; if two replicas
+race on one user's wishlist, recompute the counts from `wishlists`:
+
+    python wishlists.py
+"""
+import asyncio
+import os
+import sys
+import weakref
+from collections import Counter
+
+# Shared data-access layer in ../shared-assets/ccb_db (same layout in the Docker images)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared-assets"))
+from ccb_db import aio, reference  # noqa: E402
+
+WISHLIST_PATH = "wishlists"
+COUNT_PATH = "wishlistCounts"
+# Most products one wishlist may hold
+WISHLIST_MAX_ITEMS = int(os.environ.get("WISHLIST_MAX_ITEMS", "1000"))
+
+
+class WishlistFull(Exception):
+    pass
+
+
+def wishlist_path(user_id: str) -> str:
+    return f"{WISHLIST_PATH}/{user_id}"
+
+
+class WishlistStore:
+    def __init__(self, max_items=WISHLIST_MAX_ITEMS):
+        self.max_items = max_items
+        self._locks = weakref.WeakValueDictionary()  # user id -> asyncio.Lock while in use
+
+    def _lock(self, user_id):
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def get(self, user_id):
+        """The user's wishlist, {productId: addedAt}."""
+        data = await aio.reference(wishlist_path(user_id)).get()
+        return data if isinstance(data, dict) else {}
+
+    async def add(self, user_id, product_ids):
+        """Add products; returns (ids that were new, wishlist size). Raises WishlistFull."""
+        async with self._lock(user_id):
+            current = await self.get(user_id)
+            new = [p for p in dict.fromkeys(product_ids) if p not in current]
+            if len(current) + len(new) > self.max_items:
+                raise WishlistFull(f"A wishlist holds at most {self.max_items} products")
+            if new:
+                updates = {}
+                for product_id in new:
+                    updates[f"{wishlist_path(user_id)}/{product_id}"] = {".sv": "timestamp"}
+                    updates[f"{COUNT_PATH}/{product_id}"] = {".sv": {"increment": 1}}
+                await aio.reference("/").update(updates)
+            return new, len(current) + len(new)
+
+    async def remove(self, user_id, product_ids):
+        """Remove products; returns (ids that were there, wishlist size)."""
+        async with self._lock(user_id):
+            current = await self.get(user_id)
+            gone = [p for p in dict.fromkeys(product_ids) if p in current]
+            if gone:
+                updates = {}
+                for product_id in gone:
+                    updates[f"{wishlist_path(user_id)}/{product_id}"] = None
+                    updates[f"{COUNT_PATH}/{product_id}"] = {".sv": {"increment": -1}}
+                await aio.reference("/").update(updates)
+            return gone, len(current) - len(gone)
+
+    async def counts(self, product_ids):
+        """{productId: number of wishlists holding it}, read concurrently."""
+        values = await asyncio.gather(*(aio.reference(f"{COUNT_PATH}/{p}").get()
+                                        for p in product_ids))
+        return {p: value if isinstance(value, int) else 0
+                for p, value in zip(product_ids, values)}
+
+
+wishlist_store = WishlistStore()
+
+
+def rebuild_counts():
+    """Recompute every wishlistCounts entry from the wishlists themselves."""
+    wishlists = reference(WISHLIST_PATH).get() or {}
+    counts = Counter()
+    for items in wishlists.values():
+        if isinstance(items, dict):
+            counts.update(items.keys())
+    if counts:
+        reference(COUNT_PATH).set(dict(counts))
+    else:
+        reference(COUNT_PATH).delete()
+    print(f"Counted {sum(counts.values())} entries over {len(counts)} products "
+          f"in {len(wishlists)} wishlists")
+
+
+if __name__ == "__main__":
+    rebuild_counts()